@@ -0,0 +1,213 @@
+"""
+Compare recall@k and latency of quantized Qdrant collections against the
+unquantized one.
+
+Vectors are copied from the provider's existing collection into temporary
+benchmark collections (one per quantization type). Sampled document vectors,
+lightly perturbed, are used as queries; exact search on the float32
+collection is the ground truth.
+
+Usage:
+    python scripts/benchmark_quantization.py --provider aws --k 5 --queries 200
+"""
+
+import argparse
+import sys
+import time
+import types
+from pathlib import Path
+
+import numpy as np
+from dotenv import load_dotenv
+
+src_path = (Path.cwd() / "src").as_posix()
+sys.path.append(src_path)
+
+import config as cfg
+from qdrant_client.http import models as rest
+from utils.file_utils import save_obj
+from utils.logger import setup_logger
+from vector_database.qdrant_vector_db_client import (
+    get_collection_name,
+    get_qdrant_url,
+    get_quantization_config,
+    initialize_qdrant,
+)
+
+load_dotenv()
+logger = setup_logger(__name__)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--provider", default=cfg.app.model.provider)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--noise", type=float, default=0.05)
+    parser.add_argument("--types", nargs="+", default=["scalar", "binary"])
+    parser.add_argument(
+        "--oversampling", nargs="+", type=float, default=[1.0, 2.0, 4.0]
+    )
+    parser.add_argument("--on-disk-vectors", action="store_true")
+    parser.add_argument("--keep", action="store_true", help="Keep bench collections.")
+    parser.add_argument(
+        "--output", type=Path, default=cfg.path.data.interim / "bench_quantization.json"
+    )
+    return parser.parse_args()
+
+
+def load_vectors(client, collection_name: str) -> np.ndarray:
+    vectors, offset = [], None
+    while True:
+        points, offset = client.scroll(
+            collection_name=collection_name,
+            limit=1024,
+            offset=offset,
+            with_payload=False,
+            with_vectors=True,
+        )
+        for point in points:
+            vector = point.vector
+            if isinstance(vector, dict):
+                vector = next(v for v in vector.values() if isinstance(v, list))
+            vectors.append(vector)
+        if offset is None:
+            break
+    return np.asarray(vectors, dtype=np.float32)
+
+
+def create_collection(client, name: str, vectors: np.ndarray, quantization, on_disk):
+    if client.collection_exists(name):
+        client.delete_collection(name)
+    client.create_collection(
+        collection_name=name,
+        vectors_config=rest.VectorParams(
+            size=vectors.shape[1], distance=rest.Distance.COSINE, on_disk=on_disk
+        ),
+        quantization_config=get_quantization_config(quantization),
+    )
+    for start in range(0, len(vectors), 256):
+        batch = vectors[start : start + 256]
+        client.upsert(
+            collection_name=name,
+            points=rest.Batch(
+                ids=list(range(start, start + len(batch))), vectors=batch.tolist()
+            ),
+        )
+    while client.get_collection(name).status != rest.CollectionStatus.GREEN:
+        time.sleep(0.5)
+
+
+def search(client, name: str, queries: np.ndarray, k: int, params):
+    results, latencies = [], []
+    for query in queries:
+        start = time.perf_counter()
+        response = client.query_points(
+            collection_name=name, query=query.tolist(), limit=k, search_params=params
+        )
+        latencies.append(time.perf_counter() - start)
+        results.append([point.id for point in response.points])
+    return results, np.asarray(latencies) * 1000
+
+
+def recall_at_k(results, truth) -> float:
+    hits = [len(set(r) & set(t)) / len(t) for r, t in zip(results, truth) if t]
+    return float(np.mean(hits))
+
+
+def summarize(label: str, results, latencies, truth) -> dict:
+    row = {
+        "config": label,
+        "recall": recall_at_k(results, truth),
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+        "mean_ms": float(latencies.mean()),
+    }
+    logger.info(
+        f"{label:<32} recall@k={row['recall']:.3f} "
+        f"p50={row['p50_ms']:.2f}ms p95={row['p95_ms']:.2f}ms"
+    )
+    return row
+
+
+def main():
+    args = parse_args()
+    client = initialize_qdrant(url=get_qdrant_url())
+    source = get_collection_name(args.provider)
+    vectors = load_vectors(client, source)
+    logger.info(f"Loaded {len(vectors)} vectors ({vectors.shape[1]}d) from {source}")
+
+    rng = np.random.default_rng(0)
+    sample = rng.choice(
+        len(vectors), size=min(args.queries, len(vectors)), replace=False
+    )
+    queries = vectors[sample] + rng.normal(
+        scale=args.noise, size=(len(sample), vectors.shape[1])
+    ).astype(np.float32)
+
+    base = cfg.vector_db.qdrant.quantization
+    names = {}
+    for quantization_type in ["none", *args.types]:
+        quantization = types.SimpleNamespace(
+            **{**vars(base), "type": quantization_type}
+        )
+        names[quantization_type] = f"{source}__bench_{quantization_type}"
+        create_collection(
+            client,
+            names[quantization_type],
+            vectors,
+            quantization,
+            args.on_disk_vectors,
+        )
+
+    truth, _ = search(
+        client, names["none"], queries, args.k, rest.SearchParams(exact=True)
+    )
+    rows = [
+        summarize("none", *search(client, names["none"], queries, args.k, None), truth)
+    ]
+    for quantization_type in args.types:
+        name = names[quantization_type]
+        params = rest.SearchParams(
+            quantization=rest.QuantizationSearchParams(rescore=False)
+        )
+        rows.append(
+            summarize(
+                f"{quantization_type} (no rescore)",
+                *search(client, name, queries, args.k, params),
+                truth,
+            )
+        )
+        for oversampling in args.oversampling:
+            params = rest.SearchParams(
+                quantization=rest.QuantizationSearchParams(
+                    rescore=True, oversampling=oversampling
+                )
+            )
+            rows.append(
+                summarize(
+                    f"{quantization_type} (rescore x{oversampling:g})",
+                    *search(client, name, queries, args.k, params),
+                    truth,
+                )
+            )
+
+    if not args.keep:
+        for name in names.values():
+            client.delete_collection(name)
+
+    report = {
+        "collection": source,
+        "n_vectors": len(vectors),
+        "dim": int(vectors.shape[1]),
+        "k": args.k,
+        "n_queries": len(queries),
+        "on_disk_vectors": args.on_disk_vectors,
+        "results": rows,
+    }
+    save_obj(report, args.output, mkdir=True, indent=2)
+    logger.info(f"Saved benchmark report to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
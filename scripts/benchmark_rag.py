@@ -0,0 +1,302 @@
+"""
+End-to-end latency and throughput benchmark of the RAG service.
+
+Drives `RagPipeline.predict` over a query set at one or more concurrency
+levels and reports p50/p95/p99 latency, QPS, error count and a per-stage
+breakdown (embed, search, rerank, assemble, prompt, llm, synthesize, ...)
+collected from llama-index spans. Optionally times `build_index` first. Peak RSS and
+the git commit are recorded, and the JSON report can be compared with a
+previous one to spot regressions.
+
+Use `--provider local` to measure the service's own overhead offline, with
+the deterministic stand-in models instead of Bedrock or Gemini.
+
+Usage:
+    python scripts/benchmark_rag.py --provider local --concurrency 1 8 32
+    python scripts/benchmark_rag.py --index --compare data/interim/bench_rag.json
+"""
+
+import argparse
+import asyncio
+import resource
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+
+src_path = (Path.cwd() / "src").as_posix()
+sys.path.append(src_path)
+
+import config as cfg
+from llama_index.core.instrumentation.dispatcher import instrument_tags
+from application.rag_service.build_index import build_index
+from application.rag_service.rag_pipeline import RagPipeline
+from application.rag_service.single_flight import query_flights
+from application.rag_service.stage_profiler import STAGES, add_stage_callback
+from utils.file_utils import load_obj, save_obj
+from utils.logger import setup_logger
+
+load_dotenv()
+logger = setup_logger(__name__)
+
+PERCENTILES = (50, 95, 99)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--provider", default=cfg.app.model.provider)
+    parser.add_argument("--model-name", default=None)
+    parser.add_argument("--vector-db", default=cfg.app.vector_db.name)
+    parser.add_argument("--retrieval-mode", default=cfg.vector_db.retriever.mode)
+    parser.add_argument("--rerank", action="store_true")
+    parser.add_argument("--semantic-cache", action="store_true")
+    parser.add_argument("--no-coalesce", action="store_true")
+    parser.add_argument(
+        "--queries", choices=["templates", "gold", "all"], default="templates"
+    )
+    parser.add_argument("--limit", type=int, default=None)
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[1, 4, 16])
+    parser.add_argument("--index", action="store_true", help="Time build_index.")
+    parser.add_argument(
+        "--index-mode", choices=["load", "incremental", "full"], default="load"
+    )
+    parser.add_argument("--no-query", action="store_true")
+    parser.add_argument(
+        "--dataset",
+        type=Path,
+        default=cfg.path.data.processed / "evaluation_gold_qa_dataset.pkl",
+    )
+    parser.add_argument(
+        "--output", type=Path, default=cfg.path.data.interim / "bench_rag.json"
+    )
+    parser.add_argument("--compare", type=Path, default=None)
+    return parser.parse_args()
+
+
+def default_model_name(provider: str) -> str:
+    if provider == cfg.app.model.provider:
+        return cfg.app.model.name
+    llm_cfg = vars(getattr(cfg.model, provider).llm)
+    return next(name for name in llm_cfg if name != "config")
+
+
+def load_queries(args: argparse.Namespace) -> list:
+    queries = []
+    if args.queries in ("templates", "all"):
+        queries += list(cfg.templates.questions)
+    if args.queries in ("gold", "all"):
+        rows = load_obj(args.dataset)
+        if isinstance(rows, pd.DataFrame):
+            rows = rows.to_dict("records")
+        queries += [row["query"] for row in rows]
+    return queries[: args.limit]
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS.
+    scale = 1024 if sys.platform != "darwin" else 1024**2
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except Exception:
+        return "unknown"
+
+
+def summarize(values: list) -> dict:
+    if not values:
+        return {}
+    values = np.asarray(values) * 1000
+    summary = {f"p{p}": float(np.percentile(values, p)) for p in PERCENTILES}
+    summary.update({"mean": float(values.mean()), "max": float(values.max())})
+    return summary
+
+
+class StageCollector:
+    """
+    Sums per-stage seconds of every span tree tagged with a request id, so
+    a request's breakdown covers all query engine calls it made.
+    """
+
+    def __init__(self):
+        self.requests = defaultdict(lambda: defaultdict(float))
+        add_stage_callback(self.add)
+
+    def add(self, stages: dict, tags: dict) -> None:
+        request_id = tags.get("bench_request")
+        if request_id is None:
+            return
+        for stage, seconds in stages.items():
+            self.requests[request_id][stage] += seconds
+
+    def summary(self, request_ids: list) -> dict:
+        requests = [self.requests[i] for i in request_ids if i in self.requests]
+        return {
+            stage: summarize([request.get(stage, 0.0) for request in requests])
+            for stage in (*STAGES, "total")
+        }
+
+
+async def run_level(
+    pipe: RagPipeline,
+    queries: list,
+    concurrency: int,
+    collector: StageCollector,
+    offset: int,
+) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, errors = [], 0
+
+    async def run_one(request_id: int, query: str) -> None:
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                with instrument_tags({"bench_request": request_id}):
+                    await pipe.predict(query)
+            except Exception as e:
+                errors += 1
+                logger.warning(f"Query failed: {type(e).__name__}: {e}")
+                return
+            latencies.append(time.perf_counter() - start)
+
+    request_ids = list(range(offset, offset + len(queries)))
+    flights_before = query_flights.stats()["coalesced"]
+    start = time.perf_counter()
+    await asyncio.gather(*(run_one(i, q) for i, q in zip(request_ids, queries)))
+    wall = time.perf_counter() - start
+
+    result = {
+        "concurrency": concurrency,
+        "n_queries": len(queries),
+        "errors": errors,
+        "wall_s": wall,
+        "qps": len(latencies) / wall if wall else 0.0,
+        "latency_ms": summarize(latencies),
+        "stages_ms": collector.summary(request_ids),
+        "coalesced": query_flights.stats()["coalesced"] - flights_before,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+    latency = result["latency_ms"]
+    logger.info(
+        f"concurrency={concurrency:<3} qps={result['qps']:.2f} "
+        f"p50={latency.get('p50', 0):.1f}ms p95={latency.get('p95', 0):.1f}ms "
+        f"p99={latency.get('p99', 0):.1f}ms errors={errors}"
+    )
+    return result
+
+
+async def run_queries(args: argparse.Namespace, pipe: RagPipeline) -> list:
+    queries = load_queries(args)
+    if not queries:
+        raise Exception("The benchmark query set is empty.")
+    collector = StageCollector()
+    # Warm up engine construction, connections and caches outside the timings.
+    for query in queries[: args.warmup]:
+        await pipe.predict(query)
+
+    results, offset = [], 0
+    for concurrency in args.concurrency:
+        level_queries = queries * args.repeat
+        results.append(
+            await run_level(pipe, level_queries, concurrency, collector, offset)
+        )
+        offset += len(level_queries)
+    return results
+
+
+def run_index(args: argparse.Namespace, model_name: str) -> dict:
+    start = time.perf_counter()
+    build_index(
+        model_provider=args.provider,
+        model_name=model_name,
+        model_type="llm",
+        vector_db=args.vector_db,
+        force_reindex=args.index_mode == "full",
+        incremental=args.index_mode == "incremental",
+    )
+    seconds = time.perf_counter() - start
+    logger.info(f"build_index ({args.index_mode}) took {seconds:.2f}s")
+    return {"mode": args.index_mode, "seconds": seconds, "peak_rss_mb": peak_rss_mb()}
+
+
+def compare(report: dict, baseline: dict) -> None:
+    """
+    Log latency and QPS changes against a previous report, per concurrency.
+    """
+    previous = {level["concurrency"]: level for level in baseline.get("query", [])}
+    logger.info(f"Comparing with {baseline.get('commit')} ({baseline.get('date')})")
+    for level in report.get("query", []):
+        before = previous.get(level["concurrency"])
+        if before is None:
+            continue
+        changes = [
+            f"qps {before['qps']:.2f} -> {level['qps']:.2f}",
+            *(
+                f"p{p} {before['latency_ms'][f'p{p}']:.1f} -> "
+                f"{level['latency_ms'][f'p{p}']:.1f}ms"
+                for p in PERCENTILES
+                if before["latency_ms"] and level["latency_ms"]
+            ),
+        ]
+        logger.info(f"concurrency={level['concurrency']:<3} " + ", ".join(changes))
+
+
+def main():
+    args = parse_args()
+    model_name = args.model_name or default_model_name(args.provider)
+    report = {
+        "commit": git_commit(),
+        "date": datetime.now(timezone.utc).isoformat(),
+        "config": {
+            "provider": args.provider,
+            "model_name": model_name,
+            "vector_db": args.vector_db,
+            "retrieval_mode": args.retrieval_mode,
+            "rerank": args.rerank,
+            "semantic_cache": args.semantic_cache,
+            "coalesce": not args.no_coalesce,
+            "queries": args.queries,
+            "limit": args.limit,
+            "repeat": args.repeat,
+        },
+    }
+    if args.index:
+        report["index"] = run_index(args, model_name)
+    if not args.no_query:
+        pipe = RagPipeline(
+            model_provider=args.provider,
+            model_name=model_name,
+            vector_db=args.vector_db,
+            similarity_top_k=cfg.vector_db.retriever.similarity_top_k,
+            retrieval_mode=args.retrieval_mode,
+            rerank=args.rerank,
+            semantic_cache=args.semantic_cache,
+            coalesce=not args.no_coalesce,
+        )
+        report["query"] = asyncio.run(run_queries(args, pipe))
+    report["peak_rss_mb"] = peak_rss_mb()
+
+    if args.compare is not None:
+        compare(report, load_obj(args.compare))
+    save_obj(report, args.output, mkdir=True, indent=2)
+    logger.info(f"Saved benchmark report to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
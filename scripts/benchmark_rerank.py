@@ -0,0 +1,175 @@
+"""
+Measure the latency budget and recall gain of the rerank stage.
+
+For each gold QA query, `rerank.candidate_k` candidates are retrieved once.
+Three context sets are compared: the retriever's top `similarity_top_k`
+(current prompt), its top `rerank.top_n`, and the reranker's top `top_n`.
+Relevance is judged against the gold answer: "oracle hit" is whether the
+candidate sharing the most terms with the answer is kept, and "coverage" is
+the share of answer terms present in the kept contexts. No LLM is called.
+
+Usage:
+    python scripts/benchmark_rerank.py --scorer lexical --queries 100
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+import types
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+
+src_path = (Path.cwd() / "src").as_posix()
+sys.path.append(src_path)
+
+import config as cfg
+from llama_index.core import QueryBundle
+from llama_index.core.schema import MetadataMode
+from application.rag_service.rag_pipeline import rag_pipe
+from application.rag_service.reranker import set_reranker
+from utils.file_utils import load_obj, save_obj
+from utils.logger import setup_logger
+from vector_database.hybrid_search import tokenize
+
+load_dotenv()
+logger = setup_logger(__name__)
+
+
+def parse_args() -> argparse.Namespace:
+    rerank_cfg = cfg.app.rerank
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--scorer", default=rerank_cfg.scorer)
+    parser.add_argument("--candidate-k", type=int, default=rerank_cfg.candidate_k)
+    parser.add_argument("--top-n", type=int, default=rerank_cfg.top_n)
+    parser.add_argument("--queries", type=int, default=None)
+    parser.add_argument(
+        "--dataset",
+        type=Path,
+        default=cfg.path.data.processed / "evaluation_gold_qa_dataset.pkl",
+    )
+    parser.add_argument(
+        "--output", type=Path, default=cfg.path.data.interim / "bench_rerank.json"
+    )
+    return parser.parse_args()
+
+
+def load_rows(path: Path, limit: int = None) -> list:
+    rows = load_obj(path)
+    if isinstance(rows, pd.DataFrame):
+        rows = rows.to_dict("records")
+    return list(rows)[:limit]
+
+
+def node_text(node) -> str:
+    return node.node.get_content(metadata_mode=MetadataMode.NONE)
+
+
+def coverage(nodes, answer_terms: set) -> float:
+    terms = {term for node in nodes for term in tokenize(node_text(node))}
+    return len(answer_terms & terms) / len(answer_terms)
+
+
+def evaluate(label: str, kept: list, oracles: list, answers: list) -> dict:
+    row = {
+        "config": label,
+        "oracle_hit": float(
+            np.mean(
+                [oracle in {n.node_id for n in k} for k, oracle in zip(kept, oracles)]
+            )
+        ),
+        "coverage": float(np.mean([coverage(k, a) for k, a in zip(kept, answers)])),
+        "context_chars": float(
+            np.mean([sum(len(node_text(n)) for n in k) for k in kept])
+        ),
+    }
+    logger.info(
+        f"{label:<24} oracle_hit={row['oracle_hit']:.3f} "
+        f"coverage={row['coverage']:.3f} chars={row['context_chars']:.0f}"
+    )
+    return row
+
+
+async def run(args: argparse.Namespace) -> dict:
+    rerank_cfg = types.SimpleNamespace(
+        **{
+            **vars(cfg.app.rerank),
+            "scorer": args.scorer,
+            "candidate_k": args.candidate_k,
+            "top_n": args.top_n,
+        }
+    )
+    reranker = set_reranker(rerank_cfg)
+    pipe = rag_pipe.model_copy(update={"rerank": True})
+    retriever_kwargs = {
+        **pipe.get_retriever_kwargs(),
+        "similarity_top_k": args.candidate_k,
+    }
+    if "hybrid_top_k" in retriever_kwargs:
+        retriever_kwargs["hybrid_top_k"] = args.candidate_k
+    retriever = pipe.get_cached_index().as_retriever(**retriever_kwargs)
+
+    baseline, baseline_n, reranked = [], [], []
+    oracles, answers, latencies = [], [], []
+    for row in load_rows(args.dataset, args.queries):
+        answer_terms = set(tokenize(row["ground_truth"]))
+        if not answer_terms:
+            continue
+        query_bundle = QueryBundle(row["query"])
+        candidates = await retriever.aretrieve(query_bundle)
+        if not candidates:
+            continue
+        overlaps = [
+            len(answer_terms & set(tokenize(node_text(node)))) for node in candidates
+        ]
+        oracles.append(candidates[int(np.argmax(overlaps))].node_id)
+        answers.append(answer_terms)
+        baseline.append(candidates[: rag_pipe.similarity_top_k])
+        baseline_n.append(candidates[: args.top_n])
+
+        start = time.perf_counter()
+        kept = await reranker.apostprocess_nodes(
+            list(candidates), query_bundle=query_bundle
+        )
+        latencies.append((time.perf_counter() - start) * 1000)
+        reranked.append(kept)
+
+    latencies = np.asarray(latencies)
+    logger.info(
+        f"Rerank latency over {len(latencies)} queries: "
+        f"p50={np.percentile(latencies, 50):.2f}ms "
+        f"p95={np.percentile(latencies, 95):.2f}ms max={latencies.max():.2f}ms"
+    )
+    return {
+        "scorer": args.scorer,
+        "candidate_k": args.candidate_k,
+        "top_n": args.top_n,
+        "similarity_top_k": rag_pipe.similarity_top_k,
+        "n_queries": len(latencies),
+        "rerank_latency_ms": {
+            "p50": float(np.percentile(latencies, 50)),
+            "p95": float(np.percentile(latencies, 95)),
+            "max": float(latencies.max()),
+        },
+        "results": [
+            evaluate(
+                f"retriever top {rag_pipe.similarity_top_k}", baseline, oracles, answers
+            ),
+            evaluate(f"retriever top {args.top_n}", baseline_n, oracles, answers),
+            evaluate(f"reranked top {args.top_n}", reranked, oracles, answers),
+        ],
+    }
+
+
+def main():
+    args = parse_args()
+    report = asyncio.run(run(args))
+    save_obj(report, args.output, mkdir=True, indent=2)
+    logger.info(f"Saved benchmark report to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,11 @@
 import sys
-import asyncio
 from pathlib import Path
 
 src_path = (Path.cwd() / "src").as_posix()
 sys.path.append(src_path)
 
 from application.rag_service.rag_pipeline import rag_pipe
+from utils.async_utils import run_sync
 
 # rag_pipe = RagPipeline(
 #     model_provider=cfg.app.model.provider,
@@ -19,6 +19,6 @@ from application.rag_service.rag_pipeline import rag_pipe
 
 query = "What is AWS?"
 
-result = asyncio.run(rag_pipe.predict(query))
+result = run_sync(rag_pipe.predict(query))
 
 print(result)
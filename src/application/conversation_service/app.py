@@ -3,12 +3,13 @@ from pathlib import Path
 
 sys.path.append((Path.cwd() / "src").as_posix())
 
-import asyncio
 import config as cfg
 from utils.s3_utils import S3Utils
 import gradio as gr
-from application.rag_service.build_index import build_index
+from application.rag_service.build_index import build_index, category_index
+from application.rag_service.instrumentation import setup_instrumentation
 from application.rag_service.rag_pipeline import rag_pipe
+from utils.metrics import start_metrics_server
 
 s3_utils = S3Utils(
     bucket_name=cfg.app.s3.bucket_name, region_name=cfg.app.s3.region_name
@@ -28,6 +29,11 @@ def create_interface():
                     placeholder="Ask a question about your documents...",
                     lines=2,
                 )
+                category_input = gr.Dropdown(
+                    choices=sorted(set(category_index.values())),
+                    label="Categories (optional)",
+                    multiselect=True,
+                )
                 query_button = gr.Button("Ask")
                 response_output = gr.Textbox(
                     label="Response", interactive=False, lines=10
@@ -61,16 +67,22 @@ def create_interface():
                     outputs=[file_content_output],
                 )
 
-        def query_documents(query):
+        async def query_documents(query, categories):
+            response = ""
+            source_documents = []
             try:
-                result = asyncio.run(rag_pipe.predict(query))
-                response = result["response"]
-                source_documents = list(result.get("source_documents", []))
+                async for chunk in rag_pipe.astream(query, categories):
+                    if "token" in chunk:
+                        response += chunk["token"]
+                        # Stream partial text, keep the source documents untouched
+                        yield response, gr.skip()
+                    else:
+                        source_documents = list(chunk["source_documents"])
                 # Update the file_dropdown choices with the new source documents
                 file_dropdown.choices = source_documents
-                return response, source_documents
+                yield response, source_documents
             except Exception as e:
-                return f"Error processing query: {str(e)}", []
+                yield f"Error processing query: {str(e)}", []
 
         # Add a hidden output for source documents to update the dropdown choices
         source_docs_output = gr.State([])
@@ -81,7 +93,7 @@ def create_interface():
 
         query_button.click(
             query_documents,
-            inputs=[query_input],
+            inputs=[query_input, category_input],
             outputs=[response_output, source_docs_output],
         )
 
@@ -94,6 +106,9 @@ def create_interface():
 
 def main():
     """Main function to launch the Gradio interface."""
+    if cfg.app.metrics.enabled:
+        setup_instrumentation()
+        start_metrics_server(port=cfg.app.metrics.port, host=cfg.app.metrics.host)
     build_index(
         model_provider=cfg.app.model.provider,
         model_name=cfg.app.model.name,
@@ -101,6 +116,9 @@ def main():
         vector_db=cfg.app.vector_db.name,
     )
     iface = create_interface()
+    # Async handlers all run on Gradio's event loop, so cached engines and
+    # their client connection pools are shared by concurrent requests.
+    iface.queue(default_concurrency_limit=cfg.app.gradio.concurrency_limit)
     iface.launch()
 
 
@@ -0,0 +1,86 @@
+import hashlib
+import json
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+
+def hash_obj(obj: Any) -> str:
+    """
+    Short, stable fingerprint of a JSON-serializable object.
+    """
+    payload = json.dumps(obj, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+class EvalCheckpoint:
+    """
+    Append-only JSONL store of evaluation predictions and scores.
+
+    Each line is one record keyed by (row hash, config hash, name): `name`
+    is "prediction" for a pipeline output, or the scorer name for a score.
+    Records are written and flushed as soon as they are produced, so a
+    crashed or throttled run loses at most the rows in flight; on rerun the
+    stored records are loaded and only missing ones are computed. Later
+    records win, so re-scoring simply appends.
+
+    A checkpoint file must only be written by one process at a time.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._records: Dict[Tuple[str, str, str], Any] = {}
+        self._needs_newline = False
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self) -> None:
+        if not self.path.exists():
+            return
+        with open(self.path, encoding="utf-8") as f:
+            for line_number, line in enumerate(f, start=1):
+                self._needs_newline = not line.endswith("\n")
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # A run killed mid-write leaves a truncated last line.
+                    logger.warning(f"Skipping bad record {self.path}:{line_number}")
+                    continue
+                key = (record["row"], record["config"], record["name"])
+                self._records[key] = record["value"]
+        logger.info(f"Loaded {len(self._records)} eval records from {self.path}")
+
+    def get(self, row: str, config: str, name: str) -> Optional[Any]:
+        with self._lock:
+            value = self._records.get((row, config, name))
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return value
+
+    def put(self, row: str, config: str, name: str, value: Any) -> None:
+        record = {"row": row, "config": config, "name": name, "value": value}
+        line = json.dumps(record, default=str) + "\n"
+        with self._lock:
+            if self._needs_newline:
+                line = "\n" + line
+                self._needs_newline = False
+            self._records[(row, config, name)] = value
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._records),
+            }
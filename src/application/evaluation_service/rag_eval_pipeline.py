@@ -2,81 +2,213 @@ import asyncio
 import weave
 import config as cfg
 import logging
-import os
 import statistics as stats
-from llama_index.llms.bedrock import Bedrock
+from typing import Any, Awaitable, Callable, Dict, List, Optional, TypeVar
+from pydantic import PrivateAttr
 from llama_index.core.evaluation import (
     FaithfulnessEvaluator,
     RelevancyEvaluator,
     CorrectnessEvaluator,
 )
 
-from async_rag_pipeline import AsyncRagPipeline
+from llm.base import set_model
+from application.rag_service.rag_pipeline import RagPipeline
+from application.evaluation_service.eval_checkpoint import EvalCheckpoint, hash_obj
 
 logger = logging.getLogger("ragpipeline")
 logging.basicConfig(level=logging.INFO)
 
+T = TypeVar("T")
 
-class RagEvalPipeline:
-    def __init__(self, eval_gold_qa, model_provider):
-        self.rag_pipe = AsyncRagPipeline(model_provider=model_provider)
-        self.eval_gold_qa = eval_gold_qa
-        self.model_provider = model_provider
 
-    @staticmethod
-    def set_llm_judge():
-        llm_model_id = cfg.app.eval.llm_model_id
-        region_name = cfg.app.eval.region
-        context_size = cfg.app.eval.context_size
-        temperature = cfg.app.eval.temperature
-        aws_session_token = os.environ["AWS_BEARER_TOKEN_BEDROCK"]
-
-        llm_judge = Bedrock(
-            model=llm_model_id,
-            region_name=region_name,
-            aws_session_token=aws_session_token,
-            temperature=temperature,
-            context_size=context_size,
+class EvalRagPipeline(RagPipeline):
+    _checkpoint: Optional[EvalCheckpoint] = PrivateAttr(default=None)
+
+    def set_checkpoint(self, checkpoint: Optional[EvalCheckpoint]) -> None:
+        self._checkpoint = checkpoint
+
+    def config_hash(self) -> str:
+        return hash_obj(
+            [self.engine_key(), self.temperature, self.get_collection_version()]
         )
-        return llm_judge
 
     @weave.op()
-    def correctness_evaluator(query: str, ground_truth: str, output: dict):
-        llm_judge = RagEvalPipeline.set_llm_judge()
-        evaluator = CorrectnessEvaluator(llm=llm_judge)
-        result = evaluator.evaluate(
-            query=query, reference=ground_truth, response=output["response"]
+    async def predict(self, query: str):
+        checkpoint = self._checkpoint
+        if checkpoint is not None:
+            row, config = hash_obj(query), self.config_hash()
+            cached = checkpoint.get(row, config, "prediction")
+            if cached is not None:
+                return cached
+        output = await self.eval_apredict(query)
+        # Only the JSON-serializable parts are kept, so outputs can be stored.
+        output = {"response": output["response"], "contexts": output["contexts"]}
+        if checkpoint is not None:
+            checkpoint.put(row, config, "prediction", output)
+        return output
+
+
+class LLMJudge:
+    """
+    One judge LLM client and its evaluators, shared by every scorer and row
+    of an evaluation run. `run` caps the judge calls in flight across all
+    scorers with a semaphore.
+    """
+
+    def __init__(self, max_concurrency: int, eval_model=cfg.app.model_eval):
+        self.llm = set_model(
+            model_provider=eval_model.provider,
+            model_name=eval_model.name,
+            model_type=eval_model.type,
+        )["llm"]
+        self.correctness = CorrectnessEvaluator(llm=self.llm)
+        self.relevancy = RelevancyEvaluator(llm=self.llm)
+        self.faithfulness = FaithfulnessEvaluator(llm=self.llm)
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def run(self, func: Callable[[], Awaitable[T]]) -> T:
+        async with self.semaphore:
+            return await func()
+
+
+class RagEvalPipeline:
+    """
+    Checkpointed evaluation of a RagPipeline over the gold QA dataset.
+
+    Predictions and scores are stored per row in an EvalCheckpoint as they
+    complete. Predictions are keyed by the pipeline config (engine key,
+    temperature and collection version) and scores additionally by the
+    judge model, so a rerun only computes what is missing or stale. With
+    `rescore`, stored predictions are reused and every row is scored again.
+    """
+
+    def __init__(
+        self,
+        eval_gold_qa,
+        model_provider,
+        model_name=cfg.app.model.name,
+        eval_model=cfg.app.model_eval,
+    ):
+        self.rag_pipe = EvalRagPipeline(
+            model_provider=model_provider,
+            model_name=model_name,
+            vector_db=cfg.app.vector_db.name,
+            similarity_top_k=cfg.vector_db.retriever.similarity_top_k,
+            retrieval_mode=cfg.vector_db.retriever.mode,
         )
-        return {"correctness": float(result.score)}
+        self.eval_gold_qa = eval_gold_qa
+        self.model_provider = model_provider
+        self.eval_model = eval_model
+        self.judge: Optional[LLMJudge] = None
+        self.checkpoint: Optional[EvalCheckpoint] = None
+        self.score_config: Optional[str] = None
+        self.rescore = False
 
-    @weave.op()
-    def relevancy_evaluator(query: str, ground_truth: str, output: dict):
-        llm_judge = RagEvalPipeline.set_llm_judge()
-        evaluator = RelevancyEvaluator(llm=llm_judge)
-        eval_source_results = [
-            evaluator.evaluate(
-                query=query, contexts=[context], response=output["response"]
+    def set_llm_judge(self) -> LLMJudge:
+        if self.judge is None:
+            self.judge = LLMJudge(cfg.app.model_eval.max_concurrency, self.eval_model)
+        return self.judge
+
+    async def score(
+        self,
+        name: str,
+        query: str,
+        ground_truth: str,
+        compute: Callable[[], Awaitable[Dict[str, Any]]],
+    ) -> Dict[str, Any]:
+        if self.checkpoint is None:
+            return await compute()
+        row = hash_obj([query, ground_truth])
+        if not self.rescore:
+            cached = self.checkpoint.get(row, self.score_config, name)
+            if cached is not None:
+                return cached
+        result = await compute()
+        self.checkpoint.put(row, self.score_config, name, result)
+        return result
+
+    async def correctness(self, query: str, ground_truth: str, output: dict):
+        judge = self.set_llm_judge()
+
+        async def compute():
+            result = await judge.run(
+                lambda: judge.correctness.aevaluate(
+                    query=query, reference=ground_truth, response=output["response"]
+                )
             )
-            for context in output["contexts"]
-        ]
-        eval_source_result = [
-            1 if result.passing else 0 for result in eval_source_results
-        ]
-        return {"relevancy": stats.mean(eval_source_result)}
+            return {"correctness": float(result.score)}
 
-    @weave.op()
-    def faithfullness_evaluator(query: str, ground_truth: str, output: dict):
-        llm_judge = RagEvalPipeline.set_llm_judge()
-        evaluator = FaithfulnessEvaluator(llm=llm_judge)
-        result = evaluator.evaluate_response(response=output["full_response"])
-        return {"faithfullness": 1 if result.passing else 0}
-
-    def evaluate(self):
-        scorers = [
-            self.correctness_evaluator,
-            self.relevancy_evaluator,
-            self.faithfullness_evaluator,
-        ]
-        evaluation = weave.Evaluation(dataset=self.eval_gold_qa, scorers=scorers)
+        return await self.score("correctness", query, ground_truth, compute)
+
+    async def relevancy(self, query: str, ground_truth: str, output: dict):
+        judge = self.set_llm_judge()
+
+        async def evaluate_context(context: str):
+            return await judge.run(
+                lambda: judge.relevancy.aevaluate(
+                    query=query, contexts=[context], response=output["response"]
+                )
+            )
+
+        async def compute():
+            eval_source_results = await asyncio.gather(
+                *(evaluate_context(context) for context in output["contexts"])
+            )
+            eval_source_result = [
+                1 if result.passing else 0 for result in eval_source_results
+            ]
+            return {"relevancy": stats.mean(eval_source_result or [0])}
+
+        return await self.score("relevancy", query, ground_truth, compute)
+
+    async def faithfullness(self, query: str, ground_truth: str, output: dict):
+        judge = self.set_llm_judge()
+
+        async def compute():
+            result = await judge.run(
+                lambda: judge.faithfulness.aevaluate(
+                    query=query,
+                    response=output["response"],
+                    contexts=output["contexts"],
+                )
+            )
+            return {"faithfullness": 1 if result.passing else 0}
+
+        return await self.score("faithfullness", query, ground_truth, compute)
+
+    def scorers(self) -> List[Callable]:
+        """
+        Weave scorers of this run. Weave calls scorers as plain functions, not
+        methods, so each op closes over the pipeline instead.
+        """
+
+        @weave.op()
+        async def correctness_evaluator(query: str, ground_truth: str, output: dict):
+            return await self.correctness(query, ground_truth, output)
+
+        @weave.op()
+        async def relevancy_evaluator(query: str, ground_truth: str, output: dict):
+            return await self.relevancy(query, ground_truth, output)
+
+        @weave.op()
+        async def faithfullness_evaluator(query: str, ground_truth: str, output: dict):
+            return await self.faithfullness(query, ground_truth, output)
+
+        return [correctness_evaluator, relevancy_evaluator, faithfullness_evaluator]
+
+    def evaluate(self, rescore: bool = False):
+        eval_cfg = self.eval_model
+        # One judge client per run, built before the rows fan out.
+        self.judge = LLMJudge(cfg.app.model_eval.max_concurrency, eval_cfg)
+        self.checkpoint = EvalCheckpoint(
+            cfg.path.data.cache / "eval" / "checkpoint.jsonl"
+        )
+        self.rag_pipe.set_checkpoint(self.checkpoint)
+        self.score_config = hash_obj(
+            [self.rag_pipe.config_hash(), eval_cfg.provider, eval_cfg.name]
+        )
+        self.rescore = rescore
+        evaluation = weave.Evaluation(dataset=self.eval_gold_qa, scorers=self.scorers())
         eval_full_results = asyncio.run(evaluation.evaluate(self.rag_pipe))
+        logger.info(f"Eval checkpoint: {self.checkpoint.stats()}")
         return eval_full_results
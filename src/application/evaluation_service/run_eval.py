@@ -3,6 +3,7 @@ import nest_asyncio
 nest_asyncio.apply()
 
 import sys
+import types
 import config as cfg
 from dotenv import load_dotenv
 from rag_eval_pipeline import RagEvalPipeline
@@ -10,14 +11,28 @@ from utils import load_obj
 
 load_dotenv()
 
-model_provider = "aws"
-if len(sys.argv) > 1:
-    if sys.argv[1] == "--gemini":
-        model_provider = "gemini"
+model_provider = cfg.app.model.provider
+model_name = cfg.app.model.name
+if "--gemini" in sys.argv:
+    model_provider = "gemini"
+    model_name = "gemini-1.5-flash"
+eval_model = cfg.app.model_eval
+# Offline run: local stand-ins for both the pipeline and the judge.
+if "--local" in sys.argv:
+    model_provider = "local"
+    model_name = "local-llm"
+    eval_model = types.SimpleNamespace(
+        provider="local", name="local-judge", type="llm_eval"
+    )
+# Re-score stored predictions, e.g. after changing a scorer.
+rescore = "--rescore" in sys.argv
 
 eval_gold_qa = load_obj(cfg.path.data.processed / "evaluation_gold_qa_dataset.pkl")
 
 rag_eval_pipe = RagEvalPipeline(
-    eval_gold_qa=eval_gold_qa, model_provider=model_provider
+    eval_gold_qa=eval_gold_qa,
+    model_provider=model_provider,
+    model_name=model_name,
+    eval_model=eval_model,
 )
-rag_eval_pipe.evaluate()
+rag_eval_pipe.evaluate(rescore=rescore)
@@ -1,25 +1,34 @@
 import config as cfg
 import pandas as pd
+from functools import partial
 from pathlib import Path
-from llama_index.core import (
-    VectorStoreIndex,
-    SimpleDirectoryReader,
-    StorageContext,
-    Settings,
-)
-from llama_index.core.node_parser import MarkdownNodeParser
+from llama_index.core import Settings
 from utils.logger import setup_logger
 from utils.file_utils import load_obj
-from typing import Any, Dict, List, Union
+from utils.async_utils import aiter_in_thread, run_sync
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Union
 
 from llm.base import set_model
-from vector_database.base import set_vector_store
-from vector_database.qdrant_vector_db_client import (
-    initialize_qdrant,
-    check_collection_exists,
-    get_qdrant_url,
-    get_collection_name,
+from vector_database.base import (
+    collection_exists,
+    ensure_payload_indexes,
+    set_vector_store,
+)
+from application.rag_service.embedding_pipeline import EmbeddingPipeline
+from application.rag_service import document_loader
+from application.rag_service.document_loader import (
+    FileNodes,
+    file_metadata,
+    iter_file_nodes,
+)
+from application.rag_service.index_manifest import (
+    diff_nodes,
+    hash_file,
+    hash_node,
+    load_manifest,
+    save_manifest,
 )
+from vector_database.qdrant_vector_db_client import get_collection_name
 
 logger = setup_logger(__name__)
 
@@ -28,23 +37,39 @@ category_files_df = load_obj(
 )
 
 
-def get_category(df: pd.DataFrame, path: Union[Path, str]) -> str:
+def build_category_index(df: pd.DataFrame) -> Dict[str, str]:
     """
-    Retrieve the category for a given file path from the dataframe.
+    Build a path -> category lookup table from the category dataframe.
 
     Args:
             df (pd.DataFrame): DataFrame containing 'path' and 'category' columns.
-            path (Union[Path, str]): The file path to look up.
 
     Returns:
-            str: The category associated with the file path.
+            Dict[str, str]: Mapping of POSIX file path to category.
+    """
+    paths = [Path(path).as_posix() for path in df.path]
+    return dict(zip(paths, df.category))
+
+
+category_index = build_category_index(category_files_df)
+
+
+def get_category(path: Union[Path, str], index: Optional[Dict[str, str]] = None) -> str:
+    """
+    Retrieve the category for a given file path from the category index.
+
+    Args:
+            path (Union[Path, str]): The file path to look up.
+            index (Dict[str, str], optional): Path -> category table. Defaults to
+                    the module-level index built from category_files_df.
 
-    Raises:
-            IndexError: If the path is not found in the DataFrame.
+    Returns:
+            str: The category associated with the file path, or UNKNOWN_CATEGORY
+                    if the path is not in the index.
     """
-    category = df[df.path == Path(path)]["category"].values[0]
-    logger.debug(f"Category for {path}: {category}")
-    return category
+    return document_loader.get_category(
+        path, category_index if index is None else index
+    )
 
 
 def get_metadata(file_path: Union[Path, str]) -> Dict[str, str]:
@@ -57,13 +82,28 @@ def get_metadata(file_path: Union[Path, str]) -> Dict[str, str]:
     Returns:
             Dict[str, str]: Metadata including file name and category.
     """
-    file_path = Path(file_path)
-    meta = {
-        "file_name": file_path.name,
-        "category": get_category(category_files_df, file_path),
-    }
-    logger.debug(f"Metadata for {file_path}: {meta}")
-    return meta
+    return file_metadata(file_path, category_index)
+
+
+def iter_node_batches(paths: List[Union[Path, str]]) -> Iterator[List[FileNodes]]:
+    """
+    Stream parsed nodes for the given files, one batch per parser task.
+
+    Args:
+            paths (List[Union[Path, str]]): Files to load and parse.
+
+    Yields:
+            List[FileNodes]: (POSIX file path, parsed nodes) pairs.
+    """
+    loader_cfg = cfg.app.index.loader
+    yield from iter_file_nodes(
+        paths,
+        # A plain dict, so parser workers never import this module.
+        file_metadata=partial(file_metadata, category_index=category_index),
+        files_per_task=loader_cfg.files_per_task,
+        max_workers=loader_cfg.max_workers,
+        max_pending_tasks=loader_cfg.max_pending_tasks,
+    )
 
 
 def get_nodes(df: pd.DataFrame) -> List[Any]:
@@ -78,21 +118,117 @@ def get_nodes(df: pd.DataFrame) -> List[Any]:
     """
     logger.info("Loading documents and parsing nodes...")
     paths = df.path.tolist()
-    docs = SimpleDirectoryReader(
-        input_files=paths, file_metadata=get_metadata
-    ).load_data()
-    parser = MarkdownNodeParser()
-    nodes = parser.get_nodes_from_documents(docs)
+    nodes = [
+        node
+        for batch in iter_node_batches(paths)
+        for _, path_nodes in batch
+        for node in path_nodes
+    ]
     logger.info(f"Parsed {len(nodes)} nodes from {len(paths)} documents.")
     return nodes
 
 
-def set_models(model_provider: str, model_name: str, model_type: str) -> None:
+def set_models(model_provider: str, model_name: str, model_type: str) -> Dict:
     models = set_model(
         model_provider=model_provider, model_name=model_name, model_type=model_type
     )
     Settings.llm = models["llm"]
     Settings.embed_model = models["embed_model"]
+    return models
+
+
+async def aiter_node_batches(
+    paths: List[Union[Path, str]],
+) -> AsyncIterator[List[FileNodes]]:
+    """
+    Async view of iter_node_batches that waits for the parser pool off-loop,
+    so in-flight embedding batches keep upserting while parsing continues.
+    """
+    async for batch in aiter_in_thread(iter_node_batches(paths)):
+        yield batch
+
+
+def get_embedding_pipeline(
+    embed_model: Any, vector_store: Any, model_provider: str
+) -> EmbeddingPipeline:
+    embed_cfg = cfg.app.index.embedding
+    return EmbeddingPipeline(
+        embed_model=embed_model,
+        vector_store=vector_store,
+        batch_size=embed_cfg.batch_size,
+        max_concurrency=getattr(embed_cfg.max_concurrency, model_provider),
+    )
+
+
+async def afull_reindex(
+    pipeline: EmbeddingPipeline, collection_name: str, paths: List[Any]
+) -> None:
+    """
+    Re-embed every file into a fresh collection and rewrite its manifest.
+    """
+    logger.info(f"Building a new index for collection {collection_name}.")
+    files = {}
+    async with pipeline:
+        async for batch in aiter_node_batches(paths):
+            nodes = []
+            for path, path_nodes in batch:
+                files[path] = {
+                    "hash": hash_file(path, get_metadata(path)),
+                    "nodes": {node.node_id: hash_node(node) for node in path_nodes},
+                }
+                nodes.extend(path_nodes)
+            await pipeline.add(nodes)
+    logger.info(f"Indexed {pipeline.n_embedded} nodes from {len(paths)} documents.")
+    save_manifest(collection_name, files)
+
+
+async def aincremental_reindex(
+    pipeline: EmbeddingPipeline,
+    collection_name: str,
+    paths: List[Any],
+    manifest: Dict,
+) -> None:
+    """
+    Embed only new or changed nodes and delete points of removed content.
+
+    Files are compared to the manifest by content hash; only changed files
+    are parsed, and within them only nodes whose fingerprint (content and
+    neighbour links) is new are embedded. Points of nodes that disappeared, or whose files were removed,
+    are deleted from the collection.
+    """
+    files = manifest["files"]
+    current = {Path(path).as_posix(): path for path in paths}
+    file_hashes = {path: hash_file(path, get_metadata(path)) for path in current}
+    changed = [
+        current[path]
+        for path, file_hash in file_hashes.items()
+        if files.get(path, {}).get("hash") != file_hash
+    ]
+    removed = [path for path in files if path not in current]
+    logger.info(
+        f"Incremental reindex: {len(changed)} changed/new files, "
+        f"{len(removed)} removed files, {len(paths) - len(changed)} unchanged."
+    )
+
+    to_delete = []
+    async with pipeline:
+        async for batch in aiter_node_batches(changed):
+            to_add = []
+            for path, path_nodes in batch:
+                old_nodes = files.get(path, {}).get("nodes", {})
+                added, deleted, new_nodes = diff_nodes(old_nodes, path_nodes)
+                to_add.extend(added)
+                to_delete.extend(deleted)
+                files[path] = {"hash": file_hashes[path], "nodes": new_nodes}
+            await pipeline.add(to_add)
+    for path in removed:
+        to_delete.extend(files.pop(path)["nodes"])
+
+    if to_delete:
+        logger.info(f"Deleting {len(to_delete)} stale nodes.")
+        pipeline.vector_store.delete_nodes(node_ids=to_delete)
+    logger.info(f"Embedded {pipeline.n_embedded} new or changed nodes.")
+    save_manifest(collection_name, files)
 
 
 def build_index(
@@ -101,48 +237,55 @@ def build_index(
     model_type: str,
     vector_db: str,
     force_reindex: bool = False,
+    incremental: bool = False,
 ) -> None:
     """
-    Build or load a VectorStoreIndex from Qdrant, setting up the LLM and embedding model.
+    Build or load a VectorStoreIndex in the vector database, setting up the LLM and embedding model.
 
     Args:
-            vector_store (QdrantVectorStore): The vector store instance.
-            nodes (List[Any]): List of nodes to index.
-            model_provider (str, optional): Model provider, "aws" or "gemini". Defaults to "aws".
-            force_reindex (bool, optional): If True, force reindexing. Defaults to False.
-
-    Returns:
-            VectorStoreIndex: The index instance.
+            model_provider (str): Model provider, "aws", "gemini" or "local".
+            model_name (str): LLM name in config/model.yaml.
+            model_type (str): LLM type in config/model.yaml.
+            vector_db (str): Vector database name, "qdrant" or "numpy".
+            force_reindex (bool, optional): If True, drop the collection and re-embed
+                    every file. Defaults to False.
+            incremental (bool, optional): If True and the collection has a manifest,
+                    only embed new or changed content and delete removed content.
+                    Defaults to False.
     """
 
     logger.info(
-        f"Building index with model provider: {model_provider}, force_reindex={force_reindex}"
+        f"Building index with model provider: {model_provider}, "
+        f"force_reindex={force_reindex}, incremental={incremental}"
     )
-    nodes = get_nodes(category_files_df)
-    url = get_qdrant_url()
-    vector_db_client = initialize_qdrant(url=url)
     collection_name = get_collection_name(model_provider)
-    collections_exists = check_collection_exists(
-        client=vector_db_client, collection_name=collection_name
+    collections_exists = collection_exists(
+        vector_db=vector_db, model_provider=model_provider
     )
     vector_store = set_vector_store(
         vector_db=vector_db, model_provider=model_provider, async_mode=False
     )
 
     # Setup LLM llamaindex settings
-    set_models(
+    models = set_models(
         model_name=model_name, model_provider=model_provider, model_type=model_type
     )
+    pipeline = get_embedding_pipeline(
+        models["embed_model"], vector_store, model_provider
+    )
 
-    if not force_reindex and collections_exists:
-        logger.info("Index already exists. Loading from Qdrant.")
+    paths = category_files_df.path.tolist()
+    manifest = load_manifest(collection_name) if collections_exists else None
+    if collections_exists and not force_reindex:
+        # New collections get payload indexes on creation; older ones get them here.
+        ensure_payload_indexes(vector_db=vector_db, model_provider=model_provider)
+    if collections_exists and not force_reindex and not incremental:
+        logger.info(f"Index already exists. Loading from {vector_db}.")
+    elif collections_exists and not force_reindex and manifest is not None:
+        run_sync(aincremental_reindex(pipeline, collection_name, paths, manifest))
     else:
-        logger.info("Building a new index in Qdrant.")
-        storage_context = StorageContext.from_defaults(
-            vector_store=vector_store,
-        )
-        index = VectorStoreIndex(
-            nodes,
-            storage_context=storage_context,
-            show_progress=True,
-        )
+        if collections_exists:
+            if incremental:
+                logger.info("No index manifest found, falling back to a full reindex.")
+            vector_store.clear()
+        run_sync(afull_reindex(pipeline, collection_name, paths))
@@ -0,0 +1,217 @@
+import re
+import zlib
+from typing import ClassVar, Dict, List, Optional
+
+import numpy as np
+from llama_index.core.bridge.pydantic import Field, PrivateAttr
+from llama_index.core.instrumentation import get_dispatcher
+from llama_index.core.postprocessor.types import BaseNodePostprocessor
+from llama_index.core.schema import MetadataMode, NodeWithScore, QueryBundle
+
+from utils.logger import setup_logger
+from utils.token_counter import TOKEN_COUNT_KEY, TokenCounter, get_token_counter
+
+logger = setup_logger(__name__)
+dispatcher = get_dispatcher(__name__)
+
+WORD_PATTERN = re.compile(r"\w+")
+
+
+def shingle_hashes(text: str, size: int) -> np.ndarray:
+    words = WORD_PATTERN.findall(text.lower())
+    if len(words) <= size:
+        shingles = [" ".join(words)]
+    else:
+        shingles = [" ".join(words[i : i + size]) for i in range(len(words) - size + 1)]
+    return np.fromiter(
+        (zlib.crc32(shingle.encode("utf-8")) for shingle in set(shingles)),
+        dtype=np.uint64,
+    )
+
+
+class MinHasher:
+    """
+    MinHash signatures over word shingles.
+
+    Each permutation is a multiply-shift hash `(a * x + b) mod 2**64 >> 32`
+    of the shingle's CRC32, computed with wrapping uint64 arithmetic. The
+    fraction of equal signature slots between two texts estimates the
+    Jaccard similarity of their shingle sets.
+    """
+
+    def __init__(self, num_perm: int = 64, shingle_size: int = 5, seed: int = 0):
+        rng = np.random.default_rng(seed)
+        self.shingle_size = shingle_size
+        max_value = np.iinfo(np.uint64).max
+        self.a = rng.integers(0, max_value, size=num_perm, dtype=np.uint64) | 1
+        self.b = rng.integers(0, max_value, size=num_perm, dtype=np.uint64)
+
+    def signature(self, text: str) -> np.ndarray:
+        hashes = shingle_hashes(text, self.shingle_size)[:, None]
+        permuted = (hashes * self.a + self.b) >> np.uint64(32)
+        return permuted.min(axis=0)
+
+    @staticmethod
+    def similarity(first: np.ndarray, second: np.ndarray) -> float:
+        return float((first == second).mean())
+
+
+class ContextAssembler(BaseNodePostprocessor):
+    """
+    Deduplicate, merge and trim retrieved nodes to a token budget.
+
+    1. Nodes whose MinHash similarity to a higher-scored node reaches
+       `dedup_threshold` are dropped; MarkdownNodeParser emits nested
+       headings as near-identical sections.
+    2. Nodes that are consecutive sections of the same file (linked by the
+       parser's prev/next relationships) are merged into one node.
+    3. Nodes are kept best-first until `max_tokens` is used; the first node
+       that does not fit is truncated to the remaining budget.
+    """
+
+    max_tokens: int = Field(description="Token budget for the context.")
+    dedup_threshold: float = 0.8
+    num_perm: int = 64
+    shingle_size: int = 5
+    merge_adjacent: bool = True
+    min_tokens: int = Field(
+        default=64, description="Smallest truncated node worth keeping."
+    )
+
+    # Stage name under which the span on `_postprocess_nodes` is profiled.
+    profile_stage: ClassVar[str] = "assemble"
+
+    _token_counter: TokenCounter = PrivateAttr()
+
+    def __init__(self, token_counter: Optional[TokenCounter] = None, **kwargs):
+        super().__init__(**kwargs)
+        self._token_counter = token_counter or get_token_counter()
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "ContextAssembler"
+
+    @staticmethod
+    def node_text(node: NodeWithScore) -> str:
+        return node.node.get_content(metadata_mode=MetadataMode.NONE)
+
+    def with_content(
+        self, node: NodeWithScore, text: str, tokens: int, score: Optional[float]
+    ) -> NodeWithScore:
+        copy = node.node.model_copy()
+        copy.metadata = {**copy.metadata, TOKEN_COUNT_KEY: tokens}
+        for excluded in ("excluded_embed_metadata_keys", "excluded_llm_metadata_keys"):
+            keys = getattr(copy, excluded)
+            if TOKEN_COUNT_KEY not in keys:
+                setattr(copy, excluded, [*keys, TOKEN_COUNT_KEY])
+        copy.set_content(text)
+        return NodeWithScore(node=copy, score=score)
+
+    def count_tokens(self, node: NodeWithScore) -> int:
+        """
+        Tokens the node takes in the prompt: its text count (stored at index
+        time) plus its LLM-visible metadata.
+        """
+        metadata = node.node.get_metadata_str(mode=MetadataMode.LLM)
+        return self._token_counter.count_node(node.node) + self._token_counter.count(
+            metadata
+        )
+
+    def deduplicate(self, nodes: List[NodeWithScore]) -> List[NodeWithScore]:
+        hasher = MinHasher(num_perm=self.num_perm, shingle_size=self.shingle_size)
+        kept, signatures = [], []
+        for node in sorted(nodes, key=lambda node: node.score or 0.0, reverse=True):
+            signature = hasher.signature(self.node_text(node))
+            if any(
+                hasher.similarity(signature, other) >= self.dedup_threshold
+                for other in signatures
+            ):
+                continue
+            kept.append(node)
+            signatures.append(signature)
+        if len(kept) < len(nodes):
+            logger.debug(f"Dropped {len(nodes) - len(kept)} near-duplicate nodes")
+        return kept
+
+    def merge_adjacent_nodes(self, nodes: List[NodeWithScore]) -> List[NodeWithScore]:
+        by_id: Dict[str, NodeWithScore] = {node.node.node_id: node for node in nodes}
+
+        def previous(node: NodeWithScore) -> Optional[NodeWithScore]:
+            prev_node = node.node.prev_node
+            candidate = by_id.get(prev_node.node_id) if prev_node else None
+            if candidate is None:
+                return None
+            same_file = candidate.node.metadata.get("file_name") == (
+                node.node.metadata.get("file_name")
+            )
+            return candidate if same_file else None
+
+        chains: Dict[str, List[NodeWithScore]] = {}
+        for node in nodes:
+            head = node
+            while (prev := previous(head)) is not None and prev is not node:
+                head = prev
+            chains.setdefault(head.node.node_id, []).append(node)
+
+        merged = []
+        for head_id, chain in chains.items():
+            if len(chain) == 1:
+                merged.append(chain[0])
+                continue
+            ordered = [by_id[head_id]]
+            members = {member.node.node_id for member in chain}
+            while len(ordered) < len(chain):
+                next_node = ordered[-1].node.next_node
+                if next_node is None or next_node.node_id not in members:
+                    break
+                ordered.append(by_id[next_node.node_id])
+            ordered.extend(member for member in chain if member not in ordered)
+            merged.append(
+                self.with_content(
+                    ordered[0],
+                    "\n\n".join(self.node_text(member) for member in ordered),
+                    sum(self._token_counter.count_node(m.node) for m in ordered),
+                    max(member.score or 0.0 for member in ordered),
+                )
+            )
+        merged.sort(key=lambda node: node.score or 0.0, reverse=True)
+        return merged
+
+    def trim(self, nodes: List[NodeWithScore]) -> List[NodeWithScore]:
+        kept, used = [], 0
+        for node in nodes:
+            tokens = self.count_tokens(node)
+            if used + tokens <= self.max_tokens:
+                kept.append(node)
+                used += tokens
+                continue
+            # The metadata is kept whole, so only the text absorbs the cut.
+            text_tokens = self._token_counter.count_node(node.node)
+            text_budget = self.max_tokens - used - (tokens - text_tokens)
+            if text_budget >= self.min_tokens or not kept:
+                # Cut by the text's own chars-per-token ratio, then count the
+                # text that is kept.
+                content = self.node_text(node)
+                n_chars = len(content) * max(text_budget, 0) // max(text_tokens, 1)
+                text = content[:n_chars]
+                kept.append(
+                    self.with_content(
+                        node, text, self._token_counter.count(text), node.score
+                    )
+                )
+            break
+        return kept
+
+    @dispatcher.span
+    def _postprocess_nodes(
+        self,
+        nodes: List[NodeWithScore],
+        query_bundle: Optional[QueryBundle] = None,
+    ) -> List[NodeWithScore]:
+        n_nodes = len(nodes)
+        nodes = self.deduplicate(nodes)
+        if self.merge_adjacent:
+            nodes = self.merge_adjacent_nodes(nodes)
+        nodes = self.trim(nodes)
+        logger.debug(f"Assembled {len(nodes)} context nodes from {n_nodes}")
+        return nodes
@@ -0,0 +1,142 @@
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+from llama_index.core import SimpleDirectoryReader
+from llama_index.core.node_parser import MarkdownNodeParser
+from llama_index.core.schema import BaseNode
+
+from application.rag_service.index_manifest import fingerprint_nodes
+from utils.logger import setup_logger
+from utils.token_counter import get_token_counter
+
+logger = setup_logger(__name__)
+
+FileNodes = Tuple[str, List[BaseNode]]
+
+UNKNOWN_CATEGORY = "unknown"
+
+
+def get_category(path: Union[Path, str], category_index: Dict[str, str]) -> str:
+    """
+    Look up the category of a file path in a path -> category table.
+
+    Args:
+            path (Union[Path, str]): The file path to look up.
+            category_index (Dict[str, str]): POSIX file path -> category.
+
+    Returns:
+            str: The category of the file, or UNKNOWN_CATEGORY if it is not listed.
+    """
+    category = category_index.get(Path(path).as_posix())
+    if category is None:
+        logger.warning(f"No category found for {path}, using '{UNKNOWN_CATEGORY}'")
+        return UNKNOWN_CATEGORY
+    return category
+
+
+def file_metadata(
+    file_path: Union[Path, str], category_index: Dict[str, str]
+) -> Dict[str, str]:
+    """
+    Metadata attached to every node of a file: its name and category.
+
+    Bind `category_index` with functools.partial to get the `file_metadata`
+    callback of iter_file_nodes. Only this module and the plain dict are
+    pickled to the parser workers.
+    """
+    file_path = Path(file_path)
+    return {
+        "file_name": file_path.name,
+        "category": get_category(file_path, category_index),
+    }
+
+
+def parse_files(
+    paths: List[Union[Path, str]],
+    file_metadata: Callable[[str], Dict[str, Any]],
+    exact: bool = False,
+) -> List[FileNodes]:
+    """
+    Load and parse a chunk of markdown files into nodes.
+
+    Runs inside a worker process. Nodes get deterministic, content-derived
+    ids (see index_manifest) so the same section maps to the same vector
+    store point across builds, and their token count is stored in metadata
+    so the request path never re-tokenizes them.
+
+    Args:
+            paths (List[Union[Path, str]]): Files to load and parse.
+            file_metadata (Callable[[str], Dict[str, Any]]): Metadata callback
+                    passed to SimpleDirectoryReader. Must be picklable.
+            exact (bool, optional): Count tokens with the tokenizer. Defaults to False.
+
+    Returns:
+            List[FileNodes]: (POSIX file path, parsed nodes) pairs.
+    """
+    parser = MarkdownNodeParser()
+    token_counter = get_token_counter(exact=exact)
+    file_nodes = []
+    for path in paths:
+        docs = SimpleDirectoryReader(
+            input_files=[path], file_metadata=file_metadata
+        ).load_data()
+        nodes = parser.get_nodes_from_documents(docs)
+        fingerprint_nodes(path, nodes)
+        token_counter.set_node_counts(nodes)
+        file_nodes.append((Path(path).as_posix(), nodes))
+    return file_nodes
+
+
+def iter_file_nodes(
+    paths: List[Union[Path, str]],
+    file_metadata: Callable[[str], Dict[str, Any]],
+    files_per_task: int = 32,
+    max_workers: Optional[int] = None,
+    max_pending_tasks: Optional[int] = None,
+) -> Iterator[List[FileNodes]]:
+    """
+    Stream parsed nodes from a process pool, one batch per finished task.
+
+    Files are split into tasks of `files_per_task` and parsed in worker
+    processes. At most `max_pending_tasks` tasks are submitted at a time, so
+    parsed-but-unconsumed nodes stay bounded regardless of corpus size, and
+    the consumer can embed a batch while the pool keeps parsing the next.
+    Batches are yielded in completion order, not input order.
+
+    The token counter is loaded here first, so an encoding file is fetched
+    once before the workers start, and workers count exactly only if this
+    process can; stored counts then match what the server counts.
+
+    Args:
+            paths (List[Union[Path, str]]): Files to load and parse.
+            file_metadata (Callable[[str], Dict[str, Any]]): Picklable metadata callback.
+            files_per_task (int, optional): Files parsed per worker task. Defaults to 32.
+            max_workers (int, optional): Worker processes. Defaults to the CPU count.
+            max_pending_tasks (int, optional): Tasks in flight. Defaults to 2 * max_workers.
+
+    Yields:
+            List[FileNodes]: (POSIX file path, parsed nodes) pairs of one task.
+    """
+    exact = get_token_counter().exact
+    max_workers = max_workers or os.cpu_count() or 1
+    max_pending_tasks = max_pending_tasks or 2 * max_workers
+    chunks = [
+        paths[i : i + files_per_task] for i in range(0, len(paths), files_per_task)
+    ]
+    logger.info(
+        f"Parsing {len(paths)} documents in {len(chunks)} tasks "
+        f"with {max_workers} workers..."
+    )
+    chunks.reverse()
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        pending = set()
+        while chunks or pending:
+            while chunks and len(pending) < max_pending_tasks:
+                pending.add(
+                    pool.submit(parse_files, chunks.pop(), file_metadata, exact)
+                )
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
@@ -0,0 +1,114 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, List, Optional, Set
+
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.schema import BaseNode, MetadataMode
+
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+
+class EmbeddingPipeline:
+    """
+    Embed nodes in concurrent batches and upsert each batch as it lands.
+
+    Batches are embedded on a dedicated thread pool because the Bedrock
+    embedding client is synchronous (its async methods block the event loop).
+    `add` waits for a free slot before scheduling a batch, so a fast producer
+    is held back once `max_concurrency` batches are in flight. Throttled
+    calls are retried by the embedding model itself (see llm.base.set_model),
+    so a batch is not retried again here.
+
+    Usage:
+            async with EmbeddingPipeline(embed_model, vector_store) as pipeline:
+                    for nodes in batches:
+                            await pipeline.add(nodes)
+    """
+
+    def __init__(
+        self,
+        embed_model: BaseEmbedding,
+        vector_store: Any,
+        batch_size: int = 32,
+        max_concurrency: int = 4,
+    ):
+        self.embed_model = embed_model
+        self.vector_store = vector_store
+        self.batch_size = batch_size
+        self.max_concurrency = max_concurrency
+        self.n_embedded = 0
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._upsert_lock: Optional[asyncio.Lock] = None
+        self._collection_ready = False
+        self._tasks: Set[asyncio.Task] = set()
+        self._errors: List[BaseException] = []
+
+    async def __aenter__(self) -> "EmbeddingPipeline":
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_concurrency, thread_name_prefix="embed"
+        )
+        self._slots = asyncio.Semaphore(self.max_concurrency)
+        self._upsert_lock = asyncio.Lock()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        try:
+            await self.join()
+        finally:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+    async def add(self, nodes: List[BaseNode]) -> None:
+        """
+        Schedule nodes for embedding, waiting while the pipeline is saturated.
+        """
+        for i in range(0, len(nodes), self.batch_size):
+            self._raise_for_errors()
+            await self._slots.acquire()
+            task = asyncio.create_task(self._process(nodes[i : i + self.batch_size]))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def join(self) -> None:
+        """
+        Wait for all scheduled batches and raise the first batch error.
+        """
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._raise_for_errors()
+
+    async def _process(self, nodes: List[BaseNode]) -> None:
+        try:
+            embeddings = await self._embed(nodes)
+            for node, embedding in zip(nodes, embeddings):
+                node.embedding = embedding
+            await self._upsert(nodes)
+            self.n_embedded += len(nodes)
+            logger.debug(f"Embedded and upserted {self.n_embedded} nodes")
+        except Exception as e:
+            self._errors.append(e)
+        finally:
+            self._slots.release()
+
+    async def _embed(self, nodes: List[BaseNode]) -> List[List[float]]:
+        texts = [node.get_content(metadata_mode=MetadataMode.EMBED) for node in nodes]
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, self.embed_model.get_text_embedding_batch, texts
+        )
+
+    async def _upsert(self, nodes: List[BaseNode]) -> None:
+        # The first upsert may create the collection, so it must not race.
+        if not self._collection_ready:
+            async with self._upsert_lock:
+                if not self._collection_ready:
+                    await asyncio.to_thread(self.vector_store.add, nodes)
+                    self._collection_ready = True
+                    return
+        await asyncio.to_thread(self.vector_store.add, nodes)
+
+    def _raise_for_errors(self) -> None:
+        if self._errors:
+            raise self._errors[0]
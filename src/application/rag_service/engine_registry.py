@@ -0,0 +1,115 @@
+import asyncio
+import hashlib
+import threading
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+
+class EngineKey(NamedTuple):
+    model_provider: str
+    model_name: str
+    vector_db: str
+    similarity_top_k: int
+    template_hash: str
+    model_type: str = "llm"
+    async_mode: bool = True
+    retrieval_mode: str = "dense"
+    rerank: bool = False
+    assemble_context: bool = False
+    kind: str = "query_engine"
+
+
+def hash_template(template: str) -> str:
+    """
+    Return a short, stable fingerprint of a prompt template.
+
+    Args:
+            template (str): The raw prompt template text.
+
+    Returns:
+            str: Hex digest identifying the template.
+    """
+    return hashlib.sha256(template.encode("utf-8")).hexdigest()[:16]
+
+
+class EngineRegistry:
+    """
+    Process-wide registry of built query engines and the objects they share.
+
+    Engines are built once per key and reused by every caller. Building runs
+    under a lock, so concurrent requests for a missing key (from asyncio tasks
+    or Gradio worker threads) wait for a single build instead of racing. The
+    lock is reentrant, so a builder may resolve its own dependencies (models,
+    caches) through the registry. Async callers use `aget_or_build`, which
+    runs missing builds (client creation, health pings) on a worker thread
+    so the event loop is never blocked on the lock or the build.
+    """
+
+    def __init__(self):
+        self._engines: Dict[EngineKey, Any] = {}
+        self._lock = threading.RLock()
+
+    def get_or_build(self, key: EngineKey, builder: Callable[[], Any]) -> Any:
+        engine = self._engines.get(key)
+        if engine is not None:
+            return engine
+        with self._lock:
+            engine = self._engines.get(key)
+            if engine is None:
+                logger.info(f"Building {key.kind} for {key}")
+                engine = builder()
+                self._engines[key] = engine
+        return engine
+
+    async def aget_or_build(self, key: EngineKey, builder: Callable[[], Any]) -> Any:
+        engine = self._engines.get(key)
+        if engine is not None:
+            return engine
+        return await asyncio.to_thread(self.get_or_build, key, builder)
+
+    def invalidate(self, key: Optional[EngineKey] = None) -> None:
+        """
+        Drop a cached engine, or every engine when no key is given.
+        """
+        with self._lock:
+            if key is None:
+                logger.info(f"Invalidating {len(self._engines)} cached engines")
+                self._engines.clear()
+            elif self._engines.pop(key, None) is not None:
+                logger.info(f"Invalidated {key.kind} for {key}")
+
+    def invalidate_related(self, key: EngineKey) -> None:
+        """
+        Drop every object built for the same pipeline config as `key`, of
+        any kind (engines, index, models, reranker, caches).
+        """
+        with self._lock:
+            related = [
+                other for other in self._engines if other._replace(kind=key.kind) == key
+            ]
+            for other in related:
+                del self._engines[other]
+        logger.info(f"Invalidated {len(related)} cached objects for {key}")
+
+    def items(self, kind: Optional[str] = None) -> List[Tuple[EngineKey, Any]]:
+        """
+        Snapshot of the built objects, optionally only those of one `kind`.
+        Does not wait for builds in progress.
+        """
+        return [
+            (key, engine)
+            for key, engine in list(self._engines.items())
+            if kind is None or key.kind == kind
+        ]
+
+    def __contains__(self, key: EngineKey) -> bool:
+        return key in self._engines
+
+    def __len__(self) -> int:
+        return len(self._engines)
+
+
+engine_registry = EngineRegistry()
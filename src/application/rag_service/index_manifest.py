@@ -0,0 +1,184 @@
+import hashlib
+import json
+import uuid
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import config as cfg
+from llama_index.core.schema import BaseNode, MetadataMode, NodeRelationship
+from utils.file_utils import load_obj, save_obj
+from utils.logger import setup_logger
+from utils.token_counter import TOKEN_COUNT_KEY
+
+logger = setup_logger(__name__)
+
+NODE_ID_NAMESPACE = uuid.UUID("5b0f3f8e-6c1e-4f38-9d0a-2f6a4c1b7e21")
+# Relationships stored with each point, and so part of its fingerprint.
+LINKS = (NodeRelationship.SOURCE, NodeRelationship.PREVIOUS, NodeRelationship.NEXT)
+# Metadata computed from the node itself, not part of its source content.
+DERIVED_METADATA_KEYS = (TOKEN_COUNT_KEY,)
+
+
+def get_manifest_path(collection_name: str) -> Path:
+    """
+    Return the local manifest path for a vector store collection.
+    """
+    return cfg.path.data.manifest / f"{collection_name}.json"
+
+
+def load_manifest(collection_name: str) -> Optional[Dict[str, Any]]:
+    """
+    Load the fingerprint manifest of a collection.
+
+    Args:
+            collection_name (str): The vector store collection name.
+
+    Returns:
+            Optional[Dict[str, Any]]: The manifest, or None if it does not exist.
+    """
+    path = get_manifest_path(collection_name)
+    if not path.exists():
+        return None
+    return load_obj(path)
+
+
+def save_manifest(collection_name: str, files: Dict[str, Dict[str, Any]]) -> None:
+    """
+    Persist the fingerprint manifest of a collection.
+
+    Args:
+            collection_name (str): The vector store collection name.
+            files (Dict[str, Dict[str, Any]]): Per-file fingerprints, as
+                    {path: {"hash": str, "nodes": {node_id: node_hash}}}.
+    """
+    path = get_manifest_path(collection_name)
+    manifest = {"collection": collection_name, "files": files}
+    save_obj(manifest, path, mkdir=True, indent=1, sort_keys=True)
+    logger.info(f"Saved index manifest for {len(files)} files to {path}")
+
+
+def hash_file(path: Union[Path, str], metadata: Dict[str, str]) -> str:
+    """
+    Fingerprint a source file by its bytes and the metadata attached to it.
+
+    Metadata is part of the fingerprint because it is embedded with every node,
+    so a category change must re-embed the file even if its text is unchanged.
+    """
+    digest = hashlib.sha256(Path(path).read_bytes())
+    digest.update(json.dumps(metadata, sort_keys=True).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def hash_content(node: BaseNode) -> str:
+    """
+    Fingerprint a parsed node by its text and source metadata.
+
+    Derived metadata (e.g. the token count, which depends on the token
+    counter settings) is left out, so it never triggers a re-embed.
+    """
+    metadata = {
+        key: value
+        for key, value in node.metadata.items()
+        if key not in DERIVED_METADATA_KEYS
+    }
+    digest = hashlib.sha256(json.dumps(metadata, sort_keys=True).encode("utf-8"))
+    digest.update(node.get_content(metadata_mode=MetadataMode.NONE).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def hash_node(node: BaseNode) -> str:
+    """
+    Fingerprint a parsed node by its content and the ids it links to.
+
+    The stored point carries the node's source/previous/next links, so a node
+    whose neighbours changed must be rewritten even if its own text did not.
+    """
+    links = [
+        node.relationships[relationship].node_id
+        if relationship in node.relationships
+        else ""
+        for relationship in LINKS
+    ]
+    payload = "|".join([hash_content(node), *links])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def fingerprint_nodes(path: Union[Path, str], nodes: List[BaseNode]) -> Dict[str, str]:
+    """
+    Assign deterministic ids to the nodes of a file and return their fingerprints.
+
+    Node ids are derived from the file path and node content hash, so an
+    unchanged section keeps its id (and its Qdrant point) across rebuilds.
+    Identical sections within one file are told apart by occurrence count.
+    The parser has already linked the nodes to each other and to their
+    document by random ids, so those links are remapped to the new ids, and
+    the document gets an id derived from the path.
+
+    Args:
+            path (Union[Path, str]): The source file the nodes were parsed from.
+            nodes (List[BaseNode]): The parsed nodes; ids and links are set in place.
+
+    Returns:
+            Dict[str, str]: Mapping of node id to node fingerprint (see hash_node).
+    """
+    path = Path(path).as_posix()
+    seen = Counter()
+    new_ids = {}
+    for node in nodes:
+        content_hash = hash_content(node)
+        seen[content_hash] += 1
+        new_ids[node.id_] = str(
+            uuid.uuid5(NODE_ID_NAMESPACE, f"{path}#{content_hash}#{seen[content_hash]}")
+        )
+    for node in nodes:
+        source = node.relationships.get(NodeRelationship.SOURCE)
+        if source is not None and source.node_id not in new_ids:
+            n_documents = len(new_ids) - len(nodes)
+            new_ids[source.node_id] = str(
+                uuid.uuid5(NODE_ID_NAMESPACE, f"{path}#document#{n_documents}")
+            )
+    for node in nodes:
+        node.id_ = new_ids[node.id_]
+        for related in node.relationships.values():
+            for info in related if isinstance(related, list) else [related]:
+                info.node_id = new_ids.get(info.node_id, info.node_id)
+    return {node.id_: hash_node(node) for node in nodes}
+
+
+def diff_nodes(
+    old_nodes: Dict[str, str], nodes: List[BaseNode]
+) -> Tuple[List[BaseNode], List[str], Dict[str, str]]:
+    """
+    Compare a changed file's parsed nodes with its manifest entry.
+
+    Args:
+            old_nodes (Dict[str, str]): Node id -> fingerprint from the manifest.
+            nodes (List[BaseNode]): The file's freshly parsed nodes.
+
+    Returns:
+            Tuple[List[BaseNode], List[str], Dict[str, str]]: Nodes to (re)embed,
+                    ids of points to delete, and the file's new node fingerprints.
+                    Nodes are re-embedded when new, or when their text is unchanged
+                    but their neighbour links changed.
+    """
+    new_nodes = {node.node_id: hash_node(node) for node in nodes}
+    to_add = [
+        node for node in nodes if old_nodes.get(node.node_id) != new_nodes[node.node_id]
+    ]
+    to_delete = [node_id for node_id in old_nodes if node_id not in new_nodes]
+    return to_add, to_delete, new_nodes
+
+
+def collection_version(collection_name: str) -> str:
+    """
+    Return a cheap version tag for a collection, derived from its manifest.
+
+    The tag changes whenever build_index rewrites the manifest, which is
+    enough to invalidate answers cached against an older collection.
+    """
+    path = get_manifest_path(collection_name)
+    if not path.exists():
+        return "unversioned"
+    stat = path.stat()
+    return f"{stat.st_mtime_ns}-{stat.st_size}"
@@ -0,0 +1,198 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List
+
+from llama_index.core.instrumentation import get_dispatcher
+from llama_index.core.instrumentation.event_handlers import BaseEventHandler
+from llama_index.core.instrumentation.events import BaseEvent
+from llama_index.core.instrumentation.events.llm import (
+    LLMChatEndEvent,
+    LLMCompletionEndEvent,
+)
+from prometheus_client import Counter, Histogram
+
+from application.rag_service.engine_registry import engine_registry
+from application.rag_service.query_cache import query_embedding_cache
+from application.rag_service.single_flight import query_flights
+from application.rag_service.stage_profiler import Breakdown, add_stage_callback
+from utils.logger import setup_logger
+from utils.metrics import LATENCY_BUCKETS, Sample, add_callback
+from utils.token_counter import approx_count
+
+logger = setup_logger(__name__)
+
+stage_seconds = Histogram(
+    "rag_stage_seconds",
+    "Exclusive seconds spent in each RAG stage per query engine call.",
+    ["stage"],
+    buckets=LATENCY_BUCKETS,
+)
+request_seconds = Histogram(
+    "rag_request_seconds",
+    "End-to-end seconds per request.",
+    ["method"],
+    buckets=LATENCY_BUCKETS,
+)
+first_token_seconds = Histogram(
+    "rag_first_token_seconds",
+    "Seconds until the first streamed token.",
+    buckets=LATENCY_BUCKETS,
+)
+requests_total = Counter(
+    "rag_requests_total", "Requests by method and status.", ["method", "status"]
+)
+llm_tokens_total = Counter(
+    "rag_llm_tokens_total",
+    "LLM tokens by type, as reported by the provider or estimated.",
+    ["type"],
+)
+
+# Usage keys of the providers' raw responses (OpenAI, Anthropic, Bedrock).
+USAGE_KEYS = {
+    "prompt": ("prompt_tokens", "input_tokens", "inputTokens"),
+    "completion": ("completion_tokens", "output_tokens", "outputTokens"),
+}
+
+
+@contextmanager
+def track_request(method: str) -> Iterator[None]:
+    """
+    Time a request and count it by status (ok, error or cancelled).
+    """
+    start = time.perf_counter()
+    status = "error"
+    try:
+        yield
+        status = "ok"
+    except GeneratorExit:
+        status = "cancelled"
+        raise
+    finally:
+        request_seconds.labels(method=method).observe(time.perf_counter() - start)
+        requests_total.labels(method=method, status=status).inc()
+
+
+def observe_stages(stages: Breakdown, tags: Dict[str, Any]) -> None:
+    for stage, seconds in stages.items():
+        if stage != "total" and seconds > 0:
+            stage_seconds.labels(stage=stage).observe(seconds)
+    if logger.isEnabledFor(logging.DEBUG):
+        timings = ", ".join(
+            f"{stage}={seconds:.3f}s" for stage, seconds in stages.items()
+        )
+        logger.debug(f"Stage timings: {timings}")
+
+
+def reported_usage(response: Any) -> Dict[str, int]:
+    """
+    Token counts the provider returned with the response, by type.
+    """
+    raw = response.raw if isinstance(response.raw, dict) else {}
+    sources = [response.additional_kwargs or {}, raw.get("usage") or {}]
+    usage = {}
+    for kind, keys in USAGE_KEYS.items():
+        for source in sources:
+            if not isinstance(source, dict):
+                continue
+            value = next((source[key] for key in keys if key in source), None)
+            if isinstance(value, int):
+                usage[kind] = value
+                break
+    return usage
+
+
+class LLMTokenHandler(BaseEventHandler):
+    """
+    Count prompt and completion tokens of every finished LLM call. Counts
+    the provider did not report are estimated from the text (~4 characters
+    per token), so no tokenizer runs on the request path.
+    """
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "LLMTokenHandler"
+
+    def handle(self, event: BaseEvent, **kwargs: Any) -> None:
+        if isinstance(event, LLMCompletionEndEvent):
+            prompt = event.prompt
+            response, text = event.response, event.response.text
+        elif isinstance(event, LLMChatEndEvent) and event.response is not None:
+            prompt = "\n".join(str(message.content) for message in event.messages)
+            response = event.response
+            text = str(response.message.content or "")
+        else:
+            return
+        usage = reported_usage(response)
+        llm_tokens_total.labels(type="prompt").inc(
+            usage.get("prompt", approx_count(prompt))
+        )
+        llm_tokens_total.labels(type="completion").inc(
+            usage.get("completion", approx_count(text))
+        )
+
+
+def cache_samples(field: str) -> List[Sample]:
+    semantic = sum(
+        cache.stats()[field] for _, cache in engine_registry.items("semantic_cache")
+    )
+    return [
+        ({"cache": "query_embedding"}, query_embedding_cache.stats()[field]),
+        ({"cache": "semantic"}, semantic),
+    ]
+
+
+def coalesced_samples() -> List[Sample]:
+    return [
+        ({"cache": "query_embedding"}, query_embedding_cache.stats()["coalesced"]),
+        ({"cache": "predict"}, query_flights.stats()["coalesced"]),
+    ]
+
+
+_installed = False
+_install_lock = threading.Lock()
+
+
+def setup_instrumentation() -> None:
+    """
+    Feed llama-index stage timings and LLM token counts into the Prometheus
+    metrics, and expose the query caches' stats. Only the llama-index
+    dispatcher is used, so this works with weave disabled. Safe to call
+    more than once.
+
+    Cache hits and misses are gauges: semantic caches belong to an engine
+    and restart from zero when it is rebuilt, so their sum can go down.
+    """
+    global _installed
+    with _install_lock:
+        if _installed:
+            return
+        add_stage_callback(observe_stages)
+        get_dispatcher().add_event_handler(LLMTokenHandler())
+        add_callback(
+            "rag_cache_hits",
+            "Hits of the live query caches.",
+            lambda: cache_samples("hits"),
+            labels=("cache",),
+        )
+        add_callback(
+            "rag_cache_misses",
+            "Misses of the live query caches.",
+            lambda: cache_samples("misses"),
+            labels=("cache",),
+        )
+        add_callback(
+            "rag_coalesced_total",
+            "Calls that shared an identical in-flight computation.",
+            coalesced_samples,
+            labels=("cache",),
+            kind="counter",
+        )
+        add_callback(
+            "rag_requests_in_flight",
+            "Distinct predict computations in flight.",
+            lambda: [({}, query_flights.stats()["in_flight"])],
+        )
+        _installed = True
+        logger.info("RAG instrumentation enabled")
@@ -0,0 +1,143 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+from llama_index.core.base.embeddings.base import BaseEmbedding, Embedding
+from pydantic import PrivateAttr
+
+import config as cfg
+from application.rag_service.single_flight import SingleFlight
+from llm.embedding_cache import normalize_text
+from llm.embedding_proxy import EmbeddingProxy
+
+
+class AsyncTTLCache:
+    """
+    In-process LRU cache with per-entry TTL and in-flight request coalescing.
+
+    Concurrent `get_or_compute` calls for a missing key share one
+    computation through a SingleFlight. Dict access is guarded by a thread
+    lock (never held across an await), so the cache can be shared by event
+    loops in different threads; coalescing only applies to callers on the
+    same loop.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: Optional[float] = 3600):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[Hashable, Tuple[float, Any]] = OrderedDict()
+        self._flights = SingleFlight()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        expires_at = time.monotonic() + self.ttl if self.ttl else float("inf")
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def get_or_compute_sync(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """
+        Blocking variant of get_or_compute, without in-flight coalescing.
+        """
+        value = self.get(key)
+        if value is not None:
+            self._count("hits")
+            return value
+        self._count("misses")
+        value = compute()
+        self.set(key, value)
+        return value
+
+    async def get_or_compute(
+        self, key: Hashable, compute: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        value = self.get(key)
+        if value is not None:
+            self._count("hits")
+            return value
+
+        async def compute_and_set() -> Any:
+            value = await compute()
+            self.set(key, value)
+            return value
+
+        return await self._flights.do(key, compute_and_set)
+
+    def _count(self, counter: str) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        flights = self._flights.stats()
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses + flights["executed"],
+                "coalesced": flights["coalesced"],
+                "size": len(self._entries),
+            }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class QueryEmbeddingCache(EmbeddingProxy):
+    """
+    Embedding model that serves repeated query embeddings from an LRU+TTL cache.
+
+    Only query embeddings are cached; document embeddings pass through.
+    """
+
+    _cache: AsyncTTLCache = PrivateAttr()
+
+    def __init__(self, embed_model: BaseEmbedding, cache: AsyncTTLCache):
+        super().__init__(embed_model)
+        self._cache = cache
+
+    def _key(self, query: str) -> Tuple[str, str]:
+        return (self.model_name, normalize_text(query))
+
+    def _get_query_embedding(self, query: str) -> Embedding:
+        compute = super()._get_query_embedding
+        return self._cache.get_or_compute_sync(self._key(query), lambda: compute(query))
+
+    async def _aget_query_embedding(self, query: str) -> Embedding:
+        compute = super()._aget_query_embedding
+        return await self._cache.get_or_compute(
+            self._key(query), lambda: compute(query)
+        )
+
+
+query_embedding_cache = AsyncTTLCache(
+    max_size=cfg.app.query_cache.max_size, ttl=cfg.app.query_cache.ttl
+)
+
+
+def set_query_cache(embed_model: BaseEmbedding) -> BaseEmbedding:
+    """
+    Wrap an embed model with the shared query embedding cache, if enabled.
+    """
+    if not cfg.app.query_cache.enabled:
+        return embed_model
+    return QueryEmbeddingCache(embed_model, query_embedding_cache)
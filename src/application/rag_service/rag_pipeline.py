@@ -1,13 +1,42 @@
+import asyncio
+import atexit
+import time
 import weave
 import config as cfg
-from llama_index.core import VectorStoreIndex, Settings
+from typing import AsyncIterator, Callable, Hashable, List, Optional, Tuple
+from llama_index.core import QueryBundle, VectorStoreIndex, Settings
 from llama_index.core.prompts import RichPromptTemplate
+from llama_index.core.vector_stores import (
+    FilterOperator,
+    MetadataFilter,
+    MetadataFilters,
+)
 
 from llm.base import set_model
+from llm.embedding_cache import normalize_text
 from vector_database.base import set_vector_store
+from utils.async_utils import aiter_in_thread
 from utils.logger import setup_logger
+from application.rag_service.context_assembler import ContextAssembler
+from application.rag_service.engine_registry import (
+    EngineKey,
+    engine_registry,
+    hash_template,
+)
+from application.rag_service.index_manifest import collection_version
+from application.rag_service.instrumentation import (
+    first_token_seconds,
+    stage_seconds,
+    track_request,
+)
+from application.rag_service.query_cache import set_query_cache
+from application.rag_service.reranker import set_reranker
+from application.rag_service.semantic_cache import SemanticCache
+from application.rag_service.single_flight import Broadcast, query_flights
+from vector_database.qdrant_vector_db_client import get_collection_name
 
-weave.init(cfg.app.weave.project)
+if cfg.app.weave.enabled:
+    weave.init(cfg.app.weave.project)
 logger = setup_logger(__name__)
 
 
@@ -18,10 +47,15 @@ class RagPipeline(weave.Model):
     vector_db: str = "qdrant"
     temperature: float = 0.2
     similarity_top_k: int = 5
+    retrieval_mode: str = "dense"
     context_size: int = 200000
     async_mode: bool = cfg.app.async_mode
+    semantic_cache: bool = cfg.app.semantic_cache.enabled
+    rerank: bool = cfg.app.rerank.enabled
+    assemble_context: bool = cfg.app.context.enabled
+    coalesce: bool = cfg.app.coalesce.enabled
 
-    def set_models(self) -> None:
+    def set_models(self) -> dict:
         models = set_model(
             model_provider=self.model_provider,
             model_name=self.model_name,
@@ -29,31 +63,236 @@ class RagPipeline(weave.Model):
         )
         Settings.llm = models["llm"]
         Settings.embed_model = models["embed_model"]
+        return models
 
     def get_template(self):
         prompt_template = cfg.templates.prompt.doc_qa
         return RichPromptTemplate(prompt_template)
 
-    def get_index(self):
+    def get_index(self, embed_model=None):
         vector_store = set_vector_store(
             vector_db=self.vector_db,
             model_provider=self.model_provider,
             async_mode=self.async_mode,
+            retrieval_mode=self.get_retrieval_mode(),
+        )
+        index = VectorStoreIndex.from_vector_store(
+            vector_store, embed_model=embed_model
         )
-        index = VectorStoreIndex.from_vector_store(vector_store)
         return index
 
-    def setup_query_engine(self):
-        self.set_models()
-        index = self.get_index()
+    def get_cached_index(self):
+        return engine_registry.get_or_build(
+            self.engine_key("index"),
+            lambda: self.get_index(embed_model=self.get_embed_model()),
+        )
+
+    def get_models(self) -> dict:
+        return engine_registry.get_or_build(self.engine_key("models"), self.set_models)
+
+    def setup_embed_model(self):
+        return set_query_cache(self.get_models()["embed_model"])
+
+    def get_embed_model(self):
+        return engine_registry.get_or_build(
+            self.engine_key("embed_model"), self.setup_embed_model
+        )
+
+    async def aget_embed_model(self):
+        return await engine_registry.aget_or_build(
+            self.engine_key("embed_model"), self.setup_embed_model
+        )
+
+    def get_retrieval_mode(self) -> str:
+        if self.retrieval_mode == "hybrid" and self.vector_db != "qdrant":
+            logger.warning(
+                f"Hybrid retrieval is not supported by {self.vector_db}, using dense."
+            )
+            return "dense"
+        return self.retrieval_mode
+
+    def get_retriever_kwargs(self) -> dict:
+        """
+        Hybrid mode sends the dense and BM25 sparse searches to Qdrant as one
+        batch and fuses them by reciprocal rank.
+        """
+        kwargs = {"similarity_top_k": self.get_retrieval_top_k()}
+        if self.get_retrieval_mode() != "hybrid":
+            return kwargs
+        retriever_cfg = cfg.vector_db.retriever
+        return {
+            **kwargs,
+            "vector_store_query_mode": "hybrid",
+            "sparse_top_k": retriever_cfg.sparse_top_k,
+            "hybrid_top_k": kwargs["similarity_top_k"],
+            "alpha": retriever_cfg.alpha,
+        }
+
+    def get_retrieval_top_k(self) -> int:
+        """
+        With reranking, retrieve a wider candidate set; the reranker keeps
+        `rerank.top_n` of them for the prompt.
+        """
+        if self.rerank:
+            return max(cfg.app.rerank.candidate_k, self.similarity_top_k)
+        return self.similarity_top_k
+
+    def get_context_budget(self) -> int:
+        """
+        Context tokens the configured model allows, capped at `context.max_tokens`.
+        """
+        context_cfg = cfg.app.context
+        model_cfg = getattr(getattr(cfg.model, self.model_provider), self.model_type)
+        llm_cfg = getattr(model_cfg, self.model_name, None)
+        context_size = getattr(llm_cfg, "context_size", self.context_size)
+        return min(context_cfg.max_tokens, context_size - context_cfg.reserved_tokens)
+
+    def setup_context_assembler(self) -> ContextAssembler:
+        context_cfg = cfg.app.context
+        return ContextAssembler(
+            max_tokens=self.get_context_budget(),
+            dedup_threshold=context_cfg.dedup_threshold,
+            num_perm=context_cfg.num_perm,
+            shingle_size=context_cfg.shingle_size,
+            merge_adjacent=context_cfg.merge_adjacent,
+        )
+
+    def get_node_postprocessors(self) -> list:
+        postprocessors = []
+        if self.rerank:
+            postprocessors.append(
+                engine_registry.get_or_build(self.engine_key("reranker"), set_reranker)
+            )
+        if self.assemble_context:
+            postprocessors.append(
+                engine_registry.get_or_build(
+                    self.engine_key("context_assembler"), self.setup_context_assembler
+                )
+            )
+        return postprocessors
+
+    @staticmethod
+    def get_filters(
+        categories: Optional[List[str]] = None,
+    ) -> Optional[MetadataFilters]:
+        """
+        Restrict retrieval to nodes whose `category` payload is in `categories`.
+
+        Qdrant evaluates the filter against its keyword payload index during
+        the search, so only points of the selected categories are scored.
+        """
+        if not categories:
+            return None
+        return MetadataFilters(
+            filters=[
+                MetadataFilter(
+                    key="category",
+                    value=list(categories),
+                    operator=FilterOperator.IN,
+                )
+            ]
+        )
+
+    def setup_query_engine(
+        self, streaming: bool = False, filters: Optional[MetadataFilters] = None
+    ):
+        index = self.get_cached_index()
         prompt_template = self.get_template()
         return index.as_query_engine(
-            similarity_top_k=self.similarity_top_k,
+            llm=self.get_models()["llm"],
             text_qa_template=prompt_template,
+            streaming=streaming,
+            filters=filters,
+            node_postprocessors=self.get_node_postprocessors(),
+            **self.get_retriever_kwargs(),
+        )
+
+    def engine_key(self, kind: str = "query_engine") -> EngineKey:
+        return EngineKey(
+            model_provider=self.model_provider,
+            model_name=self.model_name,
+            vector_db=self.vector_db,
+            similarity_top_k=self.similarity_top_k,
+            template_hash=hash_template(cfg.templates.prompt.doc_qa),
+            model_type=self.model_type,
+            async_mode=self.async_mode,
+            retrieval_mode=self.get_retrieval_mode(),
+            rerank=self.rerank,
+            assemble_context=self.assemble_context,
+            kind=kind,
+        )
+
+    def setup_semantic_cache(self) -> SemanticCache:
+        cache_cfg = cfg.app.semantic_cache
+        key = self.engine_key()
+        path = cfg.path.data.cache / "semantic" / hash_template(repr(key))
+        semantic_cache = SemanticCache(
+            path=path,
+            threshold=cache_cfg.threshold,
+            max_entries=cache_cfg.max_entries,
+        )
+        atexit.register(semantic_cache.save)
+        return semantic_cache
+
+    def get_semantic_cache(self) -> SemanticCache:
+        return engine_registry.get_or_build(
+            self.engine_key("semantic_cache"), self.setup_semantic_cache
+        )
+
+    async def aget_semantic_cache(self) -> SemanticCache:
+        return await engine_registry.aget_or_build(
+            self.engine_key("semantic_cache"), self.setup_semantic_cache
+        )
+
+    def get_collection_version(self) -> str:
+        return collection_version(get_collection_name(self.model_provider))
+
+    def get_query_engine(self, categories: Optional[List[str]] = None):
+        # Filtered engines are cheap wrappers over the cached index and models,
+        # so they are built per query instead of cached per category set.
+        if categories:
+            return self.setup_query_engine(filters=self.get_filters(categories))
+        return engine_registry.get_or_build(self.engine_key(), self.setup_query_engine)
+
+    def get_stream_engine(self, categories: Optional[List[str]] = None):
+        if categories:
+            return self.setup_query_engine(
+                streaming=True, filters=self.get_filters(categories)
+            )
+        return engine_registry.get_or_build(
+            self.engine_key("stream_engine"),
+            lambda: self.setup_query_engine(streaming=True),
+        )
+
+    async def aget_query_engine(self, categories: Optional[List[str]] = None):
+        if categories:
+            # May build the shared index and models on first use.
+            return await asyncio.to_thread(self.get_query_engine, categories)
+        return await engine_registry.aget_or_build(
+            self.engine_key(), self.setup_query_engine
+        )
+
+    async def aget_stream_engine(self, categories: Optional[List[str]] = None):
+        if categories:
+            return await asyncio.to_thread(self.get_stream_engine, categories)
+        return await engine_registry.aget_or_build(
+            self.engine_key("stream_engine"),
+            lambda: self.setup_query_engine(streaming=True),
         )
 
-    async def aquery(self, query: str):
-        query_engine = self.setup_query_engine()
+    def invalidate_query_engine(self, all_engines: bool = False) -> None:
+        """
+        Drop everything cached for this pipeline's config (engines, index,
+        models, reranker, context assembler, semantic cache), or for every
+        pipeline when `all_engines` is set.
+        """
+        if all_engines:
+            engine_registry.invalidate()
+            return
+        engine_registry.invalidate_related(self.engine_key())
+
+    async def aquery(self, query: str, categories: Optional[List[str]] = None):
+        query_engine = await self.aget_query_engine(categories)
         response = await query_engine.aquery(query)
         return response
 
@@ -65,12 +304,142 @@ class RagPipeline(weave.Model):
         source_nodes = response.source_nodes
         return set([node.metadata.get("file_name", "N/A") for node in source_nodes])
 
+    def flight_key(
+        self,
+        query: str,
+        categories: Optional[List[str]] = None,
+        kind: str = "predict",
+    ) -> Hashable:
+        return (
+            self.engine_key(kind),
+            normalize_text(query),
+            tuple(sorted(categories or ())),
+        )
+
     @weave.op()
-    async def predict(self, query: str):
-        response = await self.aquery(query)
+    async def predict(self, query: str, categories: Optional[List[str]] = None):
+        """
+        Answer a query. Concurrent calls with the same normalized query,
+        categories and pipeline config share one in-flight answer.
+        """
+        with track_request("predict"):
+            if not self.coalesce:
+                return await self.cached_predict(query, categories)
+            result = await query_flights.do(
+                self.flight_key(query, categories),
+                lambda: self.cached_predict(query, categories),
+            )
+            # Coalesced callers share the result; give each its own copy.
+            return dict(result)
+
+    async def cached_predict(self, query: str, categories: Optional[List[str]] = None):
+        # The semantic cache is keyed by query only, so filtered queries skip it.
+        if not self.semantic_cache or categories:
+            return await self.apredict(query, categories)
+
+        embed_model = await self.aget_embed_model()
+        embedding = await embed_model.aget_query_embedding(query)
+        semantic_cache = await self.aget_semantic_cache()
+        version = self.get_collection_version()
+        cached = semantic_cache.lookup(embedding, version)
+        if cached is not None:
+            return cached
+        result = await self.apredict(query)
+        semantic_cache.add(embedding, query, result, version)
+        return result
+
+    async def apredict(self, query: str, categories: Optional[List[str]] = None):
+        response = await self.aquery(query, categories)
         source_documents = self.get_source_documents(response)
         return {"response": response.response, "source_documents": source_documents}
 
+    async def start_stream(
+        self,
+        query: str,
+        categories: Optional[List[str]] = None,
+        on_complete: Optional[Callable[[dict], None]] = None,
+    ) -> Tuple[Broadcast, set]:
+        """
+        Retrieve and start synthesizing an answer. Returns a broadcast of its
+        tokens and the source documents; `on_complete(result)` is called once
+        the whole answer has been generated.
+        """
+        query_engine = await self.aget_stream_engine(categories)
+        query_bundle = QueryBundle(query)
+        nodes = await query_engine.aretrieve(query_bundle)
+        response = await asyncio.to_thread(query_engine.synthesize, query_bundle, nodes)
+        source_documents = self.get_source_documents(response)
+        # Generation happens while the stream is read, after the LLM span has
+        # closed, so it is timed here.
+        generation_start = time.perf_counter()
+
+        def complete(tokens: List[str]) -> None:
+            stage_seconds.labels(stage="llm").observe(
+                time.perf_counter() - generation_start
+            )
+            if on_complete is not None:
+                result = {
+                    "response": "".join(tokens),
+                    "source_documents": source_documents,
+                }
+                on_complete(result)
+
+        # The Bedrock LLM only streams synchronously, so the stream is read on
+        # a worker thread and relayed to the event loop token by token.
+        tokens = Broadcast(aiter_in_thread(response.response_gen), complete)
+        return tokens, source_documents
+
+    async def astream(
+        self, query: str, categories: Optional[List[str]] = None
+    ) -> AsyncIterator[dict]:
+        """
+        Stream an answer as {"token": str} chunks, then {"source_documents": set}.
+
+        Concurrent calls with the same normalized query, categories and
+        pipeline config share one retrieval and one LLM stream, whose tokens
+        are fanned out to every caller; a call that arrives once the stream
+        has started runs its own. A completed answer is cached before its
+        sources are sent; a partial one is never cached.
+        """
+        with track_request("astream"):
+            start = time.perf_counter()
+            use_cache = self.semantic_cache and not categories
+            on_complete = None
+            if use_cache:
+                embed_model = await self.aget_embed_model()
+                embedding = await embed_model.aget_query_embedding(query)
+                semantic_cache = await self.aget_semantic_cache()
+                version = self.get_collection_version()
+                cached = semantic_cache.lookup(embedding, version)
+                if cached is not None:
+                    first_token_seconds.observe(time.perf_counter() - start)
+                    yield {"token": cached["response"]}
+                    yield {"source_documents": cached["source_documents"]}
+                    return
+
+                def cache_answer(result: dict) -> None:
+                    semantic_cache.add(embedding, query, result, version)
+
+                on_complete = cache_answer
+
+            def begin():
+                return self.start_stream(query, categories, on_complete)
+
+            if self.coalesce:
+                tokens, source_documents = await query_flights.do(
+                    self.flight_key(query, categories, kind="astream"), begin
+                )
+            else:
+                tokens, source_documents = await begin()
+            first = True
+            async for token in tokens.subscribe():
+                if first:
+                    first_token_seconds.observe(time.perf_counter() - start)
+                    first = False
+                yield {"token": token}
+            # Coalesced callers share the result; give each its own copy.
+            yield {"source_documents": set(source_documents)}
+
     @weave.op()
     async def eval_apredict(self, query: str):
         response = await self.aquery(query)
@@ -89,5 +458,6 @@ rag_pipe = RagPipeline(
     vector_db=cfg.app.vector_db.name,
     temperature=cfg.model.gen_params.temperature,
     similarity_top_k=cfg.vector_db.retriever.similarity_top_k,
+    retrieval_mode=cfg.vector_db.retriever.mode,
     async_mode=cfg.app.async_mode,
 )
@@ -0,0 +1,151 @@
+import asyncio
+import math
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import ClassVar, List, Optional
+
+import config as cfg
+from llama_index.core.bridge.pydantic import Field
+from llama_index.core.instrumentation import get_dispatcher
+from llama_index.core.postprocessor import SentenceTransformerRerank
+from llama_index.core.postprocessor.types import BaseNodePostprocessor
+from llama_index.core.schema import MetadataMode, NodeWithScore, QueryBundle
+
+from utils.logger import setup_logger
+from vector_database.hybrid_search import tokenize
+
+logger = setup_logger(__name__)
+dispatcher = get_dispatcher(__name__)
+
+# Shared by every pipeline so concurrent queries cannot queue more rerank work
+# on the CPU than `max_workers` threads at a time.
+rerank_executor = ThreadPoolExecutor(
+    max_workers=cfg.app.rerank.max_workers, thread_name_prefix="rerank"
+)
+
+
+class PooledRerankMixin:
+    """
+    Run `_postprocess_nodes` on the bounded rerank pool on the async path.
+
+    The async call is a llama-index span, so it is profiled as the
+    "rerank" stage; the executor thread does not inherit the span context.
+    """
+
+    profile_stage: ClassVar[str] = "rerank"
+
+    @dispatcher.span
+    async def _apostprocess_nodes(
+        self,
+        nodes: List[NodeWithScore],
+        query_bundle: Optional[QueryBundle] = None,
+    ) -> List[NodeWithScore]:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            rerank_executor, self._postprocess_nodes, nodes, query_bundle
+        )
+
+
+def min_max(scores: List[float]) -> List[float]:
+    low, high = min(scores), max(scores)
+    if high == low:
+        return [1.0] * len(scores)
+    return [(score - low) / (high - low) for score in scores]
+
+
+class LexicalRerank(PooledRerankMixin, BaseNodePostprocessor):
+    """
+    Rerank retrieved nodes by BM25 overlap with the query, computed locally.
+
+    Term statistics come from the candidate set itself, so no corpus-wide
+    index is needed. The lexical score is blended with the retrieval score
+    (both min-max normalized) and the best `top_n` nodes are kept. Only the
+    first `max_chars` characters of a node are scored, which bounds the cost
+    per query to roughly `len(nodes) * max_chars`.
+    """
+
+    top_n: int = Field(default=3, description="Number of nodes to keep.")
+    weight: float = Field(default=0.5, description="Weight of the lexical score.")
+    max_chars: int = Field(default=2000, description="Characters scored per node.")
+    k1: float = 1.2
+    b: float = 0.75
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "LexicalRerank"
+
+    def lexical_scores(self, query: str, texts: List[str]) -> List[float]:
+        query_terms = set(tokenize(query))
+        docs = [Counter(tokenize(text[: self.max_chars])) for text in texts]
+        lengths = [sum(doc.values()) for doc in docs]
+        avg_length = sum(lengths) / len(lengths) or 1.0
+        doc_freq = Counter(term for doc in docs for term in query_terms & doc.keys())
+        idf = {
+            term: math.log(1 + (len(docs) - df + 0.5) / (df + 0.5))
+            for term, df in doc_freq.items()
+        }
+        scores = []
+        for doc, length in zip(docs, lengths):
+            norm = self.k1 * (1 - self.b + self.b * length / avg_length)
+            scores.append(
+                sum(
+                    weight * doc[term] * (self.k1 + 1) / (doc[term] + norm)
+                    for term, weight in idf.items()
+                    if term in doc
+                )
+            )
+        return scores
+
+    def _postprocess_nodes(
+        self,
+        nodes: List[NodeWithScore],
+        query_bundle: Optional[QueryBundle] = None,
+    ) -> List[NodeWithScore]:
+        if query_bundle is None or len(nodes) <= 1:
+            return nodes[: self.top_n]
+        texts = [
+            node.node.get_content(metadata_mode=MetadataMode.EMBED) for node in nodes
+        ]
+        lexical = min_max(self.lexical_scores(query_bundle.query_str, texts))
+        retrieval = min_max([node.score or 0.0 for node in nodes])
+        for node, lexical_score, retrieval_score in zip(nodes, lexical, retrieval):
+            node.score = (
+                self.weight * lexical_score + (1 - self.weight) * retrieval_score
+            )
+        nodes = sorted(nodes, key=lambda node: node.score, reverse=True)
+        return nodes[: self.top_n]
+
+
+class CrossEncoderRerank(PooledRerankMixin, SentenceTransformerRerank):
+    """
+    SentenceTransformerRerank on the bounded rerank pool.
+
+    Requires the optional sentence-transformers package.
+    """
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "CrossEncoderRerank"
+
+
+def set_reranker(rerank_cfg=None) -> BaseNodePostprocessor:
+    rerank_cfg = rerank_cfg or cfg.app.rerank
+    logger.info(
+        f"Reranking {rerank_cfg.candidate_k} candidates to {rerank_cfg.top_n} "
+        f"with the {rerank_cfg.scorer} scorer"
+    )
+    match rerank_cfg.scorer:
+        case "lexical":
+            return LexicalRerank(
+                top_n=rerank_cfg.top_n,
+                weight=rerank_cfg.weight,
+                max_chars=rerank_cfg.max_chars,
+            )
+        case "cross-encoder":
+            return CrossEncoderRerank(
+                model=rerank_cfg.cross_encoder_model,
+                top_n=rerank_cfg.top_n,
+                device="cpu",
+            )
+        case _:
+            raise Exception(f"Unknown rerank scorer: {rerank_cfg.scorer}")
@@ -0,0 +1,139 @@
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from utils.file_utils import load_obj, save_obj
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+
+class SemanticCache:
+    """
+    Answer cache looked up by query embedding similarity.
+
+    Entries are (query embedding, answer, source documents) tuples held in a
+    local float32 matrix of unit vectors, so a lookup is a single
+    matrix-vector product. A cached answer is returned when the best match
+    has cosine similarity >= `threshold` and was stored against the current
+    collection version; a version change drops every entry. The cache is
+    a ring buffer of `max_entries` (oldest overwritten first) and persisted
+    to `path` (`embeddings.npy` plus an `entries.json` sidecar).
+    """
+
+    def __init__(
+        self, path: Optional[Path], threshold: float = 0.95, max_entries: int = 10000
+    ):
+        self.path = path
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.version: Optional[str] = None
+        self.hits = 0
+        self.misses = 0
+        self._embeddings: Optional[np.ndarray] = None
+        self._entries: List[Dict[str, Any]] = []
+        self._next = 0
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self) -> None:
+        if self.path is None or not (self.path / "entries.json").exists():
+            return
+        sidecar = load_obj(self.path / "entries.json")
+        self.version = sidecar["version"]
+        self._entries = sidecar["entries"]
+        self._next = sidecar["next"]
+        self._embeddings = np.load(self.path / "embeddings.npy")
+        logger.info(f"Loaded {len(self._entries)} cached answers from {self.path}")
+
+    def save(self) -> None:
+        if self.path is None:
+            return
+        with self._lock:
+            if self._embeddings is None:
+                return
+            self.path.mkdir(parents=True, exist_ok=True)
+            np.save(self.path / "embeddings.npy", self._embeddings)
+            save_obj(
+                {"version": self.version, "entries": self._entries, "next": self._next},
+                self.path / "entries.json",
+            )
+
+    @staticmethod
+    def _normalize(embedding: List[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _check_version(self, version: str) -> None:
+        if self.version != version:
+            if self._entries:
+                logger.info(
+                    f"Collection version changed ({self.version} -> {version}), "
+                    f"dropping {len(self._entries)} cached answers."
+                )
+            self.version = version
+            self._embeddings = None
+            self._entries = []
+            self._next = 0
+
+    def lookup(self, embedding: List[float], version: str) -> Optional[Dict[str, Any]]:
+        """
+        Return the cached answer closest to `embedding`, if similar enough.
+        """
+        query = self._normalize(embedding)
+        with self._lock:
+            self._check_version(version)
+            if self._embeddings is None:
+                self.misses += 1
+                return None
+            scores = self._embeddings[: len(self._entries)] @ query
+            best = int(np.argmax(scores))
+            if scores[best] < self.threshold:
+                self.misses += 1
+                return None
+            self.hits += 1
+            entry = self._entries[best]
+        logger.debug(
+            f"Semantic cache hit ({scores[best]:.3f}) for query: {entry['query']}"
+        )
+        return {
+            "response": entry["response"],
+            "source_documents": set(entry["source_documents"]),
+        }
+
+    def add(
+        self, embedding: List[float], query: str, result: Dict[str, Any], version: str
+    ) -> None:
+        """
+        Store a predict() result for `query` under the given collection version.
+        """
+        vector = self._normalize(embedding)
+        entry = {
+            "query": query,
+            "response": result["response"],
+            "source_documents": sorted(result["source_documents"]),
+        }
+        with self._lock:
+            self._check_version(version)
+            slot = self._next
+            if self._embeddings is None:
+                capacity = min(self.max_entries, 1024)
+                self._embeddings = np.zeros((capacity, len(vector)), np.float32)
+            elif slot >= len(self._embeddings):
+                capacity = min(self.max_entries, 2 * len(self._embeddings))
+                self._embeddings = np.resize(self._embeddings, (capacity, len(vector)))
+            self._embeddings[slot] = vector
+            if slot < len(self._entries):
+                self._entries[slot] = entry
+            else:
+                self._entries.append(entry)
+            self._next = (slot + 1) % self.max_entries
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,142 @@
+import asyncio
+import threading
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Hashable,
+    List,
+    Optional,
+    Tuple,
+)
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent async calls that share a key into one computation.
+
+    The first caller for a key starts `compute()` as a task; callers that
+    arrive while it is in flight await the same task instead of starting
+    their own. Nothing is kept once the task finishes, so later calls run
+    again. Every caller awaits the task through `asyncio.shield`, so one
+    cancelled caller (e.g. a closed browser tab) does not cancel the
+    computation for the others. Tasks are keyed per event loop; the thread
+    lock is never held across an await.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.executed = 0
+        self.coalesced = 0
+        self._inflight: Dict[Tuple[int, Hashable], asyncio.Task] = {}
+        self._lock = threading.Lock()
+
+    async def do(self, key: Hashable, compute: Callable[[], Awaitable[Any]]) -> Any:
+        loop = asyncio.get_running_loop()
+        flight_key = (id(loop), key)
+        with self._lock:
+            self.calls += 1
+            task = self._inflight.get(flight_key)
+            if task is None:
+                self.executed += 1
+                task = loop.create_task(compute())
+                self._inflight[flight_key] = task
+                task.add_done_callback(lambda t: self._done(flight_key, t))
+            else:
+                self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def _done(self, flight_key: Tuple[int, Hashable], task: asyncio.Task) -> None:
+        with self._lock:
+            if self._inflight.get(flight_key) is task:
+                del self._inflight[flight_key]
+        # Mark retrieved so an error whose callers were all cancelled is not logged.
+        if not task.cancelled():
+            task.exception()
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._inflight)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "executed": self.executed,
+                "coalesced": self.coalesced,
+                "in_flight": len(self._inflight),
+            }
+
+
+class Broadcast:
+    """
+    Fan one async stream out to every reader, from its first item.
+
+    A task reads `source` into a buffer and `on_complete(items)` is called
+    once it is exhausted; readers replay the buffer and then wait for new
+    items, and a source error is raised in every reader. If all readers
+    leave before the end, the task is cancelled so an abandoned stream is
+    not read on (and `on_complete` is not called). Create it on the loop
+    its readers run on.
+    """
+
+    def __init__(
+        self,
+        source: AsyncIterator[Any],
+        on_complete: Optional[Callable[[List[Any]], None]] = None,
+    ):
+        self.items: List[Any] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.readers = 0
+        self._on_complete = on_complete
+        self._changed = asyncio.Event()
+        self._task = asyncio.get_running_loop().create_task(self._pump(source))
+
+    def _notify(self) -> None:
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def _pump(self, source: AsyncIterator[Any]) -> None:
+        try:
+            async for item in source:
+                self.items.append(item)
+                self._notify()
+            if self._on_complete is not None:
+                self._on_complete(self.items)
+        except Exception as e:
+            self.error = e
+        finally:
+            self.done = True
+            self._notify()
+
+    def subscribe(self) -> AsyncIterator[Any]:
+        """
+        A new reader of the stream. It counts as a reader from this call, so
+        subscribe right after getting the broadcast.
+        """
+        self.readers += 1
+        return self._read()
+
+    async def _read(self) -> AsyncIterator[Any]:
+        index = 0
+        try:
+            while True:
+                changed = self._changed
+                while index < len(self.items):
+                    yield self.items[index]
+                    index += 1
+                if self.done:
+                    break
+                await changed.wait()
+            if self.error is not None:
+                raise self.error
+        finally:
+            self.readers -= 1
+            if self.readers == 0 and not self.done:
+                self._task.cancel()
+
+
+query_flights = SingleFlight()
@@ -0,0 +1,228 @@
+import threading
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from llama_index.core.base.base_query_engine import BaseQueryEngine
+from llama_index.core.base.base_retriever import BaseRetriever
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.bridge.pydantic import Field
+from llama_index.core.instrumentation import get_dispatcher
+from llama_index.core.instrumentation.event_handlers import BaseEventHandler
+from llama_index.core.instrumentation.events import BaseEvent
+from llama_index.core.instrumentation.events.llm import (
+    LLMChatEndEvent,
+    LLMChatStartEvent,
+    LLMCompletionEndEvent,
+    LLMCompletionStartEvent,
+)
+from llama_index.core.instrumentation.span import SimpleSpan
+from llama_index.core.instrumentation.span_handlers import BaseSpanHandler
+from llama_index.core.llms import LLM
+from llama_index.core.postprocessor.types import BaseNodePostprocessor
+from llama_index.core.response_synthesizers.base import BaseSynthesizer
+
+STAGES = (
+    "embed",
+    "search",
+    "rerank",
+    "assemble",
+    "postprocess",
+    "prompt",
+    "llm",
+    "synthesize",
+)
+
+# (instance type, span method names) -> stage, checked in order. Node
+# postprocessors may override their stage with a `profile_stage` attribute.
+SPAN_STAGES: List[Tuple[type, Tuple[str, ...], str]] = [
+    (BaseEmbedding, ("get_query_embedding", "aget_query_embedding"), "embed"),
+    (BaseRetriever, ("retrieve", "aretrieve"), "search"),
+    (
+        BaseNodePostprocessor,
+        ("_postprocess_nodes", "_apostprocess_nodes"),
+        "postprocess",
+    ),
+    (LLM, ("predict", "apredict", "stream", "astream"), "prompt"),
+    (BaseSynthesizer, ("synthesize", "asynthesize"), "synthesize"),
+    (BaseQueryEngine, ("query", "aquery", "_query", "_aquery"), "postprocess"),
+]
+LLM_EVENTS = {
+    LLMCompletionStartEvent: ("completion", True),
+    LLMCompletionEndEvent: ("completion", False),
+    LLMChatStartEvent: ("chat", True),
+    LLMChatEndEvent: ("chat", False),
+}
+
+Breakdown = Dict[str, float]
+
+
+def span_stage(id_: str, instance: Any) -> Optional[str]:
+    # Span ids are "<Class>.<method>-<uuid>".
+    method = id_.split("-", 1)[0].rsplit(".", 1)[-1]
+    for cls, methods, stage in SPAN_STAGES:
+        if isinstance(instance, cls) and method in methods:
+            return getattr(instance, "profile_stage", stage)
+    return None
+
+
+class StageSpan(SimpleSpan):
+    stage: Optional[str] = None
+    root_id: str = ""
+    llm_seconds: float = 0.0
+
+
+def breakdown(spans: List[StageSpan]) -> Breakdown:
+    """
+    Exclusive seconds per stage for one span tree.
+
+    Each span's time is charged to its stage minus the time of staged
+    descendants, so nested wrappers (e.g. cached embedding proxies) count
+    once and stages add up to the root duration. LLM generation time comes
+    from the LLM start/end events inside `prompt` spans; the rest of those
+    spans is prompt rendering (and rate-limit waits). Query engine time
+    outside retrieval, synthesis and the instrumented postprocessors
+    (rerank, context assembly) is other node postprocessing.
+    """
+    by_id = {span.id_: span for span in spans}
+
+    def staged_parent(span: StageSpan) -> Optional[StageSpan]:
+        parent = by_id.get(span.parent_id)
+        while parent is not None and parent.stage is None:
+            parent = by_id.get(parent.parent_id)
+        return parent
+
+    stages = dict.fromkeys(STAGES, 0.0)
+    for span in spans:
+        if span.stage is None:
+            continue
+        parent = staged_parent(span)
+        if parent is not None and parent.stage == span.stage:
+            continue
+        stages[span.stage] += span.duration
+        if parent is not None:
+            stages[parent.stage] -= span.duration
+        if span.stage == "prompt":
+            stages["prompt"] -= span.llm_seconds
+            stages["llm"] += span.llm_seconds
+    root = next(span for span in spans if span.parent_id not in by_id)
+    stages = {stage: max(seconds, 0.0) for stage, seconds in stages.items()}
+    stages["total"] = root.duration
+    return stages
+
+
+class StageSpanHandler(BaseSpanHandler[StageSpan]):
+    """
+    Span handler that keeps each llama-index span tree until its root
+    exits, then reports the tree's per-stage breakdown to `callbacks`
+    along with the root's instrument tags.
+    """
+
+    callbacks: List[Callable[[Breakdown, Dict[str, Any]], None]] = Field(
+        default_factory=list
+    )
+    finished: Dict[str, List[StageSpan]] = Field(default_factory=dict)
+    llm_starts: Dict[Tuple[str, str], datetime] = Field(default_factory=dict)
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "StageSpanHandler"
+
+    def new_span(
+        self,
+        id_: str,
+        bound_args: Any,
+        instance: Optional[Any] = None,
+        parent_span_id: Optional[str] = None,
+        tags: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> StageSpan:
+        parent = self.open_spans.get(parent_span_id) if parent_span_id else None
+        return StageSpan(
+            id_=id_,
+            parent_id=parent_span_id if parent is not None else None,
+            tags=tags or {},
+            stage=span_stage(id_, instance),
+            root_id=parent.root_id if parent is not None else id_,
+        )
+
+    def prepare_to_exit_span(
+        self,
+        id_: str,
+        bound_args: Any,
+        instance: Optional[Any] = None,
+        result: Optional[Any] = None,
+        **kwargs: Any,
+    ) -> StageSpan:
+        return self.finish(self.open_spans[id_])
+
+    def prepare_to_drop_span(
+        self,
+        id_: str,
+        bound_args: Any,
+        instance: Optional[Any] = None,
+        err: Optional[BaseException] = None,
+        **kwargs: Any,
+    ) -> Optional[StageSpan]:
+        span = self.open_spans.get(id_)
+        if span is not None:
+            span.metadata = {"error": str(err)}
+            self.finish(span)
+        return span
+
+    def finish(self, span: StageSpan) -> StageSpan:
+        span.end_time = datetime.now()
+        span.duration = (span.end_time - span.start_time).total_seconds()
+        with self.lock:
+            tree = self.finished.setdefault(span.root_id, [])
+            tree.append(span)
+            if span.id_ != span.root_id:
+                return span
+            del self.finished[span.root_id]
+        stages = breakdown(tree)
+        for callback in self.callbacks:
+            callback(stages, span.tags)
+        return span
+
+    def record_llm_event(self, event: BaseEvent) -> None:
+        kind, is_start = LLM_EVENTS[type(event)]
+        key = (event.span_id, kind)
+        with self.lock:
+            if is_start:
+                self.llm_starts[key] = event.timestamp
+                return
+            start = self.llm_starts.pop(key, None)
+            span = self.open_spans.get(event.span_id)
+        if start is not None and span is not None:
+            span.llm_seconds += (event.timestamp - start).total_seconds()
+
+
+class LLMEventHandler(BaseEventHandler):
+    span_handler: StageSpanHandler
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "LLMEventHandler"
+
+    def handle(self, event: BaseEvent, **kwargs: Any) -> None:
+        if type(event) in LLM_EVENTS:
+            self.span_handler.record_llm_event(event)
+
+
+_span_handler: Optional[StageSpanHandler] = None
+_span_handler_lock = threading.Lock()
+
+
+def add_stage_callback(callback: Callable[[Breakdown, Dict[str, Any]], None]) -> None:
+    """
+    Call `callback(stages, tags)` with the per-stage seconds of every
+    finished llama-index span tree (one per query engine call). The stage
+    handlers are registered on the root dispatcher on first use.
+    """
+    global _span_handler
+    with _span_handler_lock:
+        if _span_handler is None:
+            _span_handler = StageSpanHandler()
+            dispatcher = get_dispatcher()
+            dispatcher.add_span_handler(_span_handler)
+            dispatcher.add_event_handler(LLMEventHandler(span_handler=_span_handler))
+        _span_handler.callbacks.append(callback)
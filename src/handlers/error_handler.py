@@ -0,0 +1,121 @@
+import asyncio
+import random
+import time
+from typing import Awaitable, Callable, Optional, TypeVar
+
+from botocore.exceptions import ClientError
+
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+T = TypeVar("T")
+
+THROTTLING_ERROR_CODES = {
+    "ThrottlingException",
+    "TooManyRequestsException",
+    "ServiceUnavailableException",
+    "ModelNotReadyException",
+}
+THROTTLING_MARKERS = ("throttl", "rate limit", "too many requests", "429")
+
+
+def is_throttling_error(error: BaseException) -> bool:
+    """
+    Return True if an error means the provider is throttling us.
+
+    Bedrock raises botocore ClientErrors with a throttling error code; Gemini
+    raises google.api_core ResourceExhausted (HTTP 429). Anything else is
+    matched on its class name and message.
+    """
+    if isinstance(error, ClientError):
+        return error.response.get("Error", {}).get("Code") in THROTTLING_ERROR_CODES
+    if type(error).__name__ == "ResourceExhausted":
+        return True
+    message = str(error).lower()
+    return any(marker in message for marker in THROTTLING_MARKERS)
+
+
+def backoff_delay(attempt: int, base_delay: float, max_delay: float) -> float:
+    """
+    Exponential backoff with full jitter for the given retry attempt.
+    """
+    return random.uniform(0, min(max_delay, base_delay * 2**attempt))
+
+
+async def aretry_on_throttle(
+    func: Callable[[], Awaitable[T]],
+    max_retries: int = 5,
+    base_delay: float = 1.0,
+    max_delay: float = 30.0,
+    on_throttle: Optional[Callable[[], None]] = None,
+) -> T:
+    """
+    Await func(), retrying with jittered exponential backoff while throttled.
+
+    Args:
+            func (Callable[[], Awaitable[T]]): Zero-argument coroutine factory.
+            max_retries (int, optional): Retries before giving up. Defaults to 5.
+            base_delay (float, optional): First backoff ceiling in seconds. Defaults to 1.0.
+            max_delay (float, optional): Backoff ceiling in seconds. Defaults to 30.0.
+            on_throttle (Callable[[], None], optional): Called on each throttling
+                    error before backing off, e.g. to drain a shared rate limiter.
+
+    Returns:
+            T: The result of func().
+
+    Raises:
+            Exception: The last error, if it is not throttling or retries ran out.
+    """
+    attempt = 0
+    while True:
+        try:
+            return await func()
+        except Exception as e:
+            delay = _throttle_delay(e, attempt, max_retries, base_delay, max_delay)
+            if on_throttle is not None:
+                on_throttle()
+            attempt += 1
+            await asyncio.sleep(delay)
+
+
+def retry_on_throttle(
+    func: Callable[[], T],
+    max_retries: int = 5,
+    base_delay: float = 1.0,
+    max_delay: float = 30.0,
+    on_throttle: Optional[Callable[[], None]] = None,
+) -> T:
+    """
+    Blocking variant of aretry_on_throttle for synchronous clients.
+    """
+    attempt = 0
+    while True:
+        try:
+            return func()
+        except Exception as e:
+            delay = _throttle_delay(e, attempt, max_retries, base_delay, max_delay)
+            if on_throttle is not None:
+                on_throttle()
+            attempt += 1
+            time.sleep(delay)
+
+
+def _throttle_delay(
+    error: Exception,
+    attempt: int,
+    max_retries: int,
+    base_delay: float,
+    max_delay: float,
+) -> float:
+    """
+    Backoff before the next attempt, re-raising errors that must not be retried.
+    """
+    if attempt >= max_retries or not is_throttling_error(error):
+        raise error
+    delay = backoff_delay(attempt, base_delay, max_delay)
+    logger.warning(
+        f"Throttled ({type(error).__name__}), retry {attempt + 1}/{max_retries} "
+        f"in {delay:.2f}s"
+    )
+    return delay
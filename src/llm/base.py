@@ -1,8 +1,51 @@
 import os
 
-from llm.bedrock_client import initialize_bedrock, initialize_bedrock_embed
+import config as cfg
+from llm.bedrock_client import (
+    initialize_bedrock,
+    initialize_bedrock_embed,
+    without_retries,
+)
 from llm.gemini_client import initialize_gemini, initialize_gemini_embed
+from llm.local_client import initialize_local, initialize_local_embed
+from llm.embedding_cache import CachedEmbedding
+from llm.rate_limited import RateLimitedEmbedding, RateLimitedLLM
 from utils.model_utils import model_config
+from utils.rate_limiter import RateLimiter, get_rate_limiter
+
+
+def set_embed_cache(embed_model):
+    cache_cfg = cfg.model.embed_cache
+    if not cache_cfg.enabled:
+        return embed_model
+    return CachedEmbedding(
+        embed_model,
+        cache_dir=cfg.path.data.cache / "embeddings",
+        max_entries=cache_cfg.max_entries,
+        flush_every=cache_cfg.flush_every,
+    )
+
+
+def set_rate_limits(model_provider: str, model_name: str, llm, embed_model):
+    """
+    Wrap the models with their rate limiters and the one throttling retry
+    layer. Models without configured limits get an unlimited limiter, so
+    their calls are still retried.
+    """
+    retry_cfg = cfg.model.retry
+    retry = {
+        "max_retries": retry_cfg.max_retries,
+        "base_delay": retry_cfg.base_delay,
+        "max_delay": retry_cfg.max_delay,
+    }
+    limiters = {}
+    for name in (model_name, "embed"):
+        limiters[name] = get_rate_limiter(model_provider, name) or RateLimiter(
+            name=f"{model_provider}/{name}", rpm=None, tpm=None
+        )
+    llm = RateLimitedLLM(llm, limiters[model_name], **retry)
+    embed_model = RateLimitedEmbedding(embed_model, limiters["embed"], **retry)
+    return llm, embed_model
 
 
 def set_model(model_provider: str, model_name: str, model_type: str):
@@ -13,11 +56,17 @@ def set_model(model_provider: str, model_name: str, model_type: str):
             if aws_session_token:
                 llm_cfg.update({"aws_session_token": aws_session_token})
                 embed_cfg.update({"aws_session_token": aws_session_token})
-            llm = initialize_bedrock(llm_cfg)
-            embed_model = initialize_bedrock_embed(embed_cfg)
+            llm = initialize_bedrock(without_retries(llm_cfg))
+            embed_model = initialize_bedrock_embed(without_retries(embed_cfg))
         case "gemini":
             llm = initialize_gemini(llm_cfg)
             embed_model = initialize_gemini_embed(embed_cfg)
+        case "local":
+            llm = initialize_local(llm_cfg)
+            embed_model = initialize_local_embed(embed_cfg)
         case _:
             raise Exception("The model provider is not available.")
+    llm, embed_model = set_rate_limits(model_provider, model_name, llm, embed_model)
+    # Cache outside the limiter, so cache hits are not charged.
+    embed_model = set_embed_cache(embed_model)
     return {"llm": llm, "embed_model": embed_model}
@@ -1,4 +1,6 @@
 from typing import Dict
+
+from botocore.config import Config
 from llama_index.embeddings.bedrock import BedrockEmbedding
 from llama_index.llms.bedrock import Bedrock
 
@@ -7,6 +9,22 @@ from utils.logger import setup_logger
 logger = setup_logger(__name__)
 
 
+def without_retries(config: Dict) -> Dict:
+    """
+    Client config that makes a single attempt per call: `max_retries=1` stops
+    the client's tenacity retry after the first try (the library minimum),
+    and `max_attempts=0` turns off botocore's retries. Throttling is then
+    retried by the rate-limit wrappers only.
+    """
+    timeout = config.get("timeout", 60.0)
+    botocore_config = Config(
+        retries={"max_attempts": 0, "mode": "standard"},
+        connect_timeout=timeout,
+        read_timeout=timeout,
+    )
+    return {**config, "max_retries": 1, "botocore_config": botocore_config}
+
+
 def initialize_bedrock(llm_config: Dict):
     model_name = llm_config["model"]
     logger.info(f"Setting AWS LLM: {model_name}")
@@ -0,0 +1,311 @@
+import atexit
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+from llama_index.core.base.embeddings.base import BaseEmbedding, Embedding
+from pydantic import PrivateAttr
+
+from llm.embedding_proxy import EmbeddingProxy
+from utils.file_utils import load_obj, save_obj
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+
+def normalize_text(text: str) -> str:
+    return " ".join(text.split())
+
+
+def hash_text(text: str) -> str:
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+
+# Rows the vector file starts with; it doubles as needed up to max_entries.
+INITIAL_ROWS = 1024
+# Bytes of each slot's key digest, stored next to its vector.
+KEY_BYTES = 16
+STORE_VERSION = 2
+
+
+def key_digest(key: str) -> bytes:
+    return hashlib.sha256(key.encode("utf-8")).digest()[:KEY_BYTES]
+
+
+class EmbeddingStore:
+    """
+    Size-bounded, on-disk embedding store for a single embedding model.
+
+    Vectors live in a float32 memory-mapped matrix (`vectors.f32`) with one
+    row per slot, grown by doubling up to `max_entries` rows. `index.json`
+    maps keys to slots in LRU order. When the store is full, the least
+    recently used slot is overwritten. The index is flushed every
+    `flush_every` writes and at interpreter exit.
+
+    Each slot also records a digest of its key (`keys.u8`), cleared while
+    the vector is rewritten. If the process dies between index flushes, the
+    index may map a key to a slot that was since reused; `get` checks the
+    digest, so such entries read as misses and never return another text's
+    vector.
+
+    A store directory must only be written by one process at a time.
+    """
+
+    def __init__(self, path: Path, max_entries: int, flush_every: int = 1024):
+        self.path = path
+        self.max_entries = max_entries
+        self.flush_every = flush_every
+        self.dim: Optional[int] = None
+        self._slots: OrderedDict[str, int] = OrderedDict()
+        self._free: List[int] = []
+        self._next = 0
+        self._rows = 0
+        self._vectors: Optional[np.memmap] = None
+        self._keys: Optional[np.memmap] = None
+        self._dirty = 0
+        self._lock = threading.Lock()
+        self._load()
+
+    @property
+    def index_path(self) -> Path:
+        return self.path / "index.json"
+
+    @property
+    def vectors_path(self) -> Path:
+        return self.path / "vectors.f32"
+
+    @property
+    def keys_path(self) -> Path:
+        return self.path / "keys.u8"
+
+    def _load(self) -> None:
+        paths = (self.index_path, self.vectors_path, self.keys_path)
+        if not all(path.exists() for path in paths):
+            return
+        index = load_obj(self.index_path)
+        if (
+            index.get("version") != STORE_VERSION
+            or index["max_entries"] != self.max_entries
+        ):
+            logger.warning(
+                f"Embedding cache {self.path} has an old format or a different "
+                f"capacity than {self.max_entries}. Resetting it."
+            )
+            return
+        self.dim = index["dim"]
+        self._map(index["rows"], "r+")
+        self._slots = OrderedDict(index["entries"])
+        self._next = max(self._slots.values(), default=-1) + 1
+        used = set(self._slots.values())
+        self._free = [slot for slot in range(self._next) if slot not in used]
+        logger.info(f"Loaded {len(self._slots)} cached embeddings from {self.path}")
+
+    def _map(self, rows: int, mode: str) -> None:
+        self._vectors = np.memmap(
+            self.vectors_path, dtype=np.float32, mode=mode, shape=(rows, self.dim)
+        )
+        self._keys = np.memmap(
+            self.keys_path, dtype=np.uint8, mode=mode, shape=(rows, KEY_BYTES)
+        )
+        self._rows = rows
+
+    def _allocate(self, dim: int) -> None:
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.dim = dim
+        self._slots = OrderedDict()
+        self._free = []
+        self._next = 0
+        self._map(min(INITIAL_ROWS, self.max_entries), "w+")
+
+    def _grow(self) -> None:
+        rows = min(2 * self._rows, self.max_entries)
+        self._vectors.flush()
+        self._keys.flush()
+        for path, row_bytes in (
+            (self.vectors_path, 4 * self.dim),
+            (self.keys_path, KEY_BYTES),
+        ):
+            with open(path, "r+b") as f:
+                f.truncate(rows * row_bytes)
+        self._map(rows, "r+")
+
+    def _new_slot(self) -> int:
+        if self._free:
+            return self._free.pop()
+        if self._next < self.max_entries:
+            if self._next >= self._rows:
+                self._grow()
+            self._next += 1
+            return self._next - 1
+        _, slot = self._slots.popitem(last=False)
+        return slot
+
+    def get(self, key: str) -> Optional[Embedding]:
+        with self._lock:
+            slot = self._slots.get(key)
+            if slot is None:
+                return None
+            if self._keys[slot].tobytes() != key_digest(key):
+                # Stale index entry: the slot was reused after the last flush.
+                del self._slots[key]
+                self._free.append(slot)
+                return None
+            self._slots.move_to_end(key)
+            return self._vectors[slot].tolist()
+
+    def put(self, key: str, embedding: Embedding) -> None:
+        with self._lock:
+            if self._vectors is None:
+                self._allocate(len(embedding))
+            if len(embedding) != self.dim:
+                return
+            slot = self._slots.pop(key, None)
+            if slot is None:
+                slot = self._new_slot()
+            self._keys[slot] = 0
+            self._vectors[slot] = embedding
+            self._keys[slot] = np.frombuffer(key_digest(key), dtype=np.uint8)
+            self._slots[key] = slot
+            self._dirty += 1
+            if self._dirty >= self.flush_every:
+                self._flush()
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush()
+
+    def _flush(self) -> None:
+        if self._vectors is None or not self._dirty:
+            return
+        self._vectors.flush()
+        self._keys.flush()
+        index = {
+            "version": STORE_VERSION,
+            "dim": self.dim,
+            "max_entries": self.max_entries,
+            "rows": self._rows,
+            "entries": list(self._slots.items()),
+        }
+        # Write-then-rename, so a crash never leaves a truncated index.
+        tmp_path = self.path / "index.tmp.json"
+        save_obj(index, tmp_path)
+        os.replace(tmp_path, self.index_path)
+        self._dirty = 0
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+
+_stores: Dict[Path, EmbeddingStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_store(path: Path, max_entries: int, flush_every: int = 1024) -> EmbeddingStore:
+    """
+    Return the process-wide store for a cache directory, opening it once.
+    """
+    with _stores_lock:
+        store = _stores.get(path)
+        if store is None:
+            store = EmbeddingStore(path, max_entries, flush_every)
+            _stores[path] = store
+            atexit.register(store.flush)
+        return store
+
+
+def get_store_path(cache_dir: Path, model_name: str, kind: str) -> Path:
+    slug = re.sub(r"[^A-Za-z0-9._-]+", "_", model_name)
+    return cache_dir / slug / kind
+
+
+class CachedEmbedding(EmbeddingProxy):
+    """
+    Embedding model backed by a persistent on-disk cache.
+
+    Lookups are keyed by the embedding model name plus the SHA-256 of the
+    whitespace-normalized text. Query and text embeddings are cached
+    separately since some providers embed them differently.
+    """
+
+    _text_store: EmbeddingStore = PrivateAttr()
+    _query_store: EmbeddingStore = PrivateAttr()
+
+    def __init__(
+        self,
+        embed_model: BaseEmbedding,
+        cache_dir: Path,
+        max_entries: int,
+        flush_every: int = 1024,
+    ):
+        super().__init__(embed_model)
+        model_name = embed_model.model_name
+        self._text_store = get_store(
+            get_store_path(cache_dir, model_name, "text"), max_entries, flush_every
+        )
+        self._query_store = get_store(
+            get_store_path(cache_dir, model_name, "query"), max_entries, flush_every
+        )
+
+    def _get_query_embedding(self, query: str) -> Embedding:
+        key = hash_text(query)
+        embedding = self._query_store.get(key)
+        if embedding is None:
+            embedding = super()._get_query_embedding(query)
+            self._query_store.put(key, embedding)
+        return embedding
+
+    async def _aget_query_embedding(self, query: str) -> Embedding:
+        key = hash_text(query)
+        embedding = self._query_store.get(key)
+        if embedding is None:
+            embedding = await super()._aget_query_embedding(query)
+            self._query_store.put(key, embedding)
+        return embedding
+
+    def _get_text_embedding(self, text: str) -> Embedding:
+        return self._get_text_embeddings([text])[0]
+
+    async def _aget_text_embedding(self, text: str) -> Embedding:
+        return (await self._aget_text_embeddings([text]))[0]
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[Embedding]:
+        keys, embeddings, misses = self._lookup(texts)
+        if misses:
+            missing = super()._get_text_embeddings([texts[i] for i in misses.values()])
+            self._fill(keys, embeddings, misses, missing)
+        return embeddings
+
+    async def _aget_text_embeddings(self, texts: List[str]) -> List[Embedding]:
+        keys, embeddings, misses = self._lookup(texts)
+        if misses:
+            missing = await super()._aget_text_embeddings(
+                [texts[i] for i in misses.values()]
+            )
+            self._fill(keys, embeddings, misses, missing)
+        return embeddings
+
+    def _lookup(self, texts: List[str]):
+        """
+        Return text keys, cached embeddings (None on miss) and the first
+        position of each missing key, so duplicate texts are embedded once.
+        """
+        keys = [hash_text(text) for text in texts]
+        embeddings = [self._text_store.get(key) for key in keys]
+        misses = {}
+        for i, (key, embedding) in enumerate(zip(keys, embeddings)):
+            if embedding is None:
+                misses.setdefault(key, i)
+        return keys, embeddings, misses
+
+    def _fill(self, keys, embeddings, misses, missing) -> None:
+        fetched = dict(zip(misses, missing))
+        for key, embedding in fetched.items():
+            self._text_store.put(key, embedding)
+        for i, key in enumerate(keys):
+            if embeddings[i] is None:
+                embeddings[i] = fetched[key]
@@ -0,0 +1,51 @@
+from typing import Any, List
+
+from llama_index.core.base.embeddings.base import BaseEmbedding, Embedding
+from pydantic import PrivateAttr
+
+
+class EmbeddingProxy(BaseEmbedding):
+    """
+    Embedding model that delegates every call to a wrapped embedding model.
+
+    Subclasses override the hooks they need (caching, rate limiting, ...) and
+    fall back to the wrapped model for the rest. Delegation goes to the
+    wrapped model's private hooks, so batching and instrumentation happen
+    once, in the outermost model.
+    """
+
+    _embed_model: BaseEmbedding = PrivateAttr()
+
+    def __init__(self, embed_model: BaseEmbedding, **kwargs: Any):
+        super().__init__(
+            model_name=embed_model.model_name,
+            embed_batch_size=embed_model.embed_batch_size,
+            **kwargs,
+        )
+        self._embed_model = embed_model
+
+    @classmethod
+    def class_name(cls) -> str:
+        return cls.__name__
+
+    @property
+    def embed_model(self) -> BaseEmbedding:
+        return self._embed_model
+
+    def _get_query_embedding(self, query: str) -> Embedding:
+        return self._embed_model._get_query_embedding(query)
+
+    async def _aget_query_embedding(self, query: str) -> Embedding:
+        return await self._embed_model._aget_query_embedding(query)
+
+    def _get_text_embedding(self, text: str) -> Embedding:
+        return self._embed_model._get_text_embedding(text)
+
+    async def _aget_text_embedding(self, text: str) -> Embedding:
+        return await self._embed_model._aget_text_embedding(text)
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[Embedding]:
+        return self._embed_model._get_text_embeddings(texts)
+
+    async def _aget_text_embeddings(self, texts: List[str]) -> List[Embedding]:
+        return await self._embed_model._aget_text_embeddings(texts)
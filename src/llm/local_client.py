@@ -0,0 +1,18 @@
+from typing import Dict
+
+from llm.local_models import HashingEmbedding, LocalLLM
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+
+def initialize_local(llm_config: Dict):
+    model_name = llm_config["model"]
+    logger.info(f"Setting local LLM: {model_name}")
+    return LocalLLM(**llm_config)
+
+
+def initialize_local_embed(embed_config: Dict):
+    model_name = embed_config["model_name"]
+    logger.info(f"Setting local Embedding: {model_name}")
+    return HashingEmbedding(**embed_config)
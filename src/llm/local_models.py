@@ -0,0 +1,215 @@
+import asyncio
+import hashlib
+import math
+import random
+import re
+import time
+import zlib
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+from llama_index.core.base.embeddings.base import BaseEmbedding, Embedding
+from llama_index.core.base.llms.types import (
+    ChatMessage,
+    ChatResponse,
+    CompletionResponse,
+    CompletionResponseAsyncGen,
+    CompletionResponseGen,
+    LLMMetadata,
+)
+from llama_index.core.bridge.pydantic import Field
+from llama_index.core.llms.callbacks import llm_chat_callback, llm_completion_callback
+from llama_index.core.llms.custom import CustomLLM
+from llama_index.core.base.llms.generic_utils import (
+    completion_response_to_chat_response,
+)
+
+WORD_PATTERN = re.compile(r"\w+")
+
+
+def seeded_rng(text: str, seed: int) -> random.Random:
+    digest = hashlib.sha256(f"{seed}:{text}".encode("utf-8")).digest()
+    return random.Random(int.from_bytes(digest[:8], "big"))
+
+
+def sample_latency(latency: Dict[str, Any], rng: random.Random) -> float:
+    """
+    Draw a latency in seconds from a `{distribution, mean, ...}` config.
+
+    `fixed` always returns `mean`; `uniform` draws from [low, high];
+    `normal` uses `std`; `lognormal` has the given `mean` and log-space
+    `sigma`, giving the long right tail typical of provider latencies.
+    """
+    distribution = latency.get("distribution", "fixed")
+    mean = latency.get("mean", 0.0)
+    match distribution:
+        case "fixed":
+            value = mean
+        case "uniform":
+            value = rng.uniform(latency.get("low", 0.0), latency.get("high", mean))
+        case "normal":
+            value = rng.gauss(mean, latency.get("std", 0.0))
+        case "lognormal":
+            sigma = latency.get("sigma", 0.0)
+            mu = math.log(mean) - sigma**2 / 2 if mean > 0 else 0.0
+            value = rng.lognormvariate(mu, sigma) if mean > 0 else 0.0
+        case _:
+            raise Exception(f"Unknown latency distribution: {distribution}")
+    return max(value, 0.0)
+
+
+class LocalLLM(CustomLLM):
+    """
+    Offline stand-in for a provider LLM.
+
+    The answer is a deterministic function of the prompt: either the fixed
+    `response` text, or `output_tokens` words sampled from the prompt with a
+    prompt-seeded RNG (so answers overlap the retrieved context). Timing
+    mimics a provider: a first-token latency drawn from `latency`, then
+    `tokens_per_second` (0 for instant). Sync calls block with `time.sleep`
+    and async calls with `asyncio.sleep`, like real network clients.
+    """
+
+    model: str = "local-llm"
+    context_size: int = 200000
+    output_tokens: int = 128
+    tokens_per_second: float = 0.0
+    latency: Dict[str, Any] = Field(default_factory=lambda: {"distribution": "fixed"})
+    response: Optional[str] = None
+    temperature: float = 0.0
+    seed: int = 0
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "LocalLLM"
+
+    @property
+    def metadata(self) -> LLMMetadata:
+        return LLMMetadata(
+            context_window=self.context_size,
+            num_output=self.output_tokens,
+            model_name=self.model,
+        )
+
+    def generate(self, prompt: str) -> List[str]:
+        rng = seeded_rng(prompt, self.seed)
+        if self.response is not None:
+            tokens = self.response.split(" ")
+        else:
+            words = WORD_PATTERN.findall(prompt) or ["local"]
+            tokens = [rng.choice(words) for _ in range(self.output_tokens)]
+        return [token if i == 0 else f" {token}" for i, token in enumerate(tokens)]
+
+    def timings(self, prompt: str, n_tokens: int) -> List[float]:
+        """
+        Seconds to wait before each token; the first includes the latency.
+        """
+        rng = seeded_rng(prompt, self.seed + 1)
+        per_token = 1 / self.tokens_per_second if self.tokens_per_second else 0.0
+        first = sample_latency(self.latency, rng)
+        return [first + per_token] + [per_token] * (n_tokens - 1)
+
+    def stream_tokens(self, prompt: str) -> Iterator[tuple]:
+        tokens = self.generate(prompt)
+        return zip(tokens, self.timings(prompt, len(tokens)))
+
+    @llm_completion_callback()
+    def complete(
+        self, prompt: str, formatted: bool = False, **kwargs: Any
+    ) -> CompletionResponse:
+        tokens = self.generate(prompt)
+        time.sleep(sum(self.timings(prompt, len(tokens))))
+        return CompletionResponse(text="".join(tokens))
+
+    @llm_completion_callback()
+    def stream_complete(
+        self, prompt: str, formatted: bool = False, **kwargs: Any
+    ) -> CompletionResponseGen:
+        def gen() -> CompletionResponseGen:
+            text = ""
+            for token, delay in self.stream_tokens(prompt):
+                time.sleep(delay)
+                text += token
+                yield CompletionResponse(text=text, delta=token)
+
+        return gen()
+
+    @llm_completion_callback()
+    async def acomplete(
+        self, prompt: str, formatted: bool = False, **kwargs: Any
+    ) -> CompletionResponse:
+        tokens = self.generate(prompt)
+        await asyncio.sleep(sum(self.timings(prompt, len(tokens))))
+        return CompletionResponse(text="".join(tokens))
+
+    @llm_completion_callback()
+    async def astream_complete(
+        self, prompt: str, formatted: bool = False, **kwargs: Any
+    ) -> CompletionResponseAsyncGen:
+        async def gen() -> CompletionResponseAsyncGen:
+            text = ""
+            for token, delay in self.stream_tokens(prompt):
+                await asyncio.sleep(delay)
+                text += token
+                yield CompletionResponse(text=text, delta=token)
+
+        return gen()
+
+    @llm_chat_callback()
+    async def achat(
+        self, messages: Sequence[ChatMessage], **kwargs: Any
+    ) -> ChatResponse:
+        prompt = self.messages_to_prompt(messages)
+        completion_response = await self.acomplete(prompt, formatted=True, **kwargs)
+        return completion_response_to_chat_response(completion_response)
+
+
+class HashingEmbedding(BaseEmbedding):
+    """
+    Offline stand-in for a provider embedding model.
+
+    Feature hashing of lower-cased words into `dim` signed buckets (CRC32
+    picks the bucket, a second hash the sign), L2-normalized. Embeddings
+    are deterministic and texts sharing words are close, so retrieval
+    returns sensible neighbours without any model. `latency` adds a fixed
+    delay per call.
+    """
+
+    dim: int = 384
+    latency: float = 0.0
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "HashingEmbedding"
+
+    def embed(self, text: str) -> Embedding:
+        vector = [0.0] * self.dim
+        for word in WORD_PATTERN.findall(text.lower()):
+            encoded = word.encode("utf-8")
+            sign = 1.0 if zlib.adler32(encoded) & 1 else -1.0
+            vector[zlib.crc32(encoded) % self.dim] += sign
+        norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+        return [value / norm for value in vector]
+
+    def _get_query_embedding(self, query: str) -> Embedding:
+        time.sleep(self.latency)
+        return self.embed(query)
+
+    async def _aget_query_embedding(self, query: str) -> Embedding:
+        await asyncio.sleep(self.latency)
+        return self.embed(query)
+
+    def _get_text_embedding(self, text: str) -> Embedding:
+        time.sleep(self.latency)
+        return self.embed(text)
+
+    async def _aget_text_embedding(self, text: str) -> Embedding:
+        await asyncio.sleep(self.latency)
+        return self.embed(text)
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[Embedding]:
+        time.sleep(self.latency)
+        return [self.embed(text) for text in texts]
+
+    async def _aget_text_embeddings(self, texts: List[str]) -> List[Embedding]:
+        await asyncio.sleep(self.latency)
+        return [self.embed(text) for text in texts]
@@ -0,0 +1,279 @@
+from typing import (
+    Any,
+    AsyncGenerator,
+    Callable,
+    Dict,
+    Generator,
+    List,
+    Sequence,
+    TypeVar,
+)
+
+from llama_index.core.base.embeddings.base import BaseEmbedding, Embedding
+from llama_index.core.base.llms.types import (
+    ChatMessage,
+    ChatResponse,
+    CompletionResponse,
+    LLMMetadata,
+)
+from llama_index.core.llms import LLM
+from pydantic import PrivateAttr
+
+from handlers.error_handler import aretry_on_throttle, retry_on_throttle
+from llm.embedding_proxy import EmbeddingProxy
+from utils.rate_limiter import RateLimiter
+from utils.token_counter import approx_count
+
+T = TypeVar("T")
+
+
+def count_messages(messages: Sequence[ChatMessage]) -> int:
+    return sum(approx_count(message.content or "") for message in messages)
+
+
+class RateLimitedEmbedding(EmbeddingProxy):
+    """
+    Embedding model that waits for its provider's RPM/TPM budget before each
+    call and retries throttled calls with jittered backoff.
+    """
+
+    _limiter: RateLimiter = PrivateAttr()
+    _retry: Dict[str, float] = PrivateAttr()
+
+    def __init__(
+        self,
+        embed_model: BaseEmbedding,
+        limiter: RateLimiter,
+        max_retries: int = 5,
+        base_delay: float = 1.0,
+        max_delay: float = 30.0,
+        **kwargs: Any,
+    ):
+        super().__init__(embed_model, **kwargs)
+        self._limiter = limiter
+        self._retry = {
+            "max_retries": max_retries,
+            "base_delay": base_delay,
+            "max_delay": max_delay,
+        }
+
+    def _call(self, func: Callable[[], T], tokens: int, requests: int = 1) -> T:
+        def attempt() -> T:
+            self._limiter.acquire_sync(tokens, requests)
+            return func()
+
+        return retry_on_throttle(
+            attempt, on_throttle=self._limiter.throttled, **self._retry
+        )
+
+    async def _acall(
+        self, func: Callable[[], Any], tokens: int, requests: int = 1
+    ) -> Any:
+        async def attempt():
+            await self._limiter.acquire(tokens, requests)
+            return await func()
+
+        return await aretry_on_throttle(
+            attempt, on_throttle=self._limiter.throttled, **self._retry
+        )
+
+    def _get_query_embedding(self, query: str) -> Embedding:
+        return self._call(
+            lambda: self._embed_model._get_query_embedding(query), approx_count(query)
+        )
+
+    async def _aget_query_embedding(self, query: str) -> Embedding:
+        return await self._acall(
+            lambda: self._embed_model._aget_query_embedding(query), approx_count(query)
+        )
+
+    def _get_text_embedding(self, text: str) -> Embedding:
+        return self._call(
+            lambda: self._embed_model._get_text_embedding(text), approx_count(text)
+        )
+
+    async def _aget_text_embedding(self, text: str) -> Embedding:
+        return await self._acall(
+            lambda: self._embed_model._aget_text_embedding(text), approx_count(text)
+        )
+
+    # Titan embeds a batch with one request per text, so a batch is charged
+    # one request per text.
+    def _get_text_embeddings(self, texts: List[str]) -> List[Embedding]:
+        return self._call(
+            lambda: self._embed_model._get_text_embeddings(texts),
+            sum(approx_count(text) for text in texts),
+            requests=len(texts),
+        )
+
+    async def _aget_text_embeddings(self, texts: List[str]) -> List[Embedding]:
+        return await self._acall(
+            lambda: self._embed_model._aget_text_embeddings(texts),
+            sum(approx_count(text) for text in texts),
+            requests=len(texts),
+        )
+
+
+class RateLimitedLLM(LLM):
+    """
+    LLM that delegates to a wrapped LLM under its provider's RPM/TPM budget.
+
+    Each call reserves one request and the prompt tokens plus
+    `max_output_tokens`, then settles the reservation with the real output
+    size. Throttled calls drain the budget, so concurrent callers back off
+    together, and are retried with jittered backoff. Streaming calls are
+    admitted once; the stream itself is not retried.
+    """
+
+    max_output_tokens: int = 1024
+    max_retries: int = 5
+    base_delay: float = 1.0
+    max_delay: float = 30.0
+
+    _llm: LLM = PrivateAttr()
+    _limiter: RateLimiter = PrivateAttr()
+
+    def __init__(self, llm: LLM, limiter: RateLimiter, **kwargs: Any):
+        super().__init__(
+            callback_manager=llm.callback_manager,
+            system_prompt=llm.system_prompt,
+            messages_to_prompt=llm.messages_to_prompt,
+            completion_to_prompt=llm.completion_to_prompt,
+            output_parser=llm.output_parser,
+            pydantic_program_mode=llm.pydantic_program_mode,
+            query_wrapper_prompt=llm.query_wrapper_prompt,
+            **kwargs,
+        )
+        self._llm = llm
+        self._limiter = limiter
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "RateLimitedLLM"
+
+    @property
+    def llm(self) -> LLM:
+        return self._llm
+
+    @property
+    def metadata(self) -> LLMMetadata:
+        return self._llm.metadata
+
+    def _retry_kwargs(self) -> Dict[str, Any]:
+        return {
+            "max_retries": self.max_retries,
+            "base_delay": self.base_delay,
+            "max_delay": self.max_delay,
+            "on_throttle": self._limiter.throttled,
+        }
+
+    def _estimate(self, prompt_tokens: int) -> int:
+        return prompt_tokens + self.max_output_tokens
+
+    def _settle(self, estimated: int, prompt_tokens: int, text: str) -> None:
+        self._limiter.settle(estimated, prompt_tokens + approx_count(text))
+
+    def _call(self, func: Callable[[], T], prompt_tokens: int) -> T:
+        estimated = self._estimate(prompt_tokens)
+
+        def attempt() -> T:
+            self._limiter.acquire_sync(estimated)
+            return func()
+
+        response = retry_on_throttle(attempt, **self._retry_kwargs())
+        self._settle(estimated, prompt_tokens, _response_text(response))
+        return response
+
+    async def _acall(self, func: Callable[[], Any], prompt_tokens: int) -> Any:
+        estimated = self._estimate(prompt_tokens)
+
+        async def attempt():
+            await self._limiter.acquire(estimated)
+            return await func()
+
+        response = await aretry_on_throttle(attempt, **self._retry_kwargs())
+        self._settle(estimated, prompt_tokens, _response_text(response))
+        return response
+
+    def _stream(self, func: Callable[[], Generator], prompt_tokens: int) -> Generator:
+        estimated = self._estimate(prompt_tokens)
+        self._limiter.acquire_sync(estimated)
+        response = None
+        try:
+            for response in func():
+                yield response
+        finally:
+            self._settle(estimated, prompt_tokens, _response_text(response))
+
+    async def _astream(
+        self, func: Callable[[], Any], prompt_tokens: int
+    ) -> AsyncGenerator:
+        estimated = self._estimate(prompt_tokens)
+        await self._limiter.acquire(estimated)
+        response = None
+        try:
+            async for response in await func():
+                yield response
+        finally:
+            self._settle(estimated, prompt_tokens, _response_text(response))
+
+    def chat(self, messages: Sequence[ChatMessage], **kwargs: Any) -> ChatResponse:
+        return self._call(
+            lambda: self._llm.chat(messages, **kwargs), count_messages(messages)
+        )
+
+    def complete(
+        self, prompt: str, formatted: bool = False, **kwargs: Any
+    ) -> CompletionResponse:
+        return self._call(
+            lambda: self._llm.complete(prompt, formatted=formatted, **kwargs),
+            approx_count(prompt),
+        )
+
+    def stream_chat(self, messages: Sequence[ChatMessage], **kwargs: Any):
+        return self._stream(
+            lambda: self._llm.stream_chat(messages, **kwargs), count_messages(messages)
+        )
+
+    def stream_complete(self, prompt: str, formatted: bool = False, **kwargs: Any):
+        return self._stream(
+            lambda: self._llm.stream_complete(prompt, formatted=formatted, **kwargs),
+            approx_count(prompt),
+        )
+
+    async def achat(
+        self, messages: Sequence[ChatMessage], **kwargs: Any
+    ) -> ChatResponse:
+        return await self._acall(
+            lambda: self._llm.achat(messages, **kwargs), count_messages(messages)
+        )
+
+    async def acomplete(
+        self, prompt: str, formatted: bool = False, **kwargs: Any
+    ) -> CompletionResponse:
+        return await self._acall(
+            lambda: self._llm.acomplete(prompt, formatted=formatted, **kwargs),
+            approx_count(prompt),
+        )
+
+    async def astream_chat(self, messages: Sequence[ChatMessage], **kwargs: Any):
+        return self._astream(
+            lambda: self._llm.astream_chat(messages, **kwargs),
+            count_messages(messages),
+        )
+
+    async def astream_complete(
+        self, prompt: str, formatted: bool = False, **kwargs: Any
+    ):
+        return self._astream(
+            lambda: self._llm.astream_complete(prompt, formatted=formatted, **kwargs),
+            approx_count(prompt),
+        )
+
+
+def _response_text(response: Any) -> str:
+    if response is None:
+        return ""
+    if isinstance(response, ChatResponse):
+        return response.message.content or ""
+    return getattr(response, "text", "") or ""
@@ -0,0 +1,80 @@
+import asyncio
+import threading
+from typing import Any, AsyncIterator, Coroutine, Iterator, Optional, TypeVar
+
+T = TypeVar("T")
+
+_DONE = object()
+
+
+async def aiter_in_thread(iterator: Iterator[T]) -> AsyncIterator[T]:
+    """
+    Consume a blocking iterator from async code without blocking the event loop.
+
+    Each `next()` call runs in the default executor, so other tasks keep
+    running while the iterator waits on I/O or a worker pool.
+    """
+    while True:
+        item = await asyncio.to_thread(next, iterator, _DONE)
+        if item is _DONE:
+            return
+        yield item
+
+
+class EventLoopThread:
+    """
+    A persistent event loop running on a daemon thread.
+
+    Async clients (AsyncQdrantClient, aiohttp/httpx pools) are bound to the
+    loop they were first used on, so calling `asyncio.run` per request both
+    tears down their connections and breaks cached engines holding them.
+    Synchronous entry points submit coroutines here instead, so every call
+    shares one loop and its connection pools.
+    """
+
+    def __init__(self, name: str = "event-loop"):
+        self.name = name
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None or self._loop.is_closed():
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(
+                    target=self._loop.run_forever, name=self.name, daemon=True
+                )
+                self._thread.start()
+            return self._loop
+
+    def run(self, coro: Coroutine[Any, Any, T], timeout: Optional[float] = None) -> T:
+        """
+        Run a coroutine on the shared loop and block until it finishes.
+        """
+        loop = self.loop
+        if threading.current_thread() is self._thread:
+            coro.close()
+            raise RuntimeError("run() cannot be called from the shared loop itself")
+        return asyncio.run_coroutine_threadsafe(coro, loop).result(timeout)
+
+    def stop(self) -> None:
+        with self._lock:
+            if self._loop is None:
+                return
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop.close()
+            self._loop = None
+            self._thread = None
+
+
+shared_loop = EventLoopThread()
+
+
+def run_sync(coro: Coroutine[Any, Any, T], timeout: Optional[float] = None) -> T:
+    """
+    Run a coroutine to completion on the process-wide shared event loop.
+    """
+    return shared_loop.run(coro, timeout=timeout)
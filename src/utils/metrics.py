@@ -0,0 +1,105 @@
+from http.server import ThreadingHTTPServer
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from prometheus_client import REGISTRY, CollectorRegistry, start_http_server
+from prometheus_client.core import (
+    CounterMetricFamily,
+    GaugeMetricFamily,
+    Metric,
+)
+from prometheus_client.registry import Collector
+
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+LATENCY_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+)
+
+Sample = Tuple[Dict[str, str], float]
+
+METRIC_FAMILIES = {"counter": CounterMetricFamily, "gauge": GaugeMetricFamily}
+
+
+class CallbackCollector(Collector):
+    """
+    Metric whose samples are read from existing stats at scrape time, so
+    the code being measured pays nothing.
+
+    A "counter" must only ever increase, so use it for process-lifetime
+    totals; stats that can reset (e.g. of a cache that is rebuilt) must be
+    exported as a "gauge".
+    """
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        collect: Callable[[], List[Sample]],
+        labels: Sequence[str] = (),
+        kind: str = "gauge",
+    ):
+        if kind not in METRIC_FAMILIES:
+            raise Exception(f"Unknown callback metric kind: {kind}")
+        self.name = name
+        self.help = help
+        self.labels = list(labels)
+        self.kind = kind
+        self._collect = collect
+
+    def family(self) -> Metric:
+        return METRIC_FAMILIES[self.kind](self.name, self.help, labels=self.labels)
+
+    def describe(self) -> Iterator[Metric]:
+        yield self.family()
+
+    def collect(self) -> Iterator[Metric]:
+        family = self.family()
+        try:
+            for labels, value in self._collect():
+                family.add_metric([labels[name] for name in self.labels], value)
+        except Exception as e:
+            logger.warning(f"Failed to collect metric {self.name}: {e}")
+        yield family
+
+
+def add_callback(
+    name: str,
+    help: str,
+    collect: Callable[[], List[Sample]],
+    labels: Sequence[str] = (),
+    kind: str = "gauge",
+    registry: CollectorRegistry = REGISTRY,
+) -> CallbackCollector:
+    collector = CallbackCollector(name, help, collect, labels, kind)
+    registry.register(collector)
+    return collector
+
+
+def start_metrics_server(
+    port: int, host: str = "0.0.0.0"
+) -> Optional[ThreadingHTTPServer]:
+    """
+    Serve the default Prometheus registry at `/metrics` from a daemon
+    thread. Returns None if the port is taken.
+    """
+    try:
+        server, _ = start_http_server(port, addr=host)
+    except OSError as e:
+        logger.warning(f"Metrics server not started on {host}:{port}: {e}")
+        return None
+    logger.info(f"Serving metrics on http://{host}:{port}/metrics")
+    return server
@@ -4,7 +4,9 @@ from utils.file_utils import convert_namespace_to_dict
 
 def model_config(model_provider: str, model_name: str, model_type: str):
     model_cfg = cfg.model
-    gen_cfg = model_cfg.gen_params
+    gen_cfg = (
+        model_cfg.gen_params_eval if model_type == "llm_eval" else model_cfg.gen_params
+    )
     gen_cfg = convert_namespace_to_dict(gen_cfg)
 
     # Model Provider Config
@@ -0,0 +1,145 @@
+import asyncio
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+import config as cfg
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously at `rate` units per second.
+
+    `reserve` takes the units immediately, letting the balance go negative,
+    and returns how long the caller must wait before the reservation is
+    covered. Callers therefore queue in reservation order and the bucket
+    never admits more than `capacity` units plus what has refilled. State is
+    guarded by a thread lock that is never held while waiting, so one bucket
+    can be shared by event loops and worker threads.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._updated
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+        self._updated = now
+
+    def reserve(self, amount: float) -> float:
+        """
+        Take `amount` units and return the seconds to wait before using them.
+        """
+        # A single request larger than the bucket waits for a full bucket.
+        amount = min(amount, self.capacity)
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens -= amount
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def adjust(self, amount: float) -> None:
+        """
+        Give back (positive) or charge (negative) units after the fact.
+        """
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self.capacity, self._tokens + amount)
+
+    def drain(self) -> None:
+        """
+        Empty the bucket, e.g. after the provider throttled us anyway.
+        """
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self._tokens, 0.0)
+
+
+class RateLimiter:
+    """
+    Requests-per-minute and tokens-per-minute budgets for one model.
+
+    Each call reserves its requests and estimated tokens up front; the
+    estimate is corrected with `settle` once the real token count is known.
+    `acquire` waits with `asyncio.sleep`, `acquire_sync` with `time.sleep`
+    for the synchronous client paths (Bedrock streaming, embedding threads).
+    A limit of None (or 0) disables that budget.
+    """
+
+    def __init__(self, name: str, rpm: Optional[float], tpm: Optional[float]):
+        self.name = name
+        self.requests = TokenBucket(rpm / 60, rpm) if rpm else None
+        self.tokens = TokenBucket(tpm / 60, tpm) if tpm else None
+
+    def _reserve(self, tokens: int, requests: int) -> float:
+        delay = 0.0
+        if self.requests is not None:
+            delay = max(delay, self.requests.reserve(requests))
+        if self.tokens is not None and tokens:
+            delay = max(delay, self.tokens.reserve(tokens))
+        if delay > 0:
+            logger.debug(f"Rate limiting {self.name}: waiting {delay:.2f}s")
+        return delay
+
+    async def acquire(self, tokens: int = 0, requests: int = 1) -> None:
+        delay = self._reserve(tokens, requests)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def acquire_sync(self, tokens: int = 0, requests: int = 1) -> None:
+        delay = self._reserve(tokens, requests)
+        if delay > 0:
+            time.sleep(delay)
+
+    def settle(self, estimated: int, actual: int) -> None:
+        """
+        Correct a reservation of `estimated` tokens to the `actual` usage.
+        """
+        if self.tokens is not None and actual != estimated:
+            self.tokens.adjust(estimated - actual)
+
+    def throttled(self) -> None:
+        """
+        Drain both budgets so every waiting caller backs off together.
+        """
+        for bucket in (self.requests, self.tokens):
+            if bucket is not None:
+                bucket.drain()
+
+
+_limiters: Dict[Tuple[str, str], RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(model_provider: str, model_name: str) -> Optional[RateLimiter]:
+    """
+    Shared limiter for (provider, model) from `model.rate_limits`, or None if
+    rate limiting is disabled or the model has no configured limits.
+
+    Embedding models are configured under the `embed` key of their provider.
+    """
+    limits_cfg = cfg.model.rate_limits
+    if not limits_cfg.enabled:
+        return None
+    limits = getattr(getattr(limits_cfg, model_provider, None), model_name, None)
+    if limits is None:
+        return None
+    key = (model_provider, model_name)
+    with _limiters_lock:
+        limiter = _limiters.get(key)
+        if limiter is None:
+            limiter = RateLimiter(
+                name=f"{model_provider}/{model_name}",
+                rpm=getattr(limits, "rpm", None),
+                tpm=getattr(limits, "tpm", None),
+            )
+            _limiters[key] = limiter
+        return limiter
@@ -0,0 +1,147 @@
+import math
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Callable, Iterable, Optional
+
+from llama_index.core.schema import BaseNode, MetadataMode
+
+import config as cfg
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+TOKEN_COUNT_KEY = "token_count"
+CHARS_PER_TOKEN = 4
+WORD_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+# Local BPE encodings closest to each provider's tokenizer. Neither Claude nor
+# Gemini ships a local tokenizer, so counts for them are close estimates.
+PROVIDER_ENCODINGS = {
+    "aws": "cl100k_base",
+    "gemini": "cl100k_base",
+}
+
+
+def approx_count(text: str) -> int:
+    """
+    Fast token estimate: the larger of ~4 characters per token and the number
+    of words and punctuation marks. No tokenizer is loaded.
+    """
+    if not text:
+        return 0
+    return max(math.ceil(len(text) / CHARS_PER_TOKEN), len(WORD_PATTERN.findall(text)))
+
+
+def get_exact_counter(model_provider: str) -> Optional[Callable[[str], int]]:
+    """
+    Tokenizer-based counter for the provider, or None if tiktoken (or its
+    encoding file) is unavailable. Encoding files are cached under
+    data/cache/tiktoken unless TIKTOKEN_CACHE_DIR is set, so they are
+    downloaded once and shared by every process, parser workers included.
+    """
+    os.environ.setdefault(
+        "TIKTOKEN_CACHE_DIR", (cfg.path.data.cache / "tiktoken").as_posix()
+    )
+    try:
+        import tiktoken
+
+        encoding_name = PROVIDER_ENCODINGS.get(model_provider, "cl100k_base")
+        encoding = tiktoken.get_encoding(encoding_name)
+    except Exception as e:
+        logger.warning(f"No tokenizer available ({e}), using approximate counts")
+        return None
+
+    def count(text: str) -> int:
+        return len(encoding.encode(text, disallowed_special=()))
+
+    return count
+
+
+class TokenCounter:
+    """
+    Token counter with per-node memoization.
+
+    `count` tokenizes raw text (exactly when `exact` and a tokenizer is
+    available, approximately otherwise). `count_node` reads the count stored
+    in the node's `token_count` metadata at index time and falls back to
+    counting, memoized by node id in a bounded LRU, so a chunk is tokenized
+    at most once per process on the request path.
+    """
+
+    def __init__(
+        self, model_provider: str = "aws", exact: bool = False, max_nodes: int = 65536
+    ):
+        self.model_provider = model_provider
+        self.max_nodes = max_nodes
+        exact_counter = get_exact_counter(model_provider) if exact else None
+        self.exact = exact_counter is not None
+        self._count = exact_counter or approx_count
+        self._nodes: OrderedDict[str, int] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def count(self, text: str) -> int:
+        return self._count(text) if text else 0
+
+    def count_node(
+        self, node: BaseNode, metadata_mode: MetadataMode = MetadataMode.NONE
+    ) -> int:
+        """
+        Tokens in the node text. Stored counts cover the text only, so other
+        metadata modes are counted (and memoized) separately.
+        """
+        if metadata_mode == MetadataMode.NONE:
+            stored = node.metadata.get(TOKEN_COUNT_KEY)
+            if stored is not None:
+                return stored
+        key = f"{node.node_id}:{metadata_mode.value}"
+        with self._lock:
+            tokens = self._nodes.get(key)
+            if tokens is not None:
+                self._nodes.move_to_end(key)
+                return tokens
+        tokens = self.count(node.get_content(metadata_mode=metadata_mode))
+        with self._lock:
+            self._nodes[key] = tokens
+            while len(self._nodes) > self.max_nodes:
+                self._nodes.popitem(last=False)
+        return tokens
+
+    def set_node_counts(self, nodes: Iterable[BaseNode]) -> None:
+        """
+        Store each node's text token count in its metadata, hidden from the
+        embedding and LLM views so embeddings and prompts are unchanged.
+        """
+        for node in nodes:
+            node.metadata[TOKEN_COUNT_KEY] = self.count(
+                node.get_content(metadata_mode=MetadataMode.NONE)
+            )
+            for excluded in (
+                node.excluded_embed_metadata_keys,
+                node.excluded_llm_metadata_keys,
+            ):
+                if TOKEN_COUNT_KEY not in excluded:
+                    excluded.append(TOKEN_COUNT_KEY)
+
+
+_counters = {}
+_counters_lock = threading.Lock()
+
+
+def get_token_counter(
+    model_provider: Optional[str] = None, exact: Optional[bool] = None
+) -> TokenCounter:
+    """
+    Shared TokenCounter per (provider, exact), so tokenizers load once.
+    Defaults to the configured model provider and token_counter.exact.
+    """
+    model_provider = model_provider or cfg.app.model.provider
+    exact = cfg.app.token_counter.exact if exact is None else exact
+    key = (model_provider, exact)
+    with _counters_lock:
+        counter = _counters.get(key)
+        if counter is None:
+            counter = TokenCounter(model_provider=model_provider, exact=exact)
+            _counters[key] = counter
+        return counter
@@ -1,28 +1,81 @@
+import config as cfg
+from vector_database.numpy_vector_db_client import numpy_vector_store
 from vector_database.qdrant_vector_db_client import (
     initialize_qdrant,
     initialize_async_qdrant,
     qdrant_vector_store,
     qdrant_async_vector_store,
+    check_collection_exists,
+    create_payload_indexes,
     get_qdrant_url,
     get_collection_name,
 )
 
 
-def set_vector_store(vector_db: str, model_provider: str, async_mode: bool):
+def get_numpy_store_path(model_provider: str):
+    return cfg.path.data.vector_store / get_collection_name(model_provider)
+
+
+def set_vector_store(
+    vector_db: str,
+    model_provider: str,
+    async_mode: bool,
+    retrieval_mode: str = cfg.vector_db.retriever.mode,
+):
     match vector_db:
         case "qdrant":
             url = get_qdrant_url()
             collection_name = get_collection_name(model_provider)
+            hybrid = retrieval_mode == "hybrid"
             if async_mode:
                 client = initialize_async_qdrant(url=url)
                 vector_store = qdrant_async_vector_store(
-                    client=client, collection_name=collection_name
+                    client=client, collection_name=collection_name, hybrid=hybrid
                 )
             else:
                 client = initialize_qdrant(url=url)
                 vector_store = qdrant_vector_store(
-                    client=client, collection_name=collection_name
+                    client=client, collection_name=collection_name, hybrid=hybrid
                 )
+        case "numpy":
+            vector_store = numpy_vector_store(
+                persist_dir=get_numpy_store_path(model_provider),
+                search_mode=cfg.vector_db.numpy.search_mode,
+                oversample=cfg.vector_db.numpy.oversample,
+            )
         case _:
             raise Exception("The vector database is not available.")
     return vector_store
+
+
+def collection_exists(vector_db: str, model_provider: str) -> bool:
+    match vector_db:
+        case "qdrant":
+            client = initialize_qdrant(url=get_qdrant_url())
+            return check_collection_exists(
+                client=client, collection_name=get_collection_name(model_provider)
+            )
+        case "numpy":
+            return set_vector_store(
+                vector_db=vector_db, model_provider=model_provider, async_mode=False
+            ).exists()
+        case _:
+            raise Exception("The vector database is not available.")
+
+
+def ensure_payload_indexes(vector_db: str, model_provider: str) -> None:
+    """
+    Make sure filterable metadata fields are indexed in the vector database.
+    """
+    match vector_db:
+        case "qdrant":
+            create_payload_indexes(
+                client=initialize_qdrant(url=get_qdrant_url()),
+                collection_name=get_collection_name(model_provider),
+                field_names=cfg.vector_db.qdrant.payload_indexes,
+            )
+        case "numpy":
+            # Filters are evaluated on the in-memory payloads.
+            return
+        case _:
+            raise Exception("The vector database is not available.")
@@ -0,0 +1,140 @@
+import re
+import zlib
+from collections import Counter
+from typing import Dict, List, Tuple
+
+from llama_index.core.schema import BaseNode
+from llama_index.core.vector_stores.types import VectorStoreQueryResult
+
+BatchSparseEncoding = Tuple[List[List[int]], List[List[float]]]
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[._:/-][a-z0-9*]+)*", re.IGNORECASE)
+PART_PATTERN = re.compile(r"[a-z0-9]+", re.IGNORECASE)
+CAMEL_PATTERN = re.compile(r"[A-Z]?[a-z0-9]+|[A-Z]+(?![a-z])")
+
+STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from how i if in into is it its "
+    "of on or so that the their then there these this to was what when where "
+    "which who will with you your".split()
+)
+
+
+def split_camel(part: str) -> List[str]:
+    """
+    Words of a camelCase or PascalCase part (`GetObject` -> Get, Object), or
+    an empty list if the part is a single word.
+    """
+    if part.islower() or part.isupper():
+        return []
+    words = CAMEL_PATTERN.findall(part)
+    return words if len(words) > 1 else []
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split text into lower-cased lexical terms, keeping AWS identifiers whole.
+
+    Compound tokens such as `ml.m5.xlarge`, `s3:GetObject` or
+    `create-training-job` are kept as one term and also split into their
+    alphanumeric parts, and camelCase parts into their words, so both exact
+    and partial mentions match.
+    """
+    terms = []
+    for token in TOKEN_PATTERN.findall(text):
+        parts = PART_PATTERN.findall(token)
+        if len(parts) > 1:
+            terms.append(token.lower())
+        for part in parts:
+            for word in [part, *split_camel(part)]:
+                word = word.lower()
+                if word not in STOPWORDS:
+                    terms.append(word)
+    return terms
+
+
+def term_index(term: str) -> int:
+    """
+    Stable sparse-vector index of a term (CRC32, fits Qdrant's uint32 ids).
+    """
+    return zlib.crc32(term.encode("utf-8"))
+
+
+class BM25SparseEncoder:
+    """
+    BM25 term weights as sparse vectors, with IDF applied by Qdrant.
+
+    Documents get the BM25 term-frequency component
+    `tf * (k1 + 1) / (tf + k1 * (1 - b + b * len / avg_doc_length))`;
+    queries get weight 1 per unique term. The collection's sparse vectors use
+    Qdrant's IDF modifier, so the dot product Qdrant computes at search time
+    is the BM25 score, and IDF stays correct as documents are added or
+    deleted without re-encoding anything.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75, avg_doc_length: int = 256):
+        self.k1 = k1
+        self.b = b
+        self.avg_doc_length = avg_doc_length
+
+    def _encode(self, terms: List[str], query: bool) -> Tuple[List[int], List[float]]:
+        counts = Counter(term_index(term) for term in terms)
+        if query:
+            return list(counts), [1.0] * len(counts)
+        norm = self.k1 * (1 - self.b + self.b * len(terms) / self.avg_doc_length)
+        weights = [tf * (self.k1 + 1) / (tf + norm) for tf in counts.values()]
+        return list(counts), weights
+
+    def _encode_batch(self, texts: List[str], query: bool) -> BatchSparseEncoding:
+        indices, values = [], []
+        for text in texts:
+            text_indices, text_values = self._encode(tokenize(text), query)
+            indices.append(text_indices)
+            values.append(text_values)
+        return indices, values
+
+    def encode_documents(self, texts: List[str]) -> BatchSparseEncoding:
+        return self._encode_batch(texts, query=False)
+
+    def encode_queries(self, texts: List[str]) -> BatchSparseEncoding:
+        return self._encode_batch(texts, query=True)
+
+
+def ranks(result: VectorStoreQueryResult) -> Dict[str, Tuple[int, BaseNode]]:
+    nodes = result.nodes or []
+    similarities = result.similarities or [0.0] * len(nodes)
+    ordered = sorted(zip(similarities, nodes), key=lambda x: x[0], reverse=True)
+    return {node.node_id: (rank, node) for rank, (_, node) in enumerate(ordered, 1)}
+
+
+def reciprocal_rank_fusion(k: int = 60):
+    """
+    Build a hybrid fusion function that merges results by reciprocal rank.
+
+    A node scores `alpha / (k + dense_rank) + (1 - alpha) / (k + sparse_rank)`,
+    with a missing rank contributing nothing. Ranks are used instead of raw
+    scores because cosine similarities and BM25 scores are not comparable.
+    """
+
+    def fuse(
+        dense_result: VectorStoreQueryResult,
+        sparse_result: VectorStoreQueryResult,
+        alpha: float = 0.5,
+        top_k: int = 2,
+    ) -> VectorStoreQueryResult:
+        dense_ranks = ranks(dense_result)
+        sparse_ranks = ranks(sparse_result)
+        scores, nodes = {}, {}
+        for weight, result_ranks in ((alpha, dense_ranks), (1 - alpha, sparse_ranks)):
+            for node_id, (rank, node) in result_ranks.items():
+                scores[node_id] = scores.get(node_id, 0.0) + weight / (k + rank)
+                nodes.setdefault(node_id, node)
+        if not scores:
+            return VectorStoreQueryResult(nodes=None, similarities=None, ids=None)
+        top = sorted(scores, key=scores.get, reverse=True)[:top_k]
+        return VectorStoreQueryResult(
+            nodes=[nodes[node_id] for node_id in top],
+            similarities=[scores[node_id] for node_id in top],
+            ids=top,
+        )
+
+    return fuse
@@ -0,0 +1,310 @@
+import json
+import shutil
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from llama_index.core.schema import BaseNode
+from llama_index.core.vector_stores.simple import _build_metadata_filter_fn
+from llama_index.core.vector_stores.types import (
+    BasePydanticVectorStore,
+    MetadataFilters,
+    VectorStoreQuery,
+    VectorStoreQueryResult,
+)
+from llama_index.core.vector_stores.utils import (
+    metadata_dict_to_node,
+    node_to_metadata_dict,
+)
+from pydantic import PrivateAttr
+
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+INITIAL_CAPACITY = 1024
+
+
+class NumpyVectorStore(BasePydanticVectorStore):
+    """
+    Embedded, in-process vector store on memory-mapped NumPy matrices.
+
+    Layout of `persist_dir`:
+        - vectors.f32: float32 matrix (capacity x dim) of unit-normalized
+          embeddings, memory-mapped so vectors are read zero-copy from disk.
+        - payloads.jsonl: append-only log of {"id", "row", "payload"} records
+          (node text and metadata) and {"id", "deleted"} tombstones, replayed
+          on load.
+        - meta.json: dimension and capacity of the matrix.
+
+    Search is cosine similarity. `search_mode="exact"` scores every live row;
+    `"approximate"` ranks rows by Hamming distance between sign-bit codes and
+    rescores the best `similarity_top_k * oversample` candidates exactly.
+    Upserting an existing id reuses its row; deleted rows are masked out.
+    """
+
+    stores_text: bool = True
+    flat_metadata: bool = False
+
+    persist_dir: str
+    search_mode: str = "exact"
+    oversample: int = 4
+
+    _dim: Optional[int] = PrivateAttr(default=None)
+    _capacity: int = PrivateAttr(default=0)
+    _count: int = PrivateAttr(default=0)
+    _vectors: Optional[np.memmap] = PrivateAttr(default=None)
+    _codes: Optional[np.ndarray] = PrivateAttr(default=None)
+    _alive: Optional[np.ndarray] = PrivateAttr(default=None)
+    _ids: List[str] = PrivateAttr(default_factory=list)
+    _rows: Dict[str, int] = PrivateAttr(default_factory=dict)
+    _payloads: List[Optional[Dict[str, Any]]] = PrivateAttr(default_factory=list)
+    _lock: threading.RLock = PrivateAttr(default_factory=threading.RLock)
+
+    def __init__(self, persist_dir: str, **kwargs: Any):
+        super().__init__(persist_dir=str(persist_dir), **kwargs)
+        self._load()
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "NumpyVectorStore"
+
+    @property
+    def client(self) -> Any:
+        return None
+
+    @property
+    def path(self) -> Path:
+        return Path(self.persist_dir)
+
+    def exists(self) -> bool:
+        return self._count > 0 and bool(self._alive[: self._count].any())
+
+    def _load(self) -> None:
+        meta_path = self.path / "meta.json"
+        if not meta_path.exists():
+            return
+        meta = json.loads(meta_path.read_text())
+        self._dim = meta["dim"]
+        self._capacity = meta["capacity"]
+        self._vectors = np.memmap(
+            self.path / "vectors.f32",
+            dtype=np.float32,
+            mode="r+",
+            shape=(self._capacity, self._dim),
+        )
+        self._alive = np.zeros(self._capacity, dtype=bool)
+        with open(self.path / "payloads.jsonl") as f:
+            for line in f:
+                record = json.loads(line)
+                if record.get("deleted"):
+                    row = self._rows.get(record["id"])
+                    if row is not None:
+                        self._alive[row] = False
+                        self._payloads[row] = None
+                    continue
+                row = record["row"]
+                if row == len(self._ids):
+                    self._ids.append(record["id"])
+                    self._payloads.append(None)
+                self._rows[record["id"]] = row
+                self._payloads[row] = record["payload"]
+                self._alive[row] = True
+        self._count = len(self._ids)
+        self._codes = np.packbits(self._vectors[: self._capacity] > 0, axis=1)
+        logger.info(
+            f"Loaded {int(self._alive.sum())} vectors ({self._dim}d) from {self.path}"
+        )
+
+    def _allocate(self, dim: int, capacity: int) -> None:
+        self.path.mkdir(parents=True, exist_ok=True)
+        vectors_path = self.path / "vectors.f32"
+        if self._vectors is not None:
+            self._vectors.flush()
+            self._vectors = None
+        with open(vectors_path, "ab") as f:
+            f.truncate(capacity * dim * 4)
+        self._vectors = np.memmap(
+            vectors_path, dtype=np.float32, mode="r+", shape=(capacity, dim)
+        )
+        alive = np.zeros(capacity, dtype=bool)
+        codes = np.zeros((capacity, (dim + 7) // 8), dtype=np.uint8)
+        if self._alive is not None:
+            alive[: self._capacity] = self._alive
+            codes[: self._capacity] = self._codes
+        self._alive, self._codes = alive, codes
+        self._dim, self._capacity = dim, capacity
+        (self.path / "meta.json").write_text(
+            json.dumps({"dim": dim, "capacity": capacity})
+        )
+
+    def add(self, nodes: List[BaseNode], **add_kwargs: Any) -> List[str]:
+        if not nodes:
+            return []
+        embeddings = np.asarray([node.get_embedding() for node in nodes], np.float32)
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        embeddings /= np.where(norms == 0, 1, norms)
+        with self._lock:
+            if self._dim is None:
+                self._allocate(embeddings.shape[1], INITIAL_CAPACITY)
+            needed = self._count + len(nodes)
+            if needed > self._capacity:
+                capacity = self._capacity
+                while capacity < needed:
+                    capacity *= 2
+                self._allocate(self._dim, capacity)
+
+            records = []
+            for node, embedding in zip(nodes, embeddings):
+                row = self._rows.get(node.node_id)
+                if row is None:
+                    row = self._count
+                    self._count += 1
+                    self._ids.append(node.node_id)
+                    self._payloads.append(None)
+                    self._rows[node.node_id] = row
+                payload = node_to_metadata_dict(
+                    node, remove_text=False, flat_metadata=self.flat_metadata
+                )
+                self._vectors[row] = embedding
+                self._codes[row] = np.packbits(embedding > 0)
+                self._alive[row] = True
+                self._payloads[row] = payload
+                records.append({"id": node.node_id, "row": row, "payload": payload})
+            self._vectors.flush()
+            self._append(records)
+        return [node.node_id for node in nodes]
+
+    def _append(self, records: List[Dict[str, Any]]) -> None:
+        with open(self.path / "payloads.jsonl", "a") as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+
+    def _delete_rows(self, rows: List[int]) -> None:
+        if not rows:
+            return
+        records = []
+        for row in rows:
+            self._alive[row] = False
+            self._payloads[row] = None
+            records.append({"id": self._ids[row], "deleted": True})
+        self._append(records)
+
+    def delete(self, ref_doc_id: str, **delete_kwargs: Any) -> None:
+        with self._lock:
+            rows = [
+                row
+                for row, payload in enumerate(self._payloads)
+                if payload is not None and payload.get("ref_doc_id") == ref_doc_id
+            ]
+            self._delete_rows(rows)
+
+    def delete_nodes(
+        self,
+        node_ids: Optional[List[str]] = None,
+        filters: Optional[MetadataFilters] = None,
+        **delete_kwargs: Any,
+    ) -> None:
+        with self._lock:
+            if node_ids is not None:
+                rows = [self._rows[i] for i in node_ids if i in self._rows]
+                rows = [row for row in rows if self._alive[row]]
+            else:
+                rows = list(range(self._count))
+            if filters is not None:
+                mask = self._filter_mask(filters)
+                rows = [row for row in rows if mask[row]]
+            self._delete_rows(rows)
+
+    def clear(self) -> None:
+        with self._lock:
+            if self.path.exists():
+                shutil.rmtree(self.path)
+            self._dim = None
+            self._capacity = 0
+            self._count = 0
+            self._vectors = None
+            self._codes = None
+            self._alive = None
+            self._ids = []
+            self._rows = {}
+            self._payloads = []
+
+    def _filter_mask(self, filters: MetadataFilters) -> np.ndarray:
+        filter_fn = _build_metadata_filter_fn(
+            lambda row: self._payloads[row] or {}, filters
+        )
+        mask = np.zeros(self._count, dtype=bool)
+        for row in range(self._count):
+            mask[row] = self._alive[row] and filter_fn(row)
+        return mask
+
+    def _candidates(self, query: VectorStoreQuery) -> np.ndarray:
+        mask = self._alive[: self._count].copy()
+        if query.filters is not None:
+            mask &= self._filter_mask(query.filters)
+        if query.node_ids is not None:
+            allowed = np.zeros(self._count, dtype=bool)
+            allowed[[self._rows[i] for i in query.node_ids if i in self._rows]] = True
+            mask &= allowed
+        if query.doc_ids is not None:
+            doc_ids = set(query.doc_ids)
+            for row in np.flatnonzero(mask):
+                if self._payloads[row].get("ref_doc_id") not in doc_ids:
+                    mask[row] = False
+        return np.flatnonzero(mask)
+
+    def query(self, query: VectorStoreQuery, **kwargs: Any) -> VectorStoreQueryResult:
+        with self._lock:
+            if self._count == 0:
+                return VectorStoreQueryResult(nodes=[], similarities=[], ids=[])
+            rows = self._candidates(query)
+            top_k = min(query.similarity_top_k, len(rows))
+            if top_k == 0:
+                return VectorStoreQueryResult(nodes=[], similarities=[], ids=[])
+            q = np.asarray(query.query_embedding, dtype=np.float32)
+            q /= np.linalg.norm(q) or 1.0
+
+            n_candidates = top_k * self.oversample
+            if self.search_mode == "approximate" and len(rows) > n_candidates:
+                distances = np.bitwise_count(
+                    self._codes[rows] ^ np.packbits(q > 0)
+                ).sum(axis=1)
+                nearest = np.argpartition(distances, n_candidates)[:n_candidates]
+                rows = rows[nearest]
+
+            scores = self._vectors[rows] @ q
+            best = np.argpartition(-scores, top_k - 1)[:top_k]
+            best = best[np.argsort(-scores[best])]
+
+            nodes, similarities, ids = [], [], []
+            for i in best:
+                row = int(rows[i])
+                node = metadata_dict_to_node(self._payloads[row])
+                nodes.append(node)
+                similarities.append(float(scores[i]))
+                ids.append(self._ids[row])
+        return VectorStoreQueryResult(nodes=nodes, similarities=similarities, ids=ids)
+
+
+_stores: Dict[str, NumpyVectorStore] = {}
+_stores_lock = threading.Lock()
+
+
+def numpy_vector_store(
+    persist_dir: Path, search_mode: str = "exact", oversample: int = 4
+) -> NumpyVectorStore:
+    """
+    Return the process-wide NumpyVectorStore for a directory, opening it once.
+    """
+    key = Path(persist_dir).as_posix()
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            logger.info(f"Opening embedded vector store at {key}")
+            store = NumpyVectorStore(
+                persist_dir=key, search_mode=search_mode, oversample=oversample
+            )
+            _stores[key] = store
+        return store
@@ -1,38 +1,453 @@
+import atexit
 import qdrant_client
 import os
+import threading
 import config as cfg
+from typing import Any, Dict, List, Optional, Tuple, cast
+from llama_index.core.vector_stores.types import (
+    VectorStoreQuery,
+    VectorStoreQueryMode,
+    VectorStoreQueryResult,
+)
 from llama_index.vector_stores.qdrant import QdrantVectorStore
+from pydantic import PrivateAttr
+from qdrant_client.http import models as rest
 
 from utils.logger import setup_logger
+from vector_database.hybrid_search import BM25SparseEncoder, reciprocal_rank_fusion
 
 logger = setup_logger(__name__)
 
+GRPC_KEEPALIVE_OPTIONS = {
+    "grpc.keepalive_time_ms": 30000,
+    "grpc.keepalive_timeout_ms": 10000,
+    "grpc.keepalive_permit_without_calls": 1,
+    "grpc.http2.max_pings_without_data": 0,
+}
+
+
+class QdrantClientManager:
+    """
+    Keeps one sync and one async Qdrant client per (url, transport).
+
+    Clients are created on first use and shared by every call site, so TCP
+    and TLS setup (and qdrant-client's version check) is paid once per
+    process instead of once per query. gRPC is preferred when configured,
+    with keep-alive pings holding idle channels open; REST clients keep
+    their HTTP connection pool alive.
+
+    Clients are never replaced: gRPC channels and REST pools reconnect on
+    their own after a transient failure, so the indexes and vector stores
+    that hold a client stay usable. Health is monitored off the request
+    path by a daemon thread that pings each server every
+    `health_check_interval` seconds and logs state changes; `healthy`
+    returns the last result.
+    """
+
+    def __init__(
+        self,
+        prefer_grpc: bool = True,
+        grpc_port: int = 6334,
+        timeout: Optional[int] = None,
+        health_check_interval: float = 30.0,
+    ):
+        self.prefer_grpc = prefer_grpc
+        self.grpc_port = grpc_port
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+        self._clients: Dict[Tuple[str, bool], qdrant_client.QdrantClient] = {}
+        self._async_clients: Dict[Tuple[str, bool], Any] = {}
+        self._health: Dict[Tuple[str, bool], bool] = {}
+        self._monitor: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+        self._lock = threading.RLock()
+
+    def _key(self, url: str, prefer_grpc: Optional[bool]) -> Tuple[str, bool]:
+        return (url, self.prefer_grpc if prefer_grpc is None else prefer_grpc)
+
+    def _client_kwargs(self, key: Tuple[str, bool]) -> Dict[str, Any]:
+        url, prefer_grpc = key
+        kwargs = {"url": url, "prefer_grpc": prefer_grpc, "timeout": self.timeout}
+        if prefer_grpc:
+            kwargs.update(grpc_port=self.grpc_port, grpc_options=GRPC_KEEPALIVE_OPTIONS)
+        return kwargs
+
+    def get_client(
+        self, url: str, prefer_grpc: Optional[bool] = None
+    ) -> qdrant_client.QdrantClient:
+        key = self._key(url, prefer_grpc)
+        client = self._clients.get(key)
+        if client is not None:
+            return client
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                logger.info(f"Connecting to Qdrant at {url} (grpc={key[1]})")
+                client = qdrant_client.QdrantClient(**self._client_kwargs(key))
+                self._clients[key] = client
+                self._start_monitor()
+            return client
+
+    def get_async_client(
+        self, url: str, prefer_grpc: Optional[bool] = None
+    ) -> qdrant_client.AsyncQdrantClient:
+        key = self._key(url, prefer_grpc)
+        client = self._async_clients.get(key)
+        if client is not None:
+            return client
+        with self._lock:
+            client = self._async_clients.get(key)
+            if client is None:
+                logger.info(f"Connecting async to Qdrant at {url} (grpc={key[1]})")
+                client = qdrant_client.AsyncQdrantClient(**self._client_kwargs(key))
+                self._async_clients[key] = client
+                self._start_monitor()
+            return client
+
+    def healthy(self, url: str, prefer_grpc: Optional[bool] = None) -> Optional[bool]:
+        """
+        Result of the last health check of a server, or None if not checked yet.
+        """
+        return self._health.get(self._key(url, prefer_grpc))
+
+    def check_health(self) -> None:
+        """
+        Ping every server a client was created for, through its sync client.
+        """
+        with self._lock:
+            keys = set(self._clients) | set(self._async_clients)
+        for key in keys:
+            try:
+                self.get_client(*key).get_collections()
+                healthy, error = True, None
+            except Exception as e:
+                healthy, error = False, e
+            previous = self._health.get(key)
+            self._health[key] = healthy
+            if not healthy and previous is not False:
+                logger.warning(f"Qdrant health check failed for {key[0]}: {error}")
+            elif healthy and previous is False:
+                logger.info(f"Qdrant at {key[0]} is reachable again")
+
+    def _start_monitor(self) -> None:
+        if self._monitor is not None or not self.health_check_interval:
+            return
+        self._monitor = threading.Thread(
+            target=self._monitor_health, name="qdrant-health", daemon=True
+        )
+        self._monitor.start()
+
+    def _monitor_health(self) -> None:
+        while not self._stopped.wait(self.health_check_interval):
+            self.check_health()
+
+    def close(self) -> None:
+        """
+        Stop health checks, close all sync clients and forget the async ones.
+        """
+        self._stopped.set()
+        with self._lock:
+            clients = list(self._clients.values())
+            self._clients.clear()
+            self._async_clients.clear()
+            self._health.clear()
+        for client in clients:
+            try:
+                client.close()
+            except Exception as e:
+                logger.debug(f"Error closing Qdrant client: {e}")
+
+    async def aclose(self) -> None:
+        """
+        Close all clients. Must run on the loop the async clients were used on.
+        """
+        with self._lock:
+            async_clients = list(self._async_clients.values())
+            self._async_clients.clear()
+        for client in async_clients:
+            await client.close()
+        self.close()
+
+
+qdrant_clients = QdrantClientManager(
+    prefer_grpc=cfg.vector_db.qdrant.prefer_grpc,
+    grpc_port=int(os.getenv("QDRANT_GRPC_PORT", cfg.vector_db.qdrant.grpc_port)),
+    timeout=cfg.vector_db.qdrant.timeout,
+    health_check_interval=cfg.vector_db.qdrant.health_check_interval,
+)
+atexit.register(qdrant_clients.close)
+
+
+# The tuned query path calls private helpers of llama-index-vector-stores-qdrant
+# 0.6.x; if a release drops them, queries fall back to the base implementation
+# (without quantization search params).
+TUNED_QUERY_SUPPORTED = all(
+    hasattr(QdrantVectorStore, name)
+    for name in (
+        "_detect_vector_format",
+        "_adetect_vector_format",
+        "_build_query_filter",
+        "_ensure_async_client",
+    )
+)
+
+
+class TunedQdrantVectorStore(QdrantVectorStore):
+    """
+    QdrantVectorStore with quantization-aware collection creation and search.
+
+    New collections are created with the configured quantization and, if
+    `on_disk_vectors` is set, with the original float32 vectors on disk so
+    only the quantized vectors live in RAM. Dense queries pass
+    `search_params` to Qdrant, which is where rescoring of the quantized
+    candidates with the original vectors and oversampling are enabled.
+    Hybrid and sparse queries keep the base behaviour.
+    """
+
+    on_disk_vectors: bool = False
+    search_params: Optional[rest.SearchParams] = None
+    payload_indexes: List[str] = []
+
+    _vector_format_checked: bool = PrivateAttr(default=False)
+
+    def __init__(
+        self,
+        *args: Any,
+        on_disk_vectors: bool = False,
+        search_params: Optional[rest.SearchParams] = None,
+        payload_indexes: Optional[List[str]] = None,
+        **kwargs: Any,
+    ):
+        super().__init__(*args, **kwargs)
+        self.on_disk_vectors = on_disk_vectors
+        self.search_params = search_params
+        self.payload_indexes = list(payload_indexes or [])
+
+    def _set_dense_config(self, vector_size: int) -> None:
+        if self.on_disk_vectors and self._dense_config is None:
+            self._dense_config = rest.VectorParams(
+                size=vector_size, distance=rest.Distance.COSINE, on_disk=True
+            )
+
+    def _create_collection(self, collection_name: str, vector_size: int) -> None:
+        self._set_dense_config(vector_size)
+        super()._create_collection(collection_name, vector_size)
+        create_payload_indexes(self._client, collection_name, self.payload_indexes)
+
+    async def _acreate_collection(self, collection_name: str, vector_size: int) -> None:
+        self._set_dense_config(vector_size)
+        await super()._acreate_collection(collection_name, vector_size)
+        await acreate_payload_indexes(
+            self._aclient, collection_name, self.payload_indexes
+        )
+
+    def _use_search_params(self, query: VectorStoreQuery) -> bool:
+        return (
+            TUNED_QUERY_SUPPORTED
+            and self.search_params is not None
+            and not self.enable_hybrid
+            and query.mode == VectorStoreQueryMode.DEFAULT
+        )
+
+    def _query_points_kwargs(
+        self, query: VectorStoreQuery, **kwargs: Any
+    ) -> Dict[str, Any]:
+        query_filter = kwargs.get("qdrant_filters")
+        if query_filter is None:
+            query_filter = self._build_query_filter(query)
+        return {
+            "collection_name": self.collection_name,
+            "query": cast(List[float], query.query_embedding),
+            "using": self.dense_vector_name or None,
+            "limit": query.similarity_top_k,
+            "query_filter": query_filter,
+            "search_params": self.search_params,
+            "with_payload": True,
+        }
+
+    def query(self, query: VectorStoreQuery, **kwargs: Any) -> VectorStoreQueryResult:
+        if not self._use_search_params(query):
+            return super().query(query, **kwargs)
+        if not self._vector_format_checked:
+            # Stays None for named-vector collections, so check only once.
+            if getattr(self, "_legacy_vector_format", None) is None:
+                self._detect_vector_format(self.collection_name)
+            self._vector_format_checked = True
+        response = self._client.query_points(
+            **self._query_points_kwargs(query, **kwargs)
+        )
+        return self.parse_to_query_result(response.points)
+
+    async def aquery(
+        self, query: VectorStoreQuery, **kwargs: Any
+    ) -> VectorStoreQueryResult:
+        if not self._use_search_params(query):
+            return await super().aquery(query, **kwargs)
+        self._ensure_async_client()
+        if not self._vector_format_checked:
+            if getattr(self, "_legacy_vector_format", None) is None:
+                await self._adetect_vector_format(self.collection_name)
+            self._vector_format_checked = True
+        response = await self._aclient.query_points(
+            **self._query_points_kwargs(query, **kwargs)
+        )
+        return self.parse_to_query_result(response.points)
+
+
+def create_payload_indexes(
+    client: qdrant_client, collection_name: str, field_names: List[str]
+) -> None:
+    """
+    Create keyword payload indexes for `field_names` that do not exist yet.
+
+    Indexes created on an empty collection are built as points are upserted,
+    and let filtered searches use the index instead of scanning payloads.
+    """
+    existing = client.get_collection(collection_name).payload_schema or {}
+    for field_name in field_names:
+        if field_name in existing:
+            continue
+        logger.info(f"Creating payload index on {collection_name}.{field_name}")
+        client.create_payload_index(
+            collection_name=collection_name,
+            field_name=field_name,
+            field_schema=rest.PayloadSchemaType.KEYWORD,
+            wait=True,
+        )
+
+
+async def acreate_payload_indexes(
+    client: qdrant_client, collection_name: str, field_names: List[str]
+) -> None:
+    existing = (await client.get_collection(collection_name)).payload_schema or {}
+    for field_name in field_names:
+        if field_name in existing:
+            continue
+        logger.info(f"Creating payload index on {collection_name}.{field_name}")
+        await client.create_payload_index(
+            collection_name=collection_name,
+            field_name=field_name,
+            field_schema=rest.PayloadSchemaType.KEYWORD,
+            wait=True,
+        )
+
+
+def get_quantization_config(
+    quantization: Any = None,
+) -> Optional[rest.QuantizationConfig]:
+    """
+    Build the Qdrant quantization config from `vector_db.qdrant.quantization`.
+
+    Supported types are "none", "scalar" (int8) and "binary". Quantization
+    only applies when a collection is created, so an existing collection
+    must be rebuilt (build_index with force_reindex) to change it.
+    """
+    quantization = quantization or cfg.vector_db.qdrant.quantization
+    match quantization.type:
+        case "none" | None:
+            return None
+        case "scalar":
+            return rest.ScalarQuantization(
+                scalar=rest.ScalarQuantizationConfig(
+                    type=rest.ScalarType.INT8,
+                    quantile=quantization.quantile,
+                    always_ram=quantization.always_ram,
+                )
+            )
+        case "binary":
+            return rest.BinaryQuantization(
+                binary=rest.BinaryQuantizationConfig(always_ram=quantization.always_ram)
+            )
+        case _:
+            raise Exception(f"Unknown Qdrant quantization type: {quantization.type}")
+
+
+def get_search_params(quantization: Any = None) -> Optional[rest.SearchParams]:
+    """
+    Build the query-time search params matching the collection quantization.
+    """
+    quantization = quantization or cfg.vector_db.qdrant.quantization
+    if quantization.type in ("none", None):
+        return None
+    return rest.SearchParams(
+        quantization=rest.QuantizationSearchParams(
+            rescore=quantization.rescore,
+            oversampling=quantization.oversampling,
+        )
+    )
+
+
+def get_hybrid_kwargs(retriever: Any = None) -> Dict[str, Any]:
+    """
+    Sparse BM25 encoders and reciprocal-rank fusion for hybrid collections.
+
+    The sparse vectors are stored next to the dense ones with Qdrant's IDF
+    modifier, so a dense-only collection must be rebuilt (build_index with
+    force_reindex) before hybrid retrieval can use it.
+    """
+    retriever = retriever or cfg.vector_db.retriever
+    encoder = BM25SparseEncoder(
+        k1=retriever.bm25.k1,
+        b=retriever.bm25.b,
+        avg_doc_length=retriever.bm25.avg_doc_length,
+    )
+    return {
+        "enable_hybrid": True,
+        "sparse_config": rest.SparseVectorParams(
+            index=rest.SparseIndexParams(), modifier=rest.Modifier.IDF
+        ),
+        "sparse_doc_fn": encoder.encode_documents,
+        "sparse_query_fn": encoder.encode_queries,
+        "hybrid_fusion_fn": reciprocal_rank_fusion(k=retriever.rrf_k),
+    }
+
+
+def get_vector_store_kwargs(
+    quantization: Any = None, hybrid: bool = False
+) -> Dict[str, Any]:
+    quantization = quantization or cfg.vector_db.qdrant.quantization
+    kwargs = {
+        "quantization_config": get_quantization_config(quantization),
+        "on_disk_vectors": quantization.on_disk_vectors,
+        "search_params": get_search_params(quantization),
+        "payload_indexes": cfg.vector_db.qdrant.payload_indexes,
+    }
+    if hybrid:
+        kwargs.update(get_hybrid_kwargs())
+    return kwargs
+
 
 def initialize_qdrant(url: str) -> qdrant_client:
-    logger.info(f"Connecting to Qdrant at {url}")
-    return qdrant_client.QdrantClient(url=url)
+    return qdrant_clients.get_client(url=url)
 
 
 def initialize_async_qdrant(url: str) -> qdrant_client:
-    logger.info(f"Connecting to Qdrant at {url}")
-    return qdrant_client.AsyncQdrantClient(url=url)
-    # return qdrant_client.AsyncQdrantClient(url=url)
+    return qdrant_clients.get_async_client(url=url)
 
 
 def qdrant_vector_store(
     client: qdrant_client,
     collection_name: str,
+    hybrid: bool = False,
 ) -> QdrantVectorStore:
     logger.info(f"Connecting to Qdrant to collection: {collection_name}")
-    vector_store = QdrantVectorStore(client=client, collection_name=collection_name)
+    vector_store = TunedQdrantVectorStore(
+        client=client,
+        collection_name=collection_name,
+        **get_vector_store_kwargs(hybrid=hybrid),
+    )
     return vector_store
 
 
 def qdrant_async_vector_store(
-    client: qdrant_client, collection_name: str
+    client: qdrant_client, collection_name: str, hybrid: bool = False
 ) -> QdrantVectorStore:
     logger.info(f"Connecting to Qdrant to collection: {collection_name}")
-    return QdrantVectorStore(aclient=client, collection_name=collection_name)
+    return TunedQdrantVectorStore(
+        aclient=client,
+        collection_name=collection_name,
+        **get_vector_store_kwargs(hybrid=hybrid),
+    )
 
 
 def check_collection_exists(client: qdrant_client, collection_name: str) -> bool:
@@ -0,0 +1,8 @@
+import os
+import sys
+from pathlib import Path
+
+# Application modules import each other from `src` (e.g. `import config`).
+sys.path.append((Path(__file__).resolve().parents[1] / "src").as_posix())
+# rag_pipeline calls weave.init on import; keep tests offline and untraced.
+os.environ.setdefault("WEAVE_DISABLED", "true")
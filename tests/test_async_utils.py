@@ -0,0 +1,67 @@
+import asyncio
+import threading
+
+import pytest
+
+from utils.async_utils import EventLoopThread, aiter_in_thread, run_sync
+
+
+async def current_thread_name() -> str:
+    await asyncio.sleep(0)
+    return threading.current_thread().name
+
+
+def test_run_sync_without_a_running_loop():
+    assert run_sync(current_thread_name()) == "event-loop"
+
+
+def test_run_sync_inside_a_running_loop():
+    async def main():
+        return run_sync(current_thread_name())
+
+    assert asyncio.run(main()) == "event-loop"
+
+
+def test_loop_thread_is_reused_and_stopped():
+    loop_thread = EventLoopThread(name="test-loop")
+    try:
+        loop_thread.run(current_thread_name())
+        thread = loop_thread._thread
+        assert loop_thread.run(current_thread_name()) == "test-loop"
+        assert loop_thread._thread is thread
+        assert [t.name for t in threading.enumerate()].count("test-loop") == 1
+    finally:
+        loop_thread.stop()
+    assert not thread.is_alive()
+    assert "test-loop" not in [t.name for t in threading.enumerate()]
+
+
+def test_run_from_the_loop_itself_is_rejected():
+    loop_thread = EventLoopThread(name="test-loop")
+
+    async def reenter():
+        return loop_thread.run(current_thread_name())
+
+    try:
+        with pytest.raises(RuntimeError, match="shared loop itself"):
+            loop_thread.run(reenter())
+    finally:
+        loop_thread.stop()
+
+
+def test_aiter_in_thread_passes_items_and_errors():
+    def items():
+        yield 1
+        yield threading.current_thread().name
+        raise ValueError("iterator failed")
+
+    async def main():
+        received = []
+        with pytest.raises(ValueError, match="iterator failed"):
+            async for item in aiter_in_thread(items()):
+                received.append(item)
+        return received
+
+    first, thread_name = asyncio.run(main())
+    assert first == 1
+    assert thread_name != threading.current_thread().name
@@ -0,0 +1,121 @@
+from llama_index.core import Document
+from llama_index.core.node_parser import MarkdownNodeParser
+from llama_index.core.schema import NodeWithScore, TextNode
+
+from application.rag_service.context_assembler import ContextAssembler
+from application.rag_service.index_manifest import fingerprint_nodes
+from utils.token_counter import TOKEN_COUNT_KEY, TokenCounter
+
+MARKDOWN = """# Buckets
+
+Buckets are containers for objects stored in Amazon S3.
+
+# Versioning
+
+Versioning keeps multiple variants of an object in the same bucket.
+
+# Lifecycle
+
+Lifecycle rules move objects to cheaper storage classes over time.
+"""
+
+
+def parse(path: str, text: str):
+    nodes = MarkdownNodeParser().get_nodes_from_documents(
+        [Document(text=text, metadata={"file_name": path})]
+    )
+    fingerprint_nodes(path, nodes)
+    return nodes
+
+
+def make_assembler(**kwargs) -> ContextAssembler:
+    return ContextAssembler(
+        token_counter=TokenCounter(exact=False), max_tokens=1000, **kwargs
+    )
+
+
+def test_merges_consecutive_sections_of_parsed_file():
+    nodes = parse("s3.md", MARKDOWN)
+    assert len(nodes) == 3
+    retrieved = [
+        NodeWithScore(node=nodes[2], score=0.7),
+        NodeWithScore(node=nodes[0], score=0.9),
+        NodeWithScore(node=nodes[1], score=0.5),
+    ]
+    other = parse("ec2.md", "# Instances\n\nInstances are virtual servers.\n")[0]
+    retrieved.append(NodeWithScore(node=other, score=0.8))
+
+    assembled = make_assembler().postprocess_nodes(retrieved)
+
+    assert len(assembled) == 2
+    merged = assembled[0]
+    assert merged.score == 0.9
+    text = merged.node.get_content()
+    assert text.index("Buckets") < text.index("Versioning") < text.index("Lifecycle")
+    assert assembled[1].node.node_id == other.node_id
+
+
+def test_gap_between_sections_is_not_merged():
+    nodes = parse("s3.md", MARKDOWN)
+    retrieved = [
+        NodeWithScore(node=nodes[0], score=0.9),
+        NodeWithScore(node=nodes[2], score=0.7),
+    ]
+    assembled = make_assembler().postprocess_nodes(retrieved)
+    assert [node.node.node_id for node in assembled] == [
+        nodes[0].node_id,
+        nodes[2].node_id,
+    ]
+
+
+def test_drops_near_duplicates():
+    text = "Versioning keeps multiple variants of an object in the same bucket."
+    retrieved = [
+        NodeWithScore(node=TextNode(id_="a", text=text), score=0.9),
+        NodeWithScore(node=TextNode(id_="b", text=text + " "), score=0.8),
+    ]
+    assembled = make_assembler(merge_adjacent=False).postprocess_nodes(retrieved)
+    assert [node.node.node_id for node in assembled] == ["a"]
+
+
+def test_trims_to_token_budget():
+    retrieved = [
+        NodeWithScore(node=TextNode(id_=str(i), text=f"word{i} " * 40), score=1 - i)
+        for i in range(3)
+    ]
+    assembler = ContextAssembler(
+        token_counter=TokenCounter(exact=False),
+        max_tokens=150,
+        min_tokens=10,
+        merge_adjacent=False,
+    )
+    assembled = assembler.postprocess_nodes(retrieved)
+    # 60 tokens each: two fit whole and the third is cut to the last 30.
+    assert [node.node.node_id for node in assembled] == ["0", "1", "2"]
+    assert len(assembled[2].node.get_content()) < len(retrieved[2].node.get_content())
+    assert sum(assembler.count_tokens(node) for node in assembled) <= 150
+
+
+def test_trim_leaves_room_for_metadata_and_stores_text_tokens():
+    counter = TokenCounter(exact=False)
+    metadata = {"file_name": "sagemaker-training-jobs.md", "category": "sagemaker"}
+    retrieved = [
+        NodeWithScore(
+            node=TextNode(id_=str(i), text=f"word{i} " * 40, metadata=metadata),
+            score=1 - i,
+        )
+        for i in range(2)
+    ]
+    assembler = ContextAssembler(
+        token_counter=counter, max_tokens=100, min_tokens=10, merge_adjacent=False
+    )
+    metadata_tokens = assembler.count_tokens(retrieved[1]) - counter.count_node(
+        retrieved[1].node
+    )
+    assert metadata_tokens > 0
+
+    assembled = assembler.postprocess_nodes(retrieved)
+    assert [node.node.node_id for node in assembled] == ["0", "1"]
+    cut = assembled[1].node
+    assert cut.metadata[TOKEN_COUNT_KEY] == counter.count(cut.get_content())
+    assert sum(assembler.count_tokens(node) for node in assembled) <= 100
@@ -0,0 +1,43 @@
+import pickle
+from functools import partial
+
+from application.rag_service.document_loader import (
+    UNKNOWN_CATEGORY,
+    file_metadata,
+    iter_file_nodes,
+)
+
+
+def write_docs(tmp_path, n_files: int) -> list:
+    paths = []
+    for i in range(n_files):
+        path = tmp_path / f"doc_{i}.md"
+        path.write_text(f"# Doc {i}\n\nIntro {i}.\n\n## Details\n\nBody {i}.\n")
+        paths.append(path.as_posix())
+    return paths
+
+
+def test_file_metadata_callback_pickles_without_build_index(tmp_path):
+    callback = partial(file_metadata, category_index={"a.md": "sagemaker"})
+    payload = pickle.dumps(callback)
+    assert b"build_index" not in payload
+    assert pickle.loads(payload)("a.md") == {
+        "file_name": "a.md",
+        "category": "sagemaker",
+    }
+    assert callback("b.md")["category"] == UNKNOWN_CATEGORY
+
+
+def test_iter_file_nodes_parses_every_file_in_workers(tmp_path):
+    paths = write_docs(tmp_path, 5)
+    category_index = {path: f"category-{i}" for i, path in enumerate(paths)}
+    callback = partial(file_metadata, category_index=category_index)
+
+    batches = list(iter_file_nodes(paths, callback, files_per_task=2, max_workers=2))
+
+    assert len(batches) == 3
+    file_nodes = dict(pair for batch in batches for pair in batch)
+    assert file_nodes.keys() == set(paths)
+    for path, nodes in file_nodes.items():
+        assert len(nodes) == 2
+        assert {node.metadata["category"] for node in nodes} == {category_index[path]}
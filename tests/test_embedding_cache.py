@@ -0,0 +1,65 @@
+import numpy as np
+
+from llm import embedding_cache
+from llm.embedding_cache import EmbeddingStore
+
+
+def vector(value: float, dim: int = 4) -> list:
+    return [value] * dim
+
+
+def test_put_get_and_reload(tmp_path):
+    store = EmbeddingStore(tmp_path, max_entries=8)
+    store.put("a", vector(1.0))
+    store.put("b", vector(2.0))
+    store.flush()
+
+    reloaded = EmbeddingStore(tmp_path, max_entries=8)
+    assert reloaded.get("a") == vector(1.0)
+    assert reloaded.get("b") == vector(2.0)
+    assert reloaded.get("c") is None
+
+
+def test_evicts_least_recently_used(tmp_path):
+    store = EmbeddingStore(tmp_path, max_entries=2)
+    store.put("a", vector(1.0))
+    store.put("b", vector(2.0))
+    store.get("a")
+    store.put("c", vector(3.0))
+    assert store.get("b") is None
+    assert store.get("a") == vector(1.0)
+    assert store.get("c") == vector(3.0)
+
+
+def test_reused_slot_after_crash_reads_as_miss(tmp_path):
+    store = EmbeddingStore(tmp_path, max_entries=2, flush_every=1000)
+    store.put("a", vector(1.0))
+    store.put("b", vector(2.0))
+    store.flush()
+    # Evicts "a" and reuses its slot; the process dies before the next flush.
+    store.put("c", vector(3.0))
+    store._vectors.flush()
+    store._keys.flush()
+
+    reloaded = EmbeddingStore(tmp_path, max_entries=2)
+    assert reloaded.get("a") is None
+    assert reloaded.get("b") == vector(2.0)
+    reloaded.put("d", vector(4.0))
+    assert reloaded.get("b") == vector(2.0)
+    assert reloaded.get("d") == vector(4.0)
+
+
+def test_vector_file_grows_lazily(tmp_path, monkeypatch):
+    monkeypatch.setattr(embedding_cache, "INITIAL_ROWS", 2)
+    store = EmbeddingStore(tmp_path, max_entries=100)
+    store.put("a", vector(1.0))
+    assert store.vectors_path.stat().st_size == 2 * 4 * 4
+
+    for i in range(5):
+        store.put(f"k{i}", vector(float(i)))
+    store.flush()
+    assert store.vectors_path.stat().st_size == 8 * 4 * 4
+
+    reloaded = EmbeddingStore(tmp_path, max_entries=100)
+    assert len(reloaded) == 6
+    assert np.allclose(reloaded.get("k4"), vector(4.0))
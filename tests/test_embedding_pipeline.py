@@ -0,0 +1,130 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from llama_index.core.schema import TextNode
+
+from application.rag_service.embedding_pipeline import EmbeddingPipeline
+
+
+class Gauge:
+    """Thread-safe count of concurrent calls and its peak."""
+
+    def __init__(self):
+        self.current = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        with self._lock:
+            self.current += 1
+            self.peak = max(self.peak, self.current)
+
+    def __exit__(self, *exc):
+        with self._lock:
+            self.current -= 1
+
+
+class FakeEmbedding:
+    def __init__(self, delay: float = 0.02, fail_on: str = None):
+        self.delay = delay
+        self.fail_on = fail_on
+        self.in_flight = Gauge()
+
+    def get_text_embedding_batch(self, texts):
+        with self.in_flight:
+            time.sleep(self.delay)
+            if self.fail_on in texts:
+                raise ValueError(f"cannot embed {self.fail_on}")
+            return [[float(len(text)), 1.0] for text in texts]
+
+
+class FakeVectorStore:
+    def __init__(self, first_delay: float = 0.0):
+        self.first_delay = first_delay
+        self.calls = []
+        self.in_flight = Gauge()
+        self.peak_before_first_done = 0
+        self.first_done = False
+
+    def add(self, nodes):
+        with self.in_flight:
+            if not self.calls:
+                self.calls.append(nodes)
+                time.sleep(self.first_delay)
+                self.first_done = True
+                return
+            if not self.first_done:
+                self.peak_before_first_done += 1
+            self.calls.append(nodes)
+
+
+def make_nodes(n: int, prefix: str = "text"):
+    return [TextNode(text=f"{prefix} {i}") for i in range(n)]
+
+
+def run(pipeline: EmbeddingPipeline, batches) -> None:
+    async def main():
+        async with pipeline:
+            for nodes in batches:
+                await pipeline.add(nodes)
+
+    asyncio.run(main())
+
+
+def test_embeds_and_upserts_every_node():
+    store = FakeVectorStore()
+    pipeline = EmbeddingPipeline(FakeEmbedding(delay=0), store, batch_size=4)
+    nodes = make_nodes(10)
+    run(pipeline, [nodes[:7], nodes[7:]])
+
+    assert pipeline.n_embedded == 10
+    assert sorted(len(batch) for batch in store.calls) == [3, 3, 4]
+    assert all(node.embedding is not None for node in nodes)
+
+
+def test_in_flight_batches_are_capped():
+    embed_model = FakeEmbedding(delay=0.02)
+    pipeline = EmbeddingPipeline(
+        embed_model, FakeVectorStore(), batch_size=1, max_concurrency=2
+    )
+    run(pipeline, [make_nodes(8)])
+    assert embed_model.in_flight.peak == 2
+    assert pipeline.n_embedded == 8
+
+
+def test_first_upsert_runs_alone():
+    store = FakeVectorStore(first_delay=0.05)
+    pipeline = EmbeddingPipeline(
+        FakeEmbedding(delay=0), store, batch_size=1, max_concurrency=4
+    )
+    run(pipeline, [make_nodes(4)])
+    assert store.peak_before_first_done == 0
+    assert len(store.calls) == 4
+
+
+def test_failed_batch_is_raised_by_join():
+    store = FakeVectorStore()
+    pipeline = EmbeddingPipeline(
+        FakeEmbedding(fail_on="text 1"), store, batch_size=1, max_concurrency=2
+    )
+    with pytest.raises(ValueError, match="cannot embed text 1"):
+        run(pipeline, [make_nodes(3)])
+    assert pipeline.n_embedded == 2
+
+
+def test_failed_batch_stops_later_adds():
+    pipeline = EmbeddingPipeline(
+        FakeEmbedding(fail_on="text 0"), FakeVectorStore(), batch_size=1
+    )
+
+    async def main():
+        async with pipeline:
+            await pipeline.add(make_nodes(1))
+            await asyncio.sleep(0.1)
+            await pipeline.add(make_nodes(1, prefix="later"))
+
+    with pytest.raises(ValueError, match="cannot embed text 0"):
+        asyncio.run(main())
+    assert pipeline.n_embedded == 0
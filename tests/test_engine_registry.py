@@ -0,0 +1,56 @@
+import asyncio
+import threading
+
+from application.rag_service.engine_registry import EngineKey, EngineRegistry
+
+
+def make_key(kind: str = "query_engine", **kwargs) -> EngineKey:
+    fields = {
+        "model_provider": "local",
+        "model_name": "local-llm",
+        "vector_db": "numpy",
+        "similarity_top_k": 5,
+        "template_hash": "t",
+    }
+    return EngineKey(**{**fields, **kwargs}, kind=kind)
+
+
+def test_aget_or_build_builds_once_off_loop():
+    registry = EngineRegistry()
+    loop_thread = threading.get_ident()
+    builds = []
+
+    def builder():
+        builds.append(threading.get_ident())
+        return object()
+
+    async def main():
+        return await asyncio.gather(
+            *(registry.aget_or_build(make_key(), builder) for _ in range(8))
+        )
+
+    engines = asyncio.run(main())
+    assert len(builds) == 1
+    assert builds[0] != loop_thread
+    assert all(engine is engines[0] for engine in engines)
+
+
+def test_key_separates_sync_and_async_pipelines():
+    registry = EngineRegistry()
+    sync_index = registry.get_or_build(make_key("index", async_mode=False), object)
+    async_index = registry.get_or_build(make_key("index", async_mode=True), object)
+    assert sync_index is not async_index
+
+
+def test_invalidate_related_drops_every_kind_of_one_pipeline():
+    registry = EngineRegistry()
+    kinds = ["query_engine", "index", "reranker", "semantic_cache"]
+    for kind in kinds:
+        registry.get_or_build(make_key(kind), object)
+    other = make_key("index", similarity_top_k=10)
+    registry.get_or_build(other, object)
+
+    registry.invalidate_related(make_key())
+
+    assert all(make_key(kind) not in registry for kind in kinds)
+    assert other in registry
@@ -0,0 +1,37 @@
+from application.evaluation_service.eval_checkpoint import EvalCheckpoint, hash_obj
+
+
+def test_hash_obj_is_stable():
+    assert hash_obj({"b": 1, "a": [1, 2]}) == hash_obj({"a": [1, 2], "b": 1})
+    assert hash_obj(["q", "gt"]) != hash_obj(["q", "other"])
+    assert len(hash_obj("q")) == 16
+
+
+def test_records_survive_reload_and_later_ones_win(tmp_path):
+    path = tmp_path / "eval" / "checkpoint.jsonl"
+    checkpoint = EvalCheckpoint(path)
+    checkpoint.put("row", "config", "prediction", {"response": "a"})
+    checkpoint.put("row", "config", "correctness", {"correctness": 3.0})
+    checkpoint.put("row", "config", "correctness", {"correctness": 5.0})
+
+    reloaded = EvalCheckpoint(path)
+    assert reloaded.get("row", "config", "prediction") == {"response": "a"}
+    assert reloaded.get("row", "config", "correctness") == {"correctness": 5.0}
+    assert reloaded.get("row", "other-config", "prediction") is None
+    assert reloaded.stats() == {"hits": 2, "misses": 1, "size": 2}
+
+
+def test_truncated_last_line_is_skipped_and_repaired(tmp_path):
+    path = tmp_path / "checkpoint.jsonl"
+    checkpoint = EvalCheckpoint(path)
+    checkpoint.put("row-1", "config", "prediction", "kept")
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"row": "row-2", "config": "con')
+
+    resumed = EvalCheckpoint(path)
+    assert resumed.stats()["size"] == 1
+    resumed.put("row-2", "config", "prediction", "redone")
+
+    reloaded = EvalCheckpoint(path)
+    assert reloaded.get("row-1", "config", "prediction") == "kept"
+    assert reloaded.get("row-2", "config", "prediction") == "redone"
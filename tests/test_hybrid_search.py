@@ -0,0 +1,178 @@
+import pytest
+from llama_index.core.schema import TextNode
+from llama_index.core.vector_stores.types import VectorStoreQueryResult
+from qdrant_client import QdrantClient, models
+
+from vector_database.hybrid_search import (
+    BM25SparseEncoder,
+    reciprocal_rank_fusion,
+    term_index,
+    tokenize,
+)
+
+
+def test_tokenize_keeps_identifiers_whole_and_splits_their_parts():
+    assert tokenize("Launch an ml.m5.xlarge with create-training-job") == [
+        "launch",
+        "ml.m5.xlarge",
+        "ml",
+        "m5",
+        "xlarge",
+        "create-training-job",
+        "create",
+        "training",
+        "job",
+    ]
+
+
+def test_tokenize_splits_camel_case():
+    assert tokenize("Allow s3:GetObject") == [
+        "allow",
+        "s3:getobject",
+        "s3",
+        "getobject",
+        "get",
+        "object",
+    ]
+    assert tokenize("DescribeDBInstances maxResults") == [
+        "describedbinstances",
+        "describe",
+        "db",
+        "instances",
+        "maxresults",
+        "max",
+        "results",
+    ]
+    assert tokenize("S3 EC2 IAM") == ["s3", "ec2", "iam"]
+
+
+def test_tokenize_drops_stopwords():
+    assert tokenize("How do I enable the versioning of a bucket?") == [
+        "enable",
+        "versioning",
+        "bucket",
+    ]
+
+
+def document_weights(encoder: BM25SparseEncoder, text: str) -> dict:
+    (indices,), (values,) = encoder.encode_documents([text])
+    return dict(zip(indices, values))
+
+
+def test_term_weights_saturate_with_term_frequency():
+    encoder = BM25SparseEncoder(k1=1.2, b=0.0)
+    term = term_index("bucket")
+    weights = [document_weights(encoder, "bucket " * tf)[term] for tf in (1, 2, 4, 64)]
+
+    assert weights[0] == pytest.approx(1.0)
+    assert weights == sorted(weights)
+    assert weights[1] - weights[0] > weights[2] - weights[1]
+    assert weights[-1] < encoder.k1 + 1
+
+
+def test_b_controls_length_normalisation():
+    short, long = "bucket policy", "bucket policy " + "filler " * 20
+    term = term_index("bucket")
+
+    encoder = BM25SparseEncoder(k1=1.2, b=0.75, avg_doc_length=8)
+    assert (
+        document_weights(encoder, short)[term] > document_weights(encoder, long)[term]
+    )
+
+    encoder = BM25SparseEncoder(k1=1.2, b=0.0, avg_doc_length=8)
+    assert document_weights(encoder, short)[term] == pytest.approx(
+        document_weights(encoder, long)[term]
+    )
+
+
+def test_query_terms_get_unit_weight():
+    indices, values = BM25SparseEncoder().encode_queries(["bucket bucket policy"])
+    assert indices == [[term_index("bucket"), term_index("policy")]]
+    assert values == [[1.0, 1.0]]
+
+
+def test_rare_terms_outweigh_common_ones_under_qdrant_idf():
+    encoder = BM25SparseEncoder()
+    client = QdrantClient(":memory:")
+    client.create_collection(
+        "docs",
+        vectors_config={},
+        sparse_vectors_config={
+            "text-sparse": models.SparseVectorParams(modifier=models.Modifier.IDF)
+        },
+    )
+    texts = ["bucket versioning", "bucket lifecycle", "bucket glacier"]
+    indices, values = encoder.encode_documents(texts)
+    client.upsert(
+        "docs",
+        [
+            models.PointStruct(
+                id=i,
+                vector={"text-sparse": models.SparseVector(indices=idx, values=val)},
+            )
+            for i, (idx, val) in enumerate(zip(indices, values))
+        ],
+    )
+
+    (query_indices,), (query_values,) = encoder.encode_queries(["bucket glacier"])
+    points = client.query_points(
+        "docs",
+        query=models.SparseVector(indices=query_indices, values=query_values),
+        using="text-sparse",
+    ).points
+    assert points[0].id == 2
+    assert points[0].score > 2 * points[1].score
+
+
+def result(node_ids, similarities=None) -> VectorStoreQueryResult:
+    nodes = [TextNode(id_=node_id, text=node_id) for node_id in node_ids]
+    return VectorStoreQueryResult(nodes=nodes, similarities=similarities)
+
+
+def test_fusion_prefers_nodes_ranked_by_both_retrievers():
+    fuse = reciprocal_rank_fusion(k=60)
+    fused = fuse(
+        result(["a", "b", "c"], [0.9, 0.8, 0.7]),
+        result(["c", "d", "b"], [12.0, 9.0, 3.0]),
+        top_k=4,
+    )
+    assert fused.ids == ["c", "b", "a", "d"]
+    assert [node.node_id for node in fused.nodes] == fused.ids
+    assert fused.similarities == pytest.approx(
+        [0.5 / 63 + 0.5 / 61, 0.5 / 62 + 0.5 / 63, 0.5 / 61, 0.5 / 62]
+    )
+
+
+def test_fusion_ranks_by_similarity_not_input_order():
+    fuse = reciprocal_rank_fusion(k=60)
+    fused = fuse(result(["a", "b"], [0.1, 0.9]), result([]), top_k=2)
+    assert fused.ids == ["b", "a"]
+
+
+def test_fusion_ties_keep_dense_results_first():
+    fuse = reciprocal_rank_fusion(k=60)
+    fused = fuse(result(["a"], [0.9]), result(["b"], [5.0]), top_k=2)
+    assert fused.ids == ["a", "b"]
+    assert fused.similarities[0] == fused.similarities[1]
+
+    fused = fuse(result(["a", "b"], [0.5, 0.5]), result([]), top_k=2)
+    assert fused.ids == ["a", "b"]
+
+
+def test_fusion_alpha_weights_the_retrievers():
+    fuse = reciprocal_rank_fusion(k=60)
+    dense, sparse = result(["a"], [0.9]), result(["b"], [5.0])
+    assert fuse(dense, sparse, alpha=0.8, top_k=2).ids == ["a", "b"]
+    assert fuse(dense, sparse, alpha=0.2, top_k=2).ids == ["b", "a"]
+
+
+def test_fusion_truncates_to_top_k():
+    fuse = reciprocal_rank_fusion(k=60)
+    fused = fuse(result(["a", "b", "c"]), result(["d", "e"]), top_k=3)
+    assert fused.ids == ["a", "d", "b"]
+    assert len(fused.nodes) == len(fused.similarities) == 3
+
+
+def test_fusion_of_empty_results():
+    fused = reciprocal_rank_fusion()(result([]), VectorStoreQueryResult())
+    assert fused.nodes is None and fused.similarities is None and fused.ids is None
@@ -0,0 +1,80 @@
+from llama_index.core import Document
+from llama_index.core.node_parser import MarkdownNodeParser
+from llama_index.core.schema import NodeRelationship
+
+from application.rag_service.index_manifest import (
+    diff_nodes,
+    fingerprint_nodes,
+    hash_node,
+)
+from utils.token_counter import TOKEN_COUNT_KEY, TokenCounter
+
+PATH = "docs/guide.md"
+SECTIONS = ["# Guide\n\nIntro.", "## Setup\n\nInstall it.", "## Usage\n\nRun it."]
+
+
+def parse(sections):
+    document = Document(text="\n\n".join(sections))
+    return MarkdownNodeParser().get_nodes_from_documents([document])
+
+
+def test_links_point_at_the_new_ids():
+    nodes = parse(SECTIONS)
+    fingerprint_nodes(PATH, nodes)
+    ids = [node.node_id for node in nodes]
+    assert len(nodes) == 3
+    for i, node in enumerate(nodes):
+        if i > 0:
+            assert node.prev_node.node_id == ids[i - 1]
+        if i < len(nodes) - 1:
+            assert node.next_node.node_id == ids[i + 1]
+    assert len({node.ref_doc_id for node in nodes}) == 1
+
+
+def test_ids_and_fingerprints_are_deterministic():
+    first, second = parse(SECTIONS), parse(SECTIONS)
+    assert fingerprint_nodes(PATH, first) == fingerprint_nodes(PATH, second)
+    assert first[0].ref_doc_id == second[0].ref_doc_id
+
+
+def test_edit_changes_the_section_and_its_neighbours_only():
+    before = fingerprint_nodes(PATH, parse(SECTIONS))
+    edited = [SECTIONS[0], SECTIONS[1], "## Usage\n\nRun it twice."]
+    after = fingerprint_nodes(PATH, parse(edited))
+
+    changed = {node_id for node_id in after if before.get(node_id) != after[node_id]}
+    removed = before.keys() - after.keys()
+    assert len(removed) == 1
+    # The edited section is new, and the section before it links to it.
+    assert len(changed) == 2
+
+
+def test_duplicate_sections_get_distinct_ids():
+    nodes = parse([SECTIONS[1], SECTIONS[1]])
+    fingerprints = fingerprint_nodes(PATH, nodes)
+    assert len(fingerprints) == 2
+    assert nodes[1].relationships[NodeRelationship.PREVIOUS].node_id == nodes[0].node_id
+
+
+def test_diff_nodes_reembeds_changed_and_relinked_nodes():
+    old_nodes = fingerprint_nodes(PATH, parse(SECTIONS))
+    nodes = parse([SECTIONS[0], "## Install\n\nNew section.", *SECTIONS[1:]])
+    fingerprint_nodes(PATH, nodes)
+
+    to_add, to_delete, new_nodes = diff_nodes(old_nodes, nodes)
+
+    # The inserted section and both sections now linking to it.
+    assert [node.node_id for node in to_add] == [node.node_id for node in nodes[:3]]
+    assert to_delete == []
+    assert new_nodes.keys() == {node.node_id for node in nodes}
+    assert diff_nodes(new_nodes, nodes)[:2] == ([], [])
+
+
+def test_token_counts_do_not_change_fingerprints():
+    nodes = parse(SECTIONS)
+    fingerprints = fingerprint_nodes(PATH, nodes)
+    TokenCounter(exact=False).set_node_counts(nodes)
+    assert {node.node_id: hash_node(node) for node in nodes} == fingerprints
+    for node in nodes:
+        node.metadata[TOKEN_COUNT_KEY] += 1
+    assert {node.node_id: hash_node(node) for node in nodes} == fingerprints
@@ -0,0 +1,85 @@
+import asyncio
+import random
+import re
+import statistics
+
+import pytest
+
+from llm.local_models import HashingEmbedding, LocalLLM, sample_latency
+
+PROMPT = "Context: S3 buckets store objects. Question: where are objects stored?"
+
+
+def test_answers_are_deterministic_and_overlap_the_prompt():
+    llm = LocalLLM(output_tokens=16)
+    first, second = llm.complete(PROMPT).text, llm.complete(PROMPT).text
+    assert first == second
+    assert len(first.split(" ")) == 16
+    assert set(first.split(" ")) <= set(re.findall(r"\w+", PROMPT))
+    assert LocalLLM(output_tokens=16, seed=1).complete(PROMPT).text != first
+
+
+def test_fixed_response_streams_token_by_token():
+    llm = LocalLLM(response="4.0\nYES, supported.")
+    deltas = [chunk.delta for chunk in llm.stream_complete(PROMPT)]
+    assert "".join(deltas) == "4.0\nYES, supported."
+    assert len(deltas) == 2
+
+
+def test_async_paths_match_sync():
+    llm = LocalLLM(output_tokens=8)
+
+    async def main():
+        completion = await llm.acomplete(PROMPT)
+        chunks = [chunk async for chunk in await llm.astream_complete(PROMPT)]
+        return completion.text, chunks[-1].text
+
+    completion, streamed = asyncio.run(main())
+    assert completion == streamed == llm.complete(PROMPT).text
+
+
+def test_timings_add_latency_to_the_first_token():
+    llm = LocalLLM(
+        output_tokens=4,
+        tokens_per_second=10,
+        latency={"distribution": "fixed", "mean": 0.5},
+    )
+    assert llm.timings(PROMPT, 4) == pytest.approx([0.6, 0.1, 0.1, 0.1])
+
+
+@pytest.mark.parametrize(
+    "latency",
+    [
+        {"distribution": "uniform", "low": 0.2, "high": 0.6, "mean": 0.4},
+        {"distribution": "normal", "mean": 0.4, "std": 0.05},
+        {"distribution": "lognormal", "mean": 0.4, "sigma": 0.4},
+    ],
+)
+def test_sample_latency_has_the_configured_mean(latency):
+    rng = random.Random(0)
+    samples = [sample_latency(latency, rng) for _ in range(5000)]
+    assert min(samples) >= 0.0
+    assert statistics.mean(samples) == pytest.approx(0.4, rel=0.05)
+
+
+def test_sample_latency_rejects_unknown_distribution():
+    with pytest.raises(Exception, match="Unknown latency distribution"):
+        sample_latency({"distribution": "pareto"}, random.Random(0))
+
+
+def test_hashing_embedding_is_normalized_and_lexical():
+    embed_model = HashingEmbedding(dim=64)
+    query = embed_model.get_query_embedding("s3 bucket versioning")
+    near = embed_model.get_text_embedding("Enable S3 bucket versioning")
+    far = embed_model.get_text_embedding("Lambda cold start latency")
+
+    def dot(a, b):
+        return sum(x * y for x, y in zip(a, b))
+
+    assert len(query) == 64
+    assert dot(query, query) == pytest.approx(1.0)
+    assert dot(query, near) > dot(query, far)
+    assert asyncio.run(embed_model.aget_text_embedding("Enable S3 bucket versioning"))
+    assert embed_model.get_text_embedding_batch(["Enable S3 bucket versioning"]) == [
+        near
+    ]
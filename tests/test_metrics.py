@@ -0,0 +1,88 @@
+from types import SimpleNamespace
+
+import pytest
+from prometheus_client import REGISTRY, CollectorRegistry, generate_latest
+
+from application.rag_service import instrumentation
+from application.rag_service.instrumentation import setup_instrumentation, track_request
+from utils.metrics import add_callback
+
+
+def test_callback_gauge_follows_the_live_value():
+    registry = CollectorRegistry()
+    stats = {"hits": 5}
+    add_callback(
+        "cache_hits",
+        "Hits.",
+        lambda: [({"cache": "semantic"}, stats["hits"])],
+        labels=("cache",),
+        registry=registry,
+    )
+    assert registry.get_sample_value("cache_hits", {"cache": "semantic"}) == 5
+    # A rebuilt cache starts over; a gauge may go down.
+    stats["hits"] = 1
+    assert registry.get_sample_value("cache_hits", {"cache": "semantic"}) == 1
+    assert b"# TYPE cache_hits gauge" in generate_latest(registry)
+
+
+def test_callback_counter():
+    registry = CollectorRegistry()
+    add_callback(
+        "coalesced_total",
+        "Coalesced.",
+        lambda: [({}, 3)],
+        kind="counter",
+        registry=registry,
+    )
+    assert registry.get_sample_value("coalesced_total") == 3
+    assert b"# TYPE coalesced_total counter" in generate_latest(registry)
+
+
+def test_failing_callback_does_not_break_the_scrape():
+    registry = CollectorRegistry()
+
+    def collect():
+        raise RuntimeError("stats unavailable")
+
+    add_callback("broken", "Broken.", collect, registry=registry)
+    add_callback("working", "Working.", lambda: [({}, 1)], registry=registry)
+    assert registry.get_sample_value("working") == 1
+    assert registry.get_sample_value("broken") is None
+
+
+def test_unknown_kind_is_rejected():
+    with pytest.raises(Exception, match="Unknown callback metric kind"):
+        add_callback("x", "X.", list, kind="summary", registry=CollectorRegistry())
+
+
+def test_track_request_counts_by_status():
+    labels = {"method": "test", "status": "error"}
+    before = REGISTRY.get_sample_value("rag_requests_total", labels) or 0
+    with pytest.raises(ValueError):
+        with track_request("test"):
+            raise ValueError("boom")
+    assert REGISTRY.get_sample_value("rag_requests_total", labels) == before + 1
+    assert REGISTRY.get_sample_value("rag_request_seconds_count", {"method": "test"})
+
+
+def test_setup_instrumentation_exports_cache_stats(monkeypatch):
+    monkeypatch.setattr(instrumentation, "_installed", False)
+    registry = CollectorRegistry()
+    monkeypatch.setattr(
+        instrumentation,
+        "add_callback",
+        lambda *args, **kwargs: add_callback(*args, **kwargs, registry=registry),
+    )
+    monkeypatch.setattr(instrumentation, "add_stage_callback", lambda callback: None)
+    monkeypatch.setattr(
+        instrumentation,
+        "get_dispatcher",
+        lambda: SimpleNamespace(add_event_handler=lambda handler: None),
+    )
+    setup_instrumentation()
+
+    output = generate_latest(registry).decode()
+    assert "# TYPE rag_cache_hits gauge" in output
+    assert 'rag_cache_hits{cache="semantic"} 0.0' in output
+    assert "# TYPE rag_coalesced_total counter" in output
+    assert "rag_requests_in_flight 0.0" in output
@@ -0,0 +1,87 @@
+import numpy as np
+from llama_index.core.schema import NodeRelationship, RelatedNodeInfo, TextNode
+from llama_index.core.vector_stores.types import (
+    FilterOperator,
+    MetadataFilter,
+    MetadataFilters,
+    VectorStoreQuery,
+)
+
+from vector_database.numpy_vector_db_client import NumpyVectorStore
+
+
+def make_node(
+    node_id: str, embedding, category: str = "a", doc: str = "doc"
+) -> TextNode:
+    node = TextNode(
+        id_=node_id,
+        text=f"text of {node_id}",
+        metadata={"category": category},
+        embedding=list(embedding),
+    )
+    node.relationships[NodeRelationship.SOURCE] = RelatedNodeInfo(node_id=doc)
+    return node
+
+
+def query(store, embedding, top_k=2, **kwargs):
+    return store.query(
+        VectorStoreQuery(query_embedding=embedding, similarity_top_k=top_k, **kwargs)
+    )
+
+
+def make_store(tmp_path, **kwargs) -> NumpyVectorStore:
+    store = NumpyVectorStore(persist_dir=tmp_path / "store", **kwargs)
+    store.add(
+        [
+            make_node("x", [1.0, 0.0, 0.0], category="a", doc="d1"),
+            make_node("y", [0.0, 1.0, 0.0], category="b", doc="d1"),
+            make_node("z", [0.7, 0.7, 0.0], category="b", doc="d2"),
+        ]
+    )
+    return store
+
+
+def test_query_ranks_by_cosine_similarity(tmp_path):
+    result = query(make_store(tmp_path), [1.0, 0.1, 0.0])
+    assert result.ids == ["x", "z"]
+    assert result.similarities[0] > result.similarities[1]
+    assert result.nodes[0].get_content() == "text of x"
+
+
+def test_metadata_filters(tmp_path):
+    filters = MetadataFilters(
+        filters=[
+            MetadataFilter(key="category", value=["b"], operator=FilterOperator.IN)
+        ]
+    )
+    result = query(make_store(tmp_path), [1.0, 0.0, 0.0], filters=filters)
+    assert result.ids == ["z", "y"]
+
+
+def test_upsert_reuses_the_row_and_delete_masks_it(tmp_path):
+    store = make_store(tmp_path)
+    store.add([make_node("x", [0.0, 0.0, 1.0])])
+    assert query(store, [0.0, 0.0, 1.0], top_k=1).ids == ["x"]
+    assert store._count == 3
+
+    store.delete_nodes(node_ids=["x"])
+    store.delete("d2")
+    assert query(store, [1.0, 0.0, 1.0], top_k=3).ids == ["y"]
+
+
+def test_reload_replays_the_payload_log(tmp_path):
+    store = make_store(tmp_path)
+    store.delete_nodes(node_ids=["y"])
+    reloaded = NumpyVectorStore(persist_dir=tmp_path / "store")
+    assert query(reloaded, [0.0, 1.0, 0.0], top_k=3).ids == ["z", "x"]
+
+
+def test_approximate_search_matches_exact_on_clear_winner(tmp_path):
+    rng = np.random.default_rng(0)
+    store = NumpyVectorStore(
+        persist_dir=tmp_path / "store", search_mode="approximate", oversample=2
+    )
+    vectors = rng.normal(size=(200, 16))
+    store.add([make_node(f"n{i}", vector) for i, vector in enumerate(vectors)])
+    result = query(store, vectors[17] + 0.01, top_k=1)
+    assert result.ids == ["n17"]
@@ -0,0 +1,186 @@
+import asyncio
+from types import SimpleNamespace
+
+import qdrant_client
+from llama_index.core.schema import TextNode
+from llama_index.core.vector_stores.types import VectorStoreQuery
+from qdrant_client.http import models as rest
+
+from vector_database import base as base_module
+from vector_database import qdrant_vector_db_client as qdrant_module
+from vector_database.qdrant_vector_db_client import (
+    QdrantClientManager,
+    TunedQdrantVectorStore,
+    acreate_payload_indexes,
+)
+
+URL = "http://qdrant:6333"
+NODE_ID = "00000000-0000-0000-0000-000000000001"
+
+
+class FakeClient:
+    created = []
+    up = True
+
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs
+        self.closed = False
+        FakeClient.created.append(self)
+
+    def get_collections(self):
+        if not FakeClient.up:
+            raise ConnectionError("connection refused")
+        return []
+
+    def close(self):
+        self.closed = True
+
+
+class FakeAsyncClient(FakeClient):
+    pass
+
+
+def make_manager(monkeypatch) -> QdrantClientManager:
+    FakeClient.created, FakeClient.up = [], True
+    monkeypatch.setattr(qdrant_module.qdrant_client, "QdrantClient", FakeClient)
+    monkeypatch.setattr(
+        qdrant_module.qdrant_client, "AsyncQdrantClient", FakeAsyncClient
+    )
+    # No monitor thread; the tests call check_health directly.
+    return QdrantClientManager(prefer_grpc=False, health_check_interval=0)
+
+
+def test_clients_are_shared_per_url(monkeypatch):
+    manager = make_manager(monkeypatch)
+    assert manager.get_client(URL) is manager.get_client(URL)
+    assert manager.get_async_client(URL) is manager.get_async_client(URL)
+    assert manager.get_client(URL, prefer_grpc=True) is not manager.get_client(URL)
+
+
+def test_async_client_does_no_sync_work(monkeypatch):
+    manager = make_manager(monkeypatch)
+    manager.get_async_client(URL)
+    assert [type(client) for client in FakeClient.created] == [FakeAsyncClient]
+
+
+def test_failed_health_check_keeps_clients(monkeypatch):
+    manager = make_manager(monkeypatch)
+    client = manager.get_client(URL)
+    async_client = manager.get_async_client(URL)
+
+    FakeClient.up = False
+    manager.check_health()
+    assert manager.healthy(URL) is False
+    assert manager.get_client(URL) is client
+    assert manager.get_async_client(URL) is async_client
+    assert not client.closed
+
+    FakeClient.up = True
+    manager.check_health()
+    assert manager.healthy(URL) is True
+    assert manager.get_client(URL) is client
+
+
+def test_close_closes_sync_clients(monkeypatch):
+    manager = make_manager(monkeypatch)
+    client = manager.get_client(URL)
+    manager.close()
+    assert client.closed
+
+
+def make_store(client: qdrant_client.QdrantClient) -> TunedQdrantVectorStore:
+    client.create_collection(
+        "docs",
+        vectors_config={
+            "text-dense": rest.VectorParams(size=2, distance=rest.Distance.COSINE)
+        },
+    )
+    store = TunedQdrantVectorStore(
+        client=client,
+        collection_name="docs",
+        search_params=rest.SearchParams(hnsw_ef=16),
+    )
+    store.add([TextNode(id_=NODE_ID, text="hello", embedding=[1.0, 0.0])])
+    return store
+
+
+def test_tuned_query_detects_named_vector_format_once(monkeypatch):
+    client = qdrant_client.QdrantClient(location=":memory:")
+    store = make_store(client)
+    calls = []
+    get_collection = client.get_collection
+    monkeypatch.setattr(
+        client,
+        "get_collection",
+        lambda name: calls.append(name) or get_collection(name),
+    )
+    query = VectorStoreQuery(query_embedding=[1.0, 0.0], similarity_top_k=1)
+    for _ in range(3):
+        assert store.query(query).ids == [NODE_ID]
+    assert len(calls) <= 1
+
+
+class PayloadIndexClient:
+    """Records payload index creation on top of a collection's schema."""
+
+    def __init__(self, *field_names):
+        self.payload_schema = {
+            name: rest.PayloadSchemaType.KEYWORD for name in field_names
+        }
+        self.created = []
+
+    def get_collection(self, collection_name):
+        return SimpleNamespace(payload_schema=dict(self.payload_schema))
+
+    def create_payload_index(self, collection_name, field_name, field_schema, wait):
+        self.created.append((collection_name, field_name, field_schema))
+        self.payload_schema[field_name] = field_schema
+
+
+class AsyncPayloadIndexClient(PayloadIndexClient):
+    async def get_collection(self, collection_name):
+        return super().get_collection(collection_name)
+
+    async def create_payload_index(self, *args, **kwargs):
+        return super().create_payload_index(*args, **kwargs)
+
+
+def test_new_collections_get_payload_indexes(monkeypatch):
+    client = qdrant_client.QdrantClient(location=":memory:")
+    created = []
+    monkeypatch.setattr(
+        client,
+        "create_payload_index",
+        lambda collection_name, field_name, **kwargs: created.append(
+            (collection_name, field_name, kwargs["field_schema"])
+        ),
+    )
+    store = TunedQdrantVectorStore(
+        client=client, collection_name="docs", payload_indexes=["category"]
+    )
+    store.add([TextNode(id_=NODE_ID, text="hello", embedding=[1.0, 0.0])])
+    # The base store also indexes doc_id on creation.
+    assert ("docs", "category", rest.PayloadSchemaType.KEYWORD) in created
+
+
+def test_new_collections_get_payload_indexes_async():
+    client = AsyncPayloadIndexClient()
+    asyncio.run(acreate_payload_indexes(client, "docs", ["category", "file_name"]))
+    assert [field for _, field, _ in client.created] == ["category", "file_name"]
+
+
+def test_existing_collections_only_get_missing_indexes(monkeypatch):
+    client = PayloadIndexClient("category")
+    monkeypatch.setattr(base_module, "initialize_qdrant", lambda url: client)
+    monkeypatch.setattr(base_module, "get_qdrant_url", lambda: URL)
+    monkeypatch.setattr(
+        base_module.cfg.vector_db.qdrant, "payload_indexes", ["category", "file_name"]
+    )
+
+    base_module.ensure_payload_indexes(vector_db="qdrant", model_provider="local")
+    assert client.created == [
+        ("sagemaker_docs_local", "file_name", rest.PayloadSchemaType.KEYWORD)
+    ]
+
+    base_module.ensure_payload_indexes(vector_db="qdrant", model_provider="local")
+    assert len(client.created) == 1
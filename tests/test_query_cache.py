@@ -0,0 +1,72 @@
+import asyncio
+from typing import List
+
+from llama_index.core.embeddings import MockEmbedding
+
+from application.rag_service import query_cache
+from application.rag_service.query_cache import AsyncTTLCache, QueryEmbeddingCache
+
+
+class CountingEmbedding(MockEmbedding):
+    calls: List[str] = []
+
+    async def _aget_query_embedding(self, query: str) -> List[float]:
+        self.calls.append(query)
+        await asyncio.sleep(0.01)
+        return [float(len(query))] * self.embed_dim
+
+
+def test_lru_eviction():
+    cache = AsyncTTLCache(max_size=2, ttl=None)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+
+
+def test_entries_expire(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(query_cache.time, "monotonic", lambda: now[0])
+    cache = AsyncTTLCache(max_size=8, ttl=10)
+    cache.set("a", 1)
+    now[0] += 9
+    assert cache.get("a") == 1
+    now[0] += 2
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_concurrent_misses_share_one_computation():
+    cache = AsyncTTLCache(max_size=8, ttl=None)
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "value"
+
+    async def main():
+        return await asyncio.gather(
+            *(cache.get_or_compute("key", compute) for _ in range(5))
+        )
+
+    assert asyncio.run(main()) == ["value"] * 5
+    assert len(calls) == 1
+    assert asyncio.run(cache.get_or_compute("key", compute)) == "value"
+    assert cache.stats() == {"hits": 1, "misses": 1, "coalesced": 4, "size": 1}
+
+
+def test_query_embeddings_are_cached_by_normalized_text():
+    embed_model = CountingEmbedding(embed_dim=3, calls=[])
+    cached = QueryEmbeddingCache(embed_model, AsyncTTLCache(max_size=8, ttl=None))
+
+    async def main():
+        first = await cached.aget_query_embedding("what is  sagemaker")
+        second = await cached.aget_query_embedding("what is sagemaker ")
+        return first, second
+
+    first, second = asyncio.run(main())
+    assert first == second
+    assert embed_model.calls == ["what is  sagemaker"]
@@ -0,0 +1,56 @@
+import asyncio
+from types import SimpleNamespace
+
+from application.evaluation_service.eval_checkpoint import EvalCheckpoint
+from application.evaluation_service.rag_eval_pipeline import RagEvalPipeline
+
+LOCAL_JUDGE = SimpleNamespace(provider="local", name="local-judge", type="llm_eval")
+OUTPUT = {"response": "Enable versioning.", "contexts": ["Versioning keeps variants."]}
+
+
+def make_pipeline() -> RagEvalPipeline:
+    return RagEvalPipeline(
+        eval_gold_qa=[],
+        model_provider="local",
+        model_name="local-llm",
+        eval_model=LOCAL_JUDGE,
+    )
+
+
+def test_run_state_is_per_instance(tmp_path):
+    first, second = make_pipeline(), make_pipeline()
+    first.checkpoint = EvalCheckpoint(tmp_path / "checkpoint.jsonl")
+    first.rescore = True
+    assert second.checkpoint is None
+    assert second.rescore is False
+    assert second.judge is None
+
+
+def test_judge_uses_the_instance_eval_model():
+    pipeline = make_pipeline()
+    judge = pipeline.set_llm_judge()
+    assert judge.llm.metadata.model_name == "local-judge"
+    assert pipeline.set_llm_judge() is judge
+
+    result = asyncio.run(pipeline.correctness("q", "Enable versioning.", OUTPUT))
+    assert result == {"correctness": 4.0}
+
+
+def test_scores_are_checkpointed_per_instance(tmp_path):
+    pipeline = make_pipeline()
+    pipeline.checkpoint = EvalCheckpoint(tmp_path / "checkpoint.jsonl")
+    pipeline.score_config = "config"
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        return {"relevancy": len(calls)}
+
+    def score():
+        return asyncio.run(pipeline.score("relevancy", "q", "gt", compute))
+
+    assert score() == {"relevancy": 1}
+    assert score() == {"relevancy": 1}
+    pipeline.rescore = True
+    assert score() == {"relevancy": 2}
+    assert len(calls) == 2
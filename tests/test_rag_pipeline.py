@@ -0,0 +1,162 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from llama_index.core.schema import NodeWithScore, TextNode
+from llama_index.core.vector_stores.types import FilterOperator, VectorStoreQuery
+
+from application.rag_service.rag_pipeline import RagPipeline
+from application.rag_service.semantic_cache import SemanticCache
+from llm.local_models import HashingEmbedding
+from vector_database.numpy_vector_db_client import NumpyVectorStore
+
+TOKENS = ["Enable", " versioning", "."]
+SOURCES = [
+    NodeWithScore(node=TextNode(text="Versioning.", metadata={"file_name": "s3.md"}))
+]
+
+
+class FakeStreamEngine:
+    def __init__(self, fail_after: int = None):
+        self.fail_after = fail_after
+        self.calls = 0
+
+    async def aretrieve(self, query_bundle):
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        return SOURCES
+
+    def synthesize(self, query_bundle, nodes):
+        def response_gen():
+            for i, token in enumerate(TOKENS):
+                if i == self.fail_after:
+                    raise RuntimeError("stream broke")
+                yield token
+
+        return SimpleNamespace(response_gen=response_gen(), source_nodes=nodes)
+
+
+@pytest.fixture
+def pipeline(monkeypatch):
+    engine, cache = FakeStreamEngine(), SemanticCache(path=None, threshold=0.99)
+    embed_model = HashingEmbedding(dim=32)
+
+    async def aget_stream_engine(self, categories=None):
+        return engine
+
+    async def aget_embed_model(self):
+        return embed_model
+
+    async def aget_semantic_cache(self):
+        return cache
+
+    monkeypatch.setattr(RagPipeline, "aget_stream_engine", aget_stream_engine)
+    monkeypatch.setattr(RagPipeline, "aget_embed_model", aget_embed_model)
+    monkeypatch.setattr(RagPipeline, "aget_semantic_cache", aget_semantic_cache)
+    monkeypatch.setattr(RagPipeline, "get_collection_version", lambda self: "v1")
+    pipe = RagPipeline(model_provider="local", semantic_cache=True, coalesce=False)
+    return SimpleNamespace(pipe=pipe, engine=engine, cache=cache)
+
+
+def collect(pipe: RagPipeline, query: str = "how do I keep old objects?"):
+    async def main():
+        return [chunk async for chunk in pipe.astream(query)]
+
+    return asyncio.run(main())
+
+
+def test_astream_yields_tokens_then_sources_and_fills_the_cache(pipeline):
+    chunks = collect(pipeline.pipe)
+    assert chunks == [{"token": token} for token in TOKENS] + [
+        {"source_documents": {"s3.md"}}
+    ]
+    assert len(pipeline.cache) == 1
+
+    cached = collect(pipeline.pipe)
+    assert cached == [
+        {"token": "Enable versioning."},
+        {"source_documents": {"s3.md"}},
+    ]
+    assert pipeline.engine.calls == 1
+
+
+def test_answer_is_cached_when_client_stops_after_sources(pipeline):
+    async def main():
+        stream = pipeline.pipe.astream("how do I keep old objects?")
+        for _ in range(len(TOKENS) + 1):
+            await anext(stream)
+        await stream.aclose()
+
+    asyncio.run(main())
+    assert len(pipeline.cache) == 1
+
+
+def test_partial_answers_are_not_cached(pipeline):
+    async def main():
+        stream = pipeline.pipe.astream("how do I keep old objects?")
+        await anext(stream)
+        await stream.aclose()
+
+    asyncio.run(main())
+    pipeline.engine.fail_after = 2
+    with pytest.raises(RuntimeError, match="stream broke"):
+        collect(pipeline.pipe)
+    assert len(pipeline.cache) == 0
+
+
+def test_concurrent_streams_share_one_answer(pipeline):
+    pipe = RagPipeline(model_provider="local", semantic_cache=True, coalesce=True)
+
+    async def drain(query):
+        return [chunk async for chunk in pipe.astream(query)]
+
+    async def main():
+        return await asyncio.gather(
+            drain("How do I keep old objects?"), drain(" How do I  keep old objects? ")
+        )
+
+    expected = [{"token": token} for token in TOKENS] + [
+        {"source_documents": {"s3.md"}}
+    ]
+    assert asyncio.run(main()) == [expected, expected]
+    assert pipeline.engine.calls == 1
+    assert len(pipeline.cache) == 1
+
+
+def test_get_filters_builds_a_category_in_filter():
+    filters = RagPipeline.get_filters(("s3", "ec2"))
+    (condition,) = filters.filters
+    assert condition.key == "category"
+    assert condition.operator == FilterOperator.IN
+    assert condition.value == ["s3", "ec2"]
+
+
+@pytest.mark.parametrize("categories", [None, []])
+def test_get_filters_without_categories(categories):
+    assert RagPipeline.get_filters(categories) is None
+
+
+def test_numpy_store_applies_category_filters(tmp_path):
+    store = NumpyVectorStore(persist_dir=tmp_path / "store")
+    store.add(
+        [
+            TextNode(
+                id_=category,
+                text=category,
+                metadata={"category": category},
+                embedding=[1.0, float(i)],
+            )
+            for i, category in enumerate(["s3", "ec2", "iam"])
+        ]
+    )
+
+    def search(categories):
+        query = VectorStoreQuery(
+            query_embedding=[1.0, 0.0],
+            similarity_top_k=3,
+            filters=RagPipeline.get_filters(categories),
+        )
+        return sorted(store.query(query).ids)
+
+    assert search(["s3", "iam"]) == ["iam", "s3"]
+    assert search(None) == ["ec2", "iam", "s3"]
@@ -0,0 +1,111 @@
+import asyncio
+
+import pytest
+from llama_index.core.embeddings import MockEmbedding
+
+import config as cfg
+from llm.base import set_model
+from llm.rate_limited import RateLimitedEmbedding, RateLimitedLLM
+from utils import rate_limiter as rate_limiter_module
+from utils.rate_limiter import RateLimiter, TokenBucket
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limiter_module.time, "monotonic", clock.monotonic)
+    return clock
+
+
+def test_bucket_queues_reservations_in_order(clock):
+    bucket = TokenBucket(rate=10, capacity=10)
+    assert bucket.reserve(10) == 0.0
+    assert bucket.reserve(5) == pytest.approx(0.5)
+    assert bucket.reserve(5) == pytest.approx(1.0)
+
+    clock.now = 1.0
+    assert bucket.reserve(1) == pytest.approx(0.1)
+
+
+def test_bucket_refill_is_capped(clock):
+    bucket = TokenBucket(rate=10, capacity=10)
+    bucket.reserve(10)
+    clock.now = 60.0
+    assert bucket.reserve(10) == 0.0
+    # Larger than the bucket: waits for a full bucket, not forever.
+    assert bucket.reserve(100) == pytest.approx(1.0)
+
+
+def test_adjust_and_drain(clock):
+    bucket = TokenBucket(rate=10, capacity=10)
+    bucket.reserve(10)
+    bucket.adjust(4)
+    assert bucket.reserve(4) == 0.0
+    clock.now = 0.5
+    bucket.drain()
+    assert bucket.reserve(1) == pytest.approx(0.1)
+
+
+def test_limiter_waits_for_the_tighter_budget(clock):
+    limiter = RateLimiter("test", rpm=600, tpm=60)
+    assert limiter._reserve(tokens=60, requests=1) == 0.0
+    assert limiter._reserve(tokens=30, requests=1) == pytest.approx(30.0)
+    limiter.settle(estimated=30, actual=0)
+    assert limiter._reserve(tokens=0, requests=1) == 0.0
+
+
+def test_unlimited_limiter_never_waits(clock):
+    limiter = RateLimiter("test", rpm=None, tpm=None)
+    asyncio.run(limiter.acquire(tokens=10**9, requests=10**6))
+    limiter.throttled()
+    assert limiter._reserve(tokens=10**9, requests=10**6) == 0.0
+
+
+class ThrottlingEmbedding(MockEmbedding):
+    calls: int = 0
+
+    def _get_text_embeddings(self, texts):
+        self.calls += 1
+        raise Exception("ThrottlingException: Too many requests")
+
+
+def test_embedding_retries_throttling_once_per_layer(clock):
+    embed_model = ThrottlingEmbedding(embed_dim=2)
+    limiter = RateLimiter("test", rpm=None, tpm=None)
+    rate_limited = RateLimitedEmbedding(
+        embed_model, limiter, max_retries=2, base_delay=0.0, max_delay=0.0
+    )
+    with pytest.raises(Exception, match="ThrottlingException"):
+        rate_limited.get_text_embedding_batch(["a", "b"])
+    assert embed_model.calls == 3
+
+
+def test_bedrock_stack_has_one_retry_layer(monkeypatch):
+    for name, value in {
+        "AWS_ACCESS_KEY_ID": "test",
+        "AWS_SECRET_ACCESS_KEY": "test",
+        "AWS_DEFAULT_REGION": "us-east-2",
+    }.items():
+        monkeypatch.setenv(name, value)
+    monkeypatch.delenv("AWS_BEARER_TOKEN_BEDROCK", raising=False)
+    monkeypatch.setattr(cfg.model.embed_cache, "enabled", False)
+
+    models = set_model("aws", "claude-3-haiku", "llm")
+    llm, embed_model = models["llm"], models["embed_model"]
+    assert isinstance(llm, RateLimitedLLM)
+    assert isinstance(embed_model, RateLimitedEmbedding)
+    assert llm.max_retries == cfg.model.retry.max_retries
+
+    # The wrapped clients make a single attempt: no tenacity retries and no
+    # botocore retries underneath the wrappers.
+    for inner in (llm._llm, embed_model.embed_model):
+        assert inner.max_retries == 1
+        assert inner._client.meta.config.retries["total_max_attempts"] == 1
@@ -0,0 +1,65 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from llama_index.core.schema import NodeWithScore, QueryBundle, TextNode
+
+from application.rag_service.reranker import LexicalRerank, set_reranker
+
+TEXTS = [
+    "Amazon S3 stores objects in buckets.",
+    "Lambda runs functions without servers.",
+    "Configure S3 bucket versioning to keep every object version.",
+    "EC2 instances are virtual servers.",
+]
+
+
+def make_nodes(scores=(0.9, 0.8, 0.7, 0.6)):
+    return [
+        NodeWithScore(node=TextNode(id_=str(i), text=text), score=score)
+        for i, (text, score) in enumerate(zip(TEXTS, scores))
+    ]
+
+
+def test_lexical_overlap_reorders_candidates():
+    rerank = LexicalRerank(top_n=2, weight=1.0)
+    nodes = rerank.postprocess_nodes(
+        make_nodes(), query_bundle=QueryBundle("S3 bucket versioning")
+    )
+    assert [node.node.node_id for node in nodes] == ["2", "0"]
+
+
+def test_weight_blends_retrieval_score():
+    rerank = LexicalRerank(top_n=4, weight=0.0)
+    nodes = rerank.postprocess_nodes(
+        make_nodes(), query_bundle=QueryBundle("S3 bucket versioning")
+    )
+    assert [node.node.node_id for node in nodes] == ["0", "1", "2", "3"]
+
+
+def test_without_query_keeps_retrieval_order():
+    rerank = LexicalRerank(top_n=3)
+    nodes = rerank._postprocess_nodes(make_nodes(), query_bundle=None)
+    assert [node.node.node_id for node in nodes] == ["0", "1", "2"]
+
+
+def test_async_path_runs_on_rerank_pool():
+    rerank = LexicalRerank(top_n=1, weight=1.0)
+    nodes = asyncio.run(
+        rerank.apostprocess_nodes(
+            make_nodes(), query_bundle=QueryBundle("serverless Lambda functions")
+        )
+    )
+    assert [node.node.node_id for node in nodes] == ["1"]
+
+
+def test_set_reranker():
+    rerank_cfg = SimpleNamespace(
+        scorer="lexical", candidate_k=10, top_n=2, weight=0.3, max_chars=100
+    )
+    rerank = set_reranker(rerank_cfg)
+    assert isinstance(rerank, LexicalRerank)
+    assert (rerank.top_n, rerank.weight, rerank.max_chars) == (2, 0.3, 100)
+
+    with pytest.raises(Exception, match="Unknown rerank scorer"):
+        set_reranker(SimpleNamespace(**{**vars(rerank_cfg), "scorer": "llm"}))
@@ -0,0 +1,38 @@
+from application.rag_service.semantic_cache import SemanticCache
+
+RESULT = {"response": "Use an endpoint.", "source_documents": {"b.md", "a.md"}}
+
+
+def test_hit_above_threshold_only():
+    cache = SemanticCache(path=None, threshold=0.95)
+    cache.add([1.0, 0.0, 0.0], "deploy a model", RESULT, version="v1")
+
+    hit = cache.lookup([0.99, 0.05, 0.0], version="v1")
+    assert hit == {"response": "Use an endpoint.", "source_documents": {"a.md", "b.md"}}
+    assert cache.lookup([0.0, 1.0, 0.0], version="v1") is None
+    assert cache.stats() == {"hits": 1, "misses": 1, "size": 1}
+
+
+def test_version_change_drops_entries():
+    cache = SemanticCache(path=None, threshold=0.9)
+    cache.add([1.0, 0.0], "q", RESULT, version="v1")
+    assert cache.lookup([1.0, 0.0], version="v2") is None
+    assert len(cache) == 0
+
+
+def test_ring_buffer_overwrites_oldest():
+    cache = SemanticCache(path=None, threshold=0.99, max_entries=2)
+    for i, vector in enumerate(([1.0, 0.0, 0.0], [0.0, 1.0, 0.0], [0.0, 0.0, 1.0])):
+        cache.add(vector, f"q{i}", {**RESULT, "response": f"a{i}"}, version="v1")
+    assert len(cache) == 2
+    assert cache.lookup([1.0, 0.0, 0.0], version="v1") is None
+    assert cache.lookup([0.0, 0.0, 1.0], version="v1")["response"] == "a2"
+
+
+def test_persists_across_instances(tmp_path):
+    cache = SemanticCache(path=tmp_path, threshold=0.9)
+    cache.add([0.6, 0.8], "q", RESULT, version="v1")
+    cache.save()
+
+    reloaded = SemanticCache(path=tmp_path, threshold=0.9)
+    assert reloaded.lookup([0.6, 0.8], version="v1")["response"] == "Use an endpoint."
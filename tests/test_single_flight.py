@@ -0,0 +1,162 @@
+import asyncio
+
+import pytest
+
+from application.rag_service.single_flight import Broadcast, SingleFlight
+
+
+def test_concurrent_calls_share_one_computation():
+    flights = SingleFlight()
+    runs = []
+
+    async def compute():
+        runs.append(1)
+        await asyncio.sleep(0.01)
+        return "answer"
+
+    async def main():
+        results = await asyncio.gather(*(flights.do("q", compute) for _ in range(5)))
+        other = await flights.do("other", compute)
+        return results, other
+
+    results, other = asyncio.run(main())
+    assert results == ["answer"] * 5
+    assert other == "answer"
+    assert len(runs) == 2
+    assert flights.stats() == {
+        "calls": 6,
+        "executed": 2,
+        "coalesced": 4,
+        "in_flight": 0,
+    }
+
+
+def test_finished_calls_run_again():
+    flights = SingleFlight()
+    runs = []
+
+    async def compute():
+        runs.append(1)
+        return len(runs)
+
+    async def main():
+        return [await flights.do("q", compute) for _ in range(2)]
+
+    assert asyncio.run(main()) == [1, 2]
+
+
+def test_cancelled_caller_does_not_cancel_others():
+    flights = SingleFlight()
+
+    async def main():
+        ready = asyncio.Event()
+
+        async def compute():
+            ready.set()
+            await asyncio.sleep(0.02)
+            return "answer"
+
+        first = asyncio.create_task(flights.do("q", compute))
+        second = asyncio.create_task(flights.do("q", compute))
+        await ready.wait()
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(main()) == "answer"
+    assert flights.in_flight() == 0
+
+
+def test_errors_reach_every_caller():
+    flights = SingleFlight()
+
+    async def compute():
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    async def main():
+        return await asyncio.gather(
+            flights.do("q", compute),
+            flights.do("q", compute),
+            return_exceptions=True,
+        )
+
+    results = asyncio.run(main())
+    assert [type(result) for result in results] == [ValueError, ValueError]
+    assert flights.stats()["executed"] == 1
+
+
+async def ticks(n: int, fail: bool = False):
+    for i in range(n):
+        await asyncio.sleep(0.005)
+        yield i
+    if fail:
+        raise ValueError("stream broke")
+
+
+async def read(stream, limit: int = None):
+    items = []
+    async for item in stream:
+        items.append(item)
+        if len(items) == limit:
+            break
+    return items
+
+
+def test_broadcast_replays_the_stream_to_late_readers():
+    completed = []
+
+    async def main():
+        broadcast = Broadcast(ticks(4), completed.append)
+        first = asyncio.create_task(read(broadcast.subscribe()))
+        await asyncio.sleep(0.012)
+        second = broadcast.subscribe()
+        return await first, await read(second)
+
+    assert asyncio.run(main()) == ([0, 1, 2, 3], [0, 1, 2, 3])
+    assert completed == [[0, 1, 2, 3]]
+
+
+def test_broadcast_errors_reach_every_reader():
+    completed = []
+
+    async def main():
+        broadcast = Broadcast(ticks(2, fail=True), completed.append)
+        return await asyncio.gather(
+            read(broadcast.subscribe()),
+            read(broadcast.subscribe()),
+            return_exceptions=True,
+        )
+
+    results = asyncio.run(main())
+    assert [type(result) for result in results] == [ValueError, ValueError]
+    assert completed == []
+
+
+def test_broadcast_keeps_reading_while_anyone_listens():
+    completed = []
+
+    async def main():
+        broadcast = Broadcast(ticks(4), completed.append)
+        return await asyncio.gather(
+            read(broadcast.subscribe(), limit=1), read(broadcast.subscribe())
+        )
+
+    assert asyncio.run(main()) == [[0], [0, 1, 2, 3]]
+    assert completed == [[0, 1, 2, 3]]
+
+
+def test_broadcast_stops_when_every_reader_leaves():
+    completed = []
+
+    async def main():
+        broadcast = Broadcast(ticks(4), completed.append)
+        items = await read(broadcast.subscribe(), limit=1)
+        await asyncio.sleep(0.05)
+        return items, broadcast
+
+    items, broadcast = asyncio.run(main())
+    assert items == [0]
+    assert broadcast.items == [0]
+    assert completed == []
@@ -0,0 +1,42 @@
+import sys
+
+import config as cfg
+from llama_index.core.schema import MetadataMode, TextNode
+
+from utils import token_counter
+from utils.token_counter import TOKEN_COUNT_KEY, TokenCounter, approx_count
+
+
+def test_approx_count():
+    assert approx_count("") == 0
+    assert approx_count("a b c d e") == 5
+    assert approx_count("x" * 40) == 10
+
+
+def test_defaults_resolve_at_call_time(monkeypatch):
+    monkeypatch.setattr(token_counter, "_counters", {})
+    monkeypatch.setattr(cfg.app.model, "provider", "gemini")
+    monkeypatch.setattr(cfg.app.token_counter, "exact", False)
+
+    counter = token_counter.get_token_counter()
+    assert (counter.model_provider, counter.exact) == ("gemini", False)
+    assert token_counter.get_token_counter("gemini", exact=False) is counter
+
+
+def test_falls_back_without_tokenizer(monkeypatch):
+    monkeypatch.setitem(sys.modules, "tiktoken", None)
+    counter = TokenCounter(exact=True)
+    assert not counter.exact
+    assert counter.count("hello world") == approx_count("hello world")
+
+
+def test_node_counts_are_stored_and_hidden():
+    counter = TokenCounter()
+    node = TextNode(text="one two three", metadata={"file_name": "a.md"})
+    counter.set_node_counts([node])
+
+    assert node.metadata[TOKEN_COUNT_KEY] == approx_count("one two three")
+    assert TOKEN_COUNT_KEY not in node.get_metadata_str(mode=MetadataMode.LLM)
+    assert TOKEN_COUNT_KEY not in node.get_metadata_str(mode=MetadataMode.EMBED)
+    node.set_content("changed but the stored count wins")
+    assert counter.count_node(node) == node.metadata[TOKEN_COUNT_KEY]